@@ -0,0 +1,16 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault(
+    "DJANGO_SETTINGS_MODULE",
+    "chatpdf_backend.settings",
+)
+os.environ.setdefault("ASYNC_QUERY_VIEWS", "True")
+
+# gunicorn chatpdf_backend.asgi:application -k uvicorn.workers.UvicornWorker
+application = get_asgi_application()
+
+from documents.bootstrap_admin import ensure_admin  # noqa: E402
+
+ensure_admin()
@@ -0,0 +1,27 @@
+import os
+from pathlib import Path
+
+# Shared by gunicorn.conf.py and the ingestion_worker command, which write
+# their prometheus_client multiprocess files to the same directory. Kept
+# free of Django imports so the gunicorn config can use it before setup.
+
+
+def process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def remove_stale_metrics(path: Path) -> None:
+    # prometheus_client names its files <type>_<pid>.db. Only files of
+    # processes that are gone are removed: the web server and the ingestion
+    # workers share the directory and either may restart while the other
+    # is writing to it.
+    for f in Path(path).glob("*.db"):
+        pid = f.stem.rsplit("_", 1)[-1]
+        if pid.isdigit() and not process_exists(int(pid)):
+            f.unlink(missing_ok=True)
@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "documents.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -57,6 +58,20 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "chatpdf_backend.wsgi.application"
+ASGI_APPLICATION = "chatpdf_backend.asgi.application"
+# Set by chatpdf_backend.asgi: route query endpoints to their async views.
+ASYNC_QUERY_VIEWS = os.environ.get("ASYNC_QUERY_VIEWS", "False") == "True"
+# Threads for embedding and FAISS search in the async views.
+BLOCKING_EXECUTOR_WORKERS = int(os.environ.get("BLOCKING_EXECUTOR_WORKERS", 8))
+# LLM clients (and their HTTP connection pools) kept per worker process,
+# keyed by provider, model and hashed API key.
+LLM_CLIENT_POOL_SIZE = int(os.environ.get("LLM_CLIENT_POOL_SIZE", 32))
+# Batch query endpoint: questions per request and LLM calls in flight.
+BATCH_QUERY_MAX_QUESTIONS = int(os.environ.get("BATCH_QUERY_MAX_QUESTIONS", 100))
+BATCH_QUERY_LLM_CONCURRENCY = int(os.environ.get("BATCH_QUERY_LLM_CONCURRENCY", 8))
+# Load the embedding model and provider SDKs in DocumentsConfig.ready(), so a
+# preloading server (see gunicorn.conf.py) shares them with forked workers.
+PRELOAD_EMBEDDING_MODEL = os.environ.get("PRELOAD_EMBEDDING_MODEL", "False") == "True"
 
 DATABASES = {
     "default": {
@@ -84,6 +99,64 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
 VECTOR_INDEX_ROOT = BASE_DIR / "vector_index"
+# FAISS index built at ingestion: "flat" (exact), "ivf_flat", "ivf_pq" or
+# "hnsw". nprobe/ef_search are saved with the index and used at query time.
+VECTOR_INDEX_OPTIONS = {
+    "index_type": os.environ.get("VECTOR_INDEX_TYPE", "flat"),
+    "nlist": int(os.environ.get("VECTOR_INDEX_NLIST", 256)),
+    "nprobe": int(os.environ.get("VECTOR_INDEX_NPROBE", 16)),
+    "pq_m": int(os.environ.get("VECTOR_INDEX_PQ_M", 16)),
+    "hnsw_m": int(os.environ.get("VECTOR_INDEX_HNSW_M", 32)),
+    "ef_search": int(os.environ.get("VECTOR_INDEX_EF_SEARCH", 64)),
+}
+# Upper bound on chunk size; chunks break at headings, paragraphs and
+# requirement IDs and do not overlap.
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", 512))
+# Fuse BM25 and vector hits (reciprocal rank fusion); exact requirement IDs
+# are found by BM25, so far fewer candidates are needed than with vectors
+# alone.
+HYBRID_RETRIEVAL = os.environ.get("HYBRID_RETRIEVAL", "True") == "True"
+RETRIEVAL_K = int(os.environ.get("RETRIEVAL_K", 20 if HYBRID_RETRIEVAL else 200))
+VECTOR_INDEX_CACHE_MAX_BYTES = int(
+    os.environ.get("VECTOR_INDEX_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+# Ingestion appends each document to the corpus index as a new segment; once
+# there are more than this many the corpus is compacted into one.
+CORPUS_MAX_SEGMENTS = int(os.environ.get("CORPUS_MAX_SEGMENTS", 32))
+
+# Overrides the per-model context budgets in llm.context when set.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 0)) or None
+
+# Off by default: a reused answer is only right if the questions really mean
+# the same thing, which the similarity threshold can only approximate.
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "False") == "True"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(
+    os.environ.get("ANSWER_CACHE_SIMILARITY_THRESHOLD", 0.98)
+)
+ANSWER_CACHE_MAX_CANDIDATES = int(os.environ.get("ANSWER_CACHE_MAX_CANDIDATES", 500))
+
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 64))
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "True") == "True"
+EMBEDDING_CACHE_ROOT = Path(os.environ.get("EMBEDDING_CACHE_ROOT", BASE_DIR / "embedding_cache"))
+
+INGESTION_WORKER_PROCESSES = int(os.environ.get("INGESTION_WORKER_PROCESSES", 2))
+# Every ingestion worker process runs its own extraction pool, so by default
+# the cores are split between them rather than each taking all of them.
+PDF_EXTRACTION_WORKERS = int(
+    os.environ.get(
+        "PDF_EXTRACTION_WORKERS",
+        max(1, (os.cpu_count() or 1) // max(1, INGESTION_WORKER_PROCESSES)),
+    )
+)
+INGESTION_MAX_ATTEMPTS = int(os.environ.get("INGESTION_MAX_ATTEMPTS", 3))
+INGESTION_RETRY_DELAY_SECONDS = int(os.environ.get("INGESTION_RETRY_DELAY_SECONDS", 30))
+# A running job's lease is renewed every INGESTION_JOB_HEARTBEAT_SECONDS;
+# a job whose lease is older than the timeout belonged to a dead worker.
+INGESTION_JOB_TIMEOUT_SECONDS = int(os.environ.get("INGESTION_JOB_TIMEOUT_SECONDS", 600))
+INGESTION_JOB_HEARTBEAT_SECONDS = int(os.environ.get("INGESTION_JOB_HEARTBEAT_SECONDS", 60))
+# Metrics files of the gunicorn workers (see gunicorn.conf.py) and of the
+# ingestion_worker processes, aggregated by /metrics.
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "/tmp/chatpdf-prometheus")
 
 STREAMLIT_API_KEY = os.environ.get("STREAMLIT_API_KEY", "dev-streamlit-key")
 
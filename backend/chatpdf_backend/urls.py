@@ -2,10 +2,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from documents.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("documents.urls")),
+    path("metrics", metrics_view),
 ]
 if settings.DEBUG:
     urlpatterns += static(
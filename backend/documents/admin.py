@@ -1,9 +1,13 @@
 from django.contrib import admin
 from django.contrib import messages
-from .models import Document, QueryLog
-from .ingestion import ingest_document
-#from llm.embeddings import DummyEmbeddingProvider
-from llm.embeddings import HuggingFaceEmbeddingProvider
+from django.db.models import Count, Q
+from .models import Document, IngestionJob, QueryLog
+from .jobs import enqueue_ingestion
+from llm.tracing import aggregate_timings
+
+# Latency percentiles in the QueryLog changelist cover the most recent
+# queries only, so the page stays fast on a large table.
+TIMINGS_SAMPLE_SIZE = 1000
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = (
@@ -12,11 +16,15 @@ class DocumentAdmin(admin.ModelAdmin):
         "owner",
         "uploaded_at",
         "is_processed",
+        "ingestion_status",
+        "ingestion_progress",
+        "answer_cache_hit_rate",
     )
     list_filter = (
         "uploaded_at",
         "owner",
         "is_processed",
+        "ingestion_status",
     )
     search_fields = (
         "filename",
@@ -24,47 +32,119 @@ class DocumentAdmin(admin.ModelAdmin):
     )
     ordering = ("-uploaded_at",)
 
-    readonly_fields = ("uploaded_at", "is_processed")
+    readonly_fields = (
+        "uploaded_at",
+        "is_processed",
+        "ingestion_status",
+        "ingestion_progress",
+        "ingestion_error",
+    )
 
     actions = ["rebuild_faiss_index"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            query_count=Count("queries"),
+            cache_hit_count=Count("queries", filter=Q(queries__cache_hit=True)),
+        )
+
+    @admin.display(description="Answer cache hit rate", ordering="cache_hit_count")
+    def answer_cache_hit_rate(self, obj):
+        if not obj.query_count:
+            return "-"
+        return f"{obj.cache_hit_count / obj.query_count:.0%} ({obj.cache_hit_count}/{obj.query_count})"
+
     @admin.action(description="Ingest (build FAISS index)")
     def rebuild_faiss_index(self, request, queryset):
-        #embedding_provider = DummyEmbeddingProvider()
-        embedding_provider = HuggingFaceEmbeddingProvider()
-
-        rebuilt = 0
+        queued = 0
         skipped = 0
-        failed = 0
 
         for document in queryset:
             if not document.pdf_file:
                 skipped += 1
                 continue
 
-            try:
-                ingest_document(
-                    document=document,
-                    embedding_provider=embedding_provider,
-                )
-                rebuilt += 1
-            except Exception as e:
-                failed += 1
-                self.message_user(
-                    request,
-                    f"Failed to ingest document {document.id}: {e}",
-                    level=messages.ERROR,
-                )
+            enqueue_ingestion(document, force=True)
+            queued += 1
 
         self.message_user(
             request,
-            f"Ingestion complete — rebuilt: {rebuilt}, skipped: {skipped}, failed: {failed}.",
+            f"Ingestion queued — queued: {queued}, skipped: {skipped}. "
+            "Run `manage.py ingestion_worker` to process the queue.",
             level=messages.SUCCESS,
         )
 
 
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "document",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_after",
+        "worker",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = (
+        "created_at",
+        "started_at",
+        "locked_at",
+        "finished_at",
+        "worker",
+        "last_error",
+    )
+
+
 @admin.register(QueryLog)
 class QueryLogAdmin(admin.ModelAdmin):
-    list_display = ("id", "document", "created_at", "latency_ms", "tokens_used")
-    list_filter = ("created_at",)
+    list_display = (
+        "id",
+        "document",
+        "owner",
+        "created_at",
+        "latency_ms",
+        "tokens_used",
+        "context_tokens",
+        "context_token_budget",
+        "cache_hit",
+    )
+    list_filter = ("created_at", "cache_hit")
     search_fields = ("question",)
+    exclude = ("question_embedding",)
+    readonly_fields = ("timings",)
+
+    def changelist_view(self, request, extra_context=None):
+        totals = self.get_queryset(request).aggregate(
+            total=Count("id"),
+            hits=Count("id", filter=Q(cache_hit=True)),
+        )
+        if totals["total"]:
+            self.message_user(
+                request,
+                f"Answer cache hit rate: {totals['hits'] / totals['total']:.1%} "
+                f"({totals['hits']} of {totals['total']} queries)",
+                level=messages.INFO,
+            )
+
+        recent = (
+            self.get_queryset(request)
+            .filter(timings__isnull=False)
+            .order_by("-created_at")
+            .values_list("timings", flat=True)[:TIMINGS_SAMPLE_SIZE]
+        )
+        aggregates = aggregate_timings(recent)
+        if aggregates:
+            stages = "; ".join(
+                f"{name} {a['p50']:.0f}/{a['p95']:.0f}/{a['p99']:.0f}"
+                for name, a in aggregates.items()
+            )
+            self.message_user(
+                request,
+                f"Latency p50/p95/p99 in ms over the last {aggregates['total']['count']} "
+                f"traced queries: {stages}",
+                level=messages.INFO,
+            )
+        return super().changelist_view(request, extra_context=extra_context)
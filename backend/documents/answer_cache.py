@@ -0,0 +1,82 @@
+from typing import List, Optional, Sequence, Set
+import numpy as np
+from django.conf import settings
+from .models import Document, QueryLog
+from llm.bm25 import tokenize
+from llm.prompts import REFUSAL_TEXT
+
+
+def encode_embedding(embedding: List[float]) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def question_identifiers(question: str) -> Set[str]:
+    # Terms with digits (SG-01, 4.2, SYS_123) barely move a sentence
+    # embedding, yet "clause 4.2" and "clause 4.3" have different answers.
+    return {term for term in tokenize(question) if any(c.isdigit() for c in term)}
+
+
+def find_cached_answer(
+    document: Document, question: str, query_embedding: List[float], *, model: str
+) -> Optional[QueryLog]:
+    return find_cached_answers(document, [question], [query_embedding], model=model)[0]
+
+
+def find_cached_answers(
+    document: Document, questions: Sequence[str], query_embeddings, *, model: str
+) -> List[Optional[QueryLog]]:
+    # One candidate query and one similarity matrix for all questions.
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    if not settings.ANSWER_CACHE_ENABLED or not len(queries):
+        return [None] * len(queries)
+
+    # Only answers the same LLM produced against the current index are
+    # candidates; earlier cache hits just repeat one of them.
+    candidates = list(
+        QueryLog.objects.filter(
+            document=document,
+            index_generation=document.index_generation,
+            llm_model=model,
+            cache_hit=False,
+            question_embedding__isnull=False,
+        )
+        .exclude(answer=REFUSAL_TEXT)
+        .order_by("-created_at")
+        .values_list("id", "question", "question_embedding")[: settings.ANSWER_CACHE_MAX_CANDIDATES]
+    )
+
+    ids = []
+    candidate_identifiers = []
+    vectors = []
+    for log_id, candidate_question, blob in candidates:
+        vector = np.frombuffer(bytes(blob), dtype=np.float32)
+        if vector.shape == queries.shape[1:]:
+            ids.append(log_id)
+            candidate_identifiers.append(question_identifiers(candidate_question))
+            vectors.append(vector)
+
+    if not vectors:
+        return [None] * len(queries)
+
+    matrix = np.vstack(vectors)
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = np.inf
+    query_norms = np.linalg.norm(queries, axis=1)
+    # (candidates, queries); zero queries never match.
+    similarities = (matrix @ queries.T) / np.outer(norms, np.where(query_norms == 0, np.inf, query_norms))
+
+    # A candidate naming other identifiers never matches, however close.
+    for j, question in enumerate(questions):
+        identifiers = question_identifiers(question)
+        for row, candidate in enumerate(candidate_identifiers):
+            if candidate != identifiers:
+                similarities[row, j] = -np.inf
+
+    best = np.argmax(similarities, axis=0)
+    matches = {
+        j: ids[row]
+        for j, row in enumerate(best)
+        if similarities[row, j] >= settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+    }
+    logs = QueryLog.objects.in_bulk(set(matches.values()))
+    return [logs.get(matches[j]) if j in matches else None for j in range(len(queries))]
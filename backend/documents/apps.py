@@ -7,3 +7,11 @@ sys.path.append(str(PROJECT_ROOT))
 class DocumentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "documents"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from django.conf import settings
+
+        if settings.PRELOAD_EMBEDDING_MODEL:
+            from .warmup import warm_start
+            warm_start()
@@ -0,0 +1,249 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, List, Tuple, Union
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from llm.chains import get_rag_chain
+from llm.embeddings import EmbeddingProvider
+from llm.grounding import enforce_grounding
+from llm.tracing import Trace
+from .answer_cache import find_cached_answer
+from .models import Document, QueryLog
+from .services import (
+    GREETING_ANSWER,
+    _build_batch_logs,
+    _embed_question_batch,
+    _find_cached_batch_answers,
+    _is_greeting,
+    _load_indexed_vector_store,
+    _load_vector_store,
+    _log_cache_hit,
+    _log_summary,
+    _retrieve_batch_contexts,
+    _save_batch_logs,
+    get_llm_model_name,
+    log_answer,
+    log_query,
+    retrieve_document_context,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BLOCKING_EXECUTOR_WORKERS,
+                    thread_name_prefix="chatpdf-blocking",
+                )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    # CPU-bound work (embedding, FAISS search, token counting) runs on a
+    # dedicated pool so it neither blocks the event loop nor queues behind
+    # the single thread that sync_to_async uses for the ORM. FAISS and
+    # tokenizers release the GIL, so these threads run in parallel.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), partial(func, *args, **kwargs))
+
+
+async def _aload_vector_store(document: Document, embedding_provider: EmbeddingProvider):
+    # Reading and deserializing the index runs on the blocking pool; only a
+    # document that must be rebuilt or requeued takes the ORM thread.
+    vector_store = await run_blocking(_load_indexed_vector_store, document, embedding_provider)
+    if vector_store is None:
+        vector_store = await sync_to_async(_load_vector_store)(document, embedding_provider)
+    return vector_store
+
+
+async def _embed_question(embedding_provider: EmbeddingProvider, question: str) -> List[float]:
+    return (await run_blocking(embedding_provider.embed, [question]))[0]
+
+
+async def aanswer_document_question(
+    *,
+    user,
+    document: Document,
+    question: str,
+    embedding_provider: EmbeddingProvider,
+    llm,
+) -> QueryLog:
+    if _is_greeting(question):
+        return await sync_to_async(log_query)(
+            document, question, GREETING_ANSWER, latency_ms=0, tokens_used=0
+        )
+
+    trace = Trace()
+    with trace.span("index_load"):
+        vector_store = await _aload_vector_store(document, embedding_provider)
+
+    with trace.span("embed_query"):
+        query_embedding = await _embed_question(embedding_provider, question)
+    with trace.span("cache_lookup"):
+        cached = await sync_to_async(find_cached_answer)(
+            document, question, query_embedding, model=get_llm_model_name(llm)
+        )
+    if cached is not None:
+        return await sync_to_async(_log_cache_hit)(document, question, cached, trace)
+
+    packed = await run_blocking(
+        retrieve_document_context,
+        question=question,
+        query_embedding=query_embedding,
+        embedding_provider=embedding_provider,
+        vector_store=vector_store,
+        llm=llm,
+        trace=trace,
+    )
+
+    # The event loop is free while the provider generates the answer.
+    chain = get_rag_chain(llm)
+    with trace.span("llm_total"):
+        raw_answer = await chain.ainvoke(
+            {
+                "question": question,
+                "context": packed.text,
+            }
+        )
+
+    with trace.span("grounding"):
+        answer = enforce_grounding(
+            answer=raw_answer,
+            citations=packed.citations,
+        )
+
+    return await sync_to_async(log_answer)(
+        document,
+        question,
+        answer,
+        trace=trace,
+        packed=packed,
+        llm=llm,
+        query_embedding=query_embedding,
+    )
+
+
+async def astream_document_answer(
+    *,
+    user,
+    document: Document,
+    question: str,
+    embedding_provider: EmbeddingProvider,
+    llm,
+) -> AsyncIterator[Tuple[str, dict]]:
+    # Same events as services.stream_document_answer.
+    if _is_greeting(question):
+        log = await sync_to_async(log_query)(
+            document, question, GREETING_ANSWER, latency_ms=0, tokens_used=0
+        )
+        yield "token", {"text": GREETING_ANSWER}
+        yield "done", _log_summary(log)
+        return
+
+    trace = Trace()
+    with trace.span("index_load"):
+        vector_store = await _aload_vector_store(document, embedding_provider)
+
+    with trace.span("embed_query"):
+        query_embedding = await _embed_question(embedding_provider, question)
+    with trace.span("cache_lookup"):
+        cached = await sync_to_async(find_cached_answer)(
+            document, question, query_embedding, model=get_llm_model_name(llm)
+        )
+    if cached is not None:
+        log = await sync_to_async(_log_cache_hit)(document, question, cached, trace)
+        yield "token", {"text": log.answer}
+        yield "done", _log_summary(log)
+        return
+
+    packed = await run_blocking(
+        retrieve_document_context,
+        question=question,
+        query_embedding=query_embedding,
+        embedding_provider=embedding_provider,
+        vector_store=vector_store,
+        llm=llm,
+        trace=trace,
+    )
+
+    parts: List[str] = []
+
+    if packed.citations:
+        chain = get_rag_chain(llm)
+        with trace.span("llm_total"):
+            llm_start = time.perf_counter()
+            async for token in chain.astream(
+                {
+                    "question": question,
+                    "context": packed.text,
+                }
+            ):
+                if token:
+                    if not parts:
+                        trace.record("llm_first_token", (time.perf_counter() - llm_start) * 1000)
+                    parts.append(token)
+                    yield "token", {"text": token}
+
+    raw_answer = "".join(parts)
+    with trace.span("grounding"):
+        answer = enforce_grounding(
+            answer=raw_answer,
+            citations=packed.citations,
+        )
+    if answer != raw_answer:
+        yield "token", {"text": answer}
+
+    log = await sync_to_async(log_answer)(
+        document,
+        question,
+        answer,
+        trace=trace,
+        packed=packed,
+        llm=llm,
+        query_embedding=query_embedding,
+    )
+    yield "done", _log_summary(log)
+
+
+async def aanswer_document_questions(
+    *,
+    user,
+    document: Document,
+    questions: List[str],
+    embedding_provider: EmbeddingProvider,
+    llm,
+) -> List[Union[QueryLog, Exception]]:
+    # Same results as services.answer_document_questions. Embedding, search
+    # and log building run on the blocking pool, the cache lookup and the
+    # INSERT on the ORM thread, and the LLM calls through chain.abatch, so
+    # the event loop stays free while a long checklist is answered.
+    trace = Trace()
+    with trace.span("index_load"):
+        vector_store = await _aload_vector_store(document, embedding_provider)
+
+    batch = await run_blocking(_embed_question_batch, questions, embedding_provider, trace)
+    await sync_to_async(_find_cached_batch_answers)(document, batch, llm, trace)
+    await run_blocking(_retrieve_batch_contexts, batch, vector_store, llm, trace)
+
+    raw_answers: Dict[int, object] = {}
+    if batch.llm_indexes:
+        chain = get_rag_chain(llm)
+        with trace.span("llm_total"):
+            outputs = await chain.abatch(
+                batch.llm_inputs(),
+                config={"max_concurrency": settings.BATCH_QUERY_LLM_CONCURRENCY},
+                return_exceptions=True,
+            )
+        raw_answers = dict(zip(batch.llm_indexes, outputs))
+
+    results = await run_blocking(_build_batch_logs, document, batch, raw_answers, llm, trace)
+    await sync_to_async(_save_batch_logs)(results, trace)
+    return results
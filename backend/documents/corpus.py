@@ -0,0 +1,101 @@
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable
+from django.conf import settings
+from llm.corpus import MANIFEST_NAME, CorpusVectorStore, append_segment, has_corpus
+from llm.embeddings import EmbeddingProvider
+from llm.retrieval_faiss import load_faiss_store
+from llm.vectorstore import FAISSVectorStore
+from .index_cache import get_index_cache
+from .models import Document
+
+CORPUS_CACHE_KEY = "corpus"
+
+
+def get_corpus_index_dir() -> Path:
+    return Path(settings.VECTOR_INDEX_ROOT) / "corpus"
+
+
+@contextmanager
+def _corpus_lock():
+    # Serializes writers of the corpus manifest across ingestion processes.
+    # Readers never take it: they load whichever manifest is in place.
+    index_dir = get_corpus_index_dir()
+    index_dir.mkdir(parents=True, exist_ok=True)
+    with open(index_dir / ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield index_dir
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_corpus(index_dir: Path, dim: int) -> CorpusVectorStore:
+    corpus = CorpusVectorStore(dim=dim)
+    if has_corpus(index_dir):
+        corpus.load(index_dir)
+    return corpus
+
+
+def _compact(index_dir: Path, dim: int) -> None:
+    corpus = _load_corpus(index_dir, dim)
+    corpus.save(index_dir)
+
+
+def _append(index_dir: Path, dim: int, documents=(), *, removed=()) -> None:
+    # Corpora written before segments are converted on their first update.
+    if has_corpus(index_dir) and not (index_dir / MANIFEST_NAME).exists():
+        _compact(index_dir, dim)
+
+    manifest = append_segment(index_dir, documents, removed=removed)
+    if len(manifest["segments"]) > settings.CORPUS_MAX_SEGMENTS:
+        _compact(index_dir, dim)
+
+
+def add_to_corpus_index(document: Document, vector_store: FAISSVectorStore) -> None:
+    # Writes one segment for this document; the rest of the corpus is not
+    # read.
+    embeddings = vector_store.raw_vectors()
+    with _corpus_lock() as index_dir:
+        _append(
+            index_dir,
+            vector_store.dim,
+            [(document.id, document.owner_id, embeddings, list(vector_store.metadatas))],
+        )
+    get_index_cache().invalidate(CORPUS_CACHE_KEY)
+
+
+def remove_from_corpus_index(document_id: int) -> None:
+    if not has_corpus(get_corpus_index_dir()):
+        return
+    with _corpus_lock() as index_dir:
+        _append(index_dir, 1, removed=[document_id])
+    get_index_cache().invalidate(CORPUS_CACHE_KEY)
+
+
+def load_corpus_store(embedding_provider: EmbeddingProvider) -> CorpusVectorStore:
+    index_dir = get_corpus_index_dir()
+    if not has_corpus(index_dir):
+        return CorpusVectorStore(dim=embedding_provider.dim)
+
+    return get_index_cache().get(
+        CORPUS_CACHE_KEY,
+        index_dir=index_dir,
+        embedding_provider=embedding_provider,
+        loader=lambda path: _load_corpus(path, embedding_provider.dim),
+    )
+
+
+def ensure_in_corpus(documents: Iterable[Document], embedding_provider: EmbeddingProvider) -> None:
+    # Documents ingested before the corpus index existed are copied in from
+    # their per-document index the first time they are queried.
+    corpus = load_corpus_store(embedding_provider)
+    for document in documents:
+        if not document.is_processed or corpus.has_document(document.id):
+            continue
+        index_dir = Path(settings.VECTOR_INDEX_ROOT) / f"document_{document.id}"
+        if not index_dir.exists():
+            continue
+        store = load_faiss_store(index_dir=index_dir, embedding_provider=embedding_provider)
+        add_to_corpus_index(document, store)
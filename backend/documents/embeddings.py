@@ -0,0 +1,51 @@
+import threading
+from django.conf import settings
+from llm.embeddings import EmbeddingProvider, HuggingFaceEmbeddingProvider
+from llm.embedding_cache import CachedEmbeddingProvider
+from .metrics import EMBEDDING_CACHE_LOOKUPS, MeteredEmbeddingProvider
+
+_model_provider = None
+_embedding_provider = None
+_embedding_provider_lock = threading.Lock()
+
+
+def get_query_embedding_provider() -> EmbeddingProvider:
+    # Questions bypass the persistent cache: they rarely repeat verbatim, and
+    # writing one would take the cache's file lock and fsync on every
+    # request while growing it with one-off texts.
+    global _model_provider
+    if _model_provider is None:
+        with _embedding_provider_lock:
+            if _model_provider is None:
+                _model_provider = MeteredEmbeddingProvider(
+                    HuggingFaceEmbeddingProvider(
+                        batch_size=settings.EMBEDDING_BATCH_SIZE,
+                    )
+                )
+    return _model_provider
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    # For ingestion and index rebuilds, whose chunk texts do repeat.
+    global _embedding_provider
+    if _embedding_provider is None:
+        provider = get_query_embedding_provider()
+        with _embedding_provider_lock:
+            if _embedding_provider is None:
+                if settings.EMBEDDING_CACHE_ENABLED:
+                    provider = CachedEmbeddingProvider(
+                        provider,
+                        cache_dir=settings.EMBEDDING_CACHE_ROOT,
+                        on_lookup=lambda result, count: EMBEDDING_CACHE_LOOKUPS.labels(result=result).inc(count),
+                    )
+                _embedding_provider = provider
+    return _embedding_provider
+
+
+def get_document_embedding_provider(query_provider: EmbeddingProvider) -> EmbeddingProvider:
+    # Views hand the query provider down to the services; chunk texts that
+    # are embedded on such a request (a legacy index rebuilt on its first
+    # question) go through the cached provider around the same model.
+    if query_provider is _model_provider:
+        return get_embedding_provider()
+    return query_provider
@@ -0,0 +1,19 @@
+import threading
+from django.conf import settings
+from llm.index_cache import FAISSIndexCache
+from .metrics import INDEX_CACHE_LOOKUPS
+
+_index_cache = None
+_index_cache_lock = threading.Lock()
+
+
+def get_index_cache() -> FAISSIndexCache:
+    global _index_cache
+    if _index_cache is None:
+        with _index_cache_lock:
+            if _index_cache is None:
+                _index_cache = FAISSIndexCache(
+                    max_bytes=settings.VECTOR_INDEX_CACHE_MAX_BYTES,
+                    on_lookup=lambda result: INDEX_CACHE_LOOKUPS.labels(result=result).inc(),
+                )
+    return _index_cache
@@ -1,12 +1,26 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np
 from django.conf import settings
-from django.db import transaction
+from django.db.models import F
 from .models import Document
-from llm.chunking import chunk_text
+from llm.chunking import iter_chunks
+from llm.embedding_cache import hash_text
 from llm.embeddings import EmbeddingProvider
+from llm.extraction import ExtractedText, extract_pdf_text
 from llm.vectorstore import FAISSVectorStore
-from pypdf import PdfReader
-import io
+from .index_cache import get_index_cache
+from .corpus import add_to_corpus_index
+from .metrics import INGESTION_CHUNKS, INGESTION_DURATION
+
+# Upper bound on chunks held before adding them to the index when most of
+# them reuse a previous vector and no embedding batch fills up.
+REUSED_FLUSH_SIZE = 1024
 
 class IngestionError(Exception):
     pass
@@ -14,16 +28,9 @@ class IngestionError(Exception):
 def get_document_index_dir(document_id: int) -> Path:
     return Path(settings.VECTOR_INDEX_ROOT) / f"document_{document_id}"
 
-@transaction.atomic
-def ingest_document(
-    *,
-    document: Document,
-    embedding_provider: EmbeddingProvider,
-) -> None:
-
-    if document.is_processed:
-        return
-
+def extract_document_text(
+    document: Document, *, extraction_workers: Optional[int] = None
+) -> ExtractedText:
     if not document.pdf_file:
         raise IngestionError("Document has no file attached")
 
@@ -37,50 +44,218 @@ def ingest_document(
 
     if filename.endswith(".pdf"):
         try:
-            reader = PdfReader(io.BytesIO(raw_bytes))
-            text = ""
-            for page in reader.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + "\n"
+            return extract_pdf_text(
+                raw_bytes,
+                max_workers=extraction_workers or settings.PDF_EXTRACTION_WORKERS,
+            )
         except Exception as e:
             raise IngestionError(f"Failed to extract PDF text: {e}")
-    else:
-        try:
-            text = raw_bytes.decode("utf-8", errors="ignore")
-        except Exception as e:
-            raise IngestionError(f"Failed to decode document: {e}")
 
-    print("TEXT LENGTH:", len(text))
+    try:
+        return ExtractedText(text=raw_bytes.decode("utf-8", errors="ignore"))
+    except Exception as e:
+        raise IngestionError(f"Failed to decode document: {e}")
 
-    if not text.strip():
-        raise IngestionError("Document text is empty")
+def document_chunks(extracted: ExtractedText) -> Iterator[dict]:
+    return iter_chunks(
+        extracted.text,
+        max_tokens=settings.CHUNK_MAX_TOKENS,
+        page_offsets=extracted.page_offsets,
+    )
 
-    chunks = chunk_text(text)
-    if not chunks:
-        raise IngestionError("No chunks produced during ingestion")
+def mark_index_rebuilt(document: Document) -> None:
+    Document.objects.filter(id=document.id).update(
+        is_processed=True,
+        index_generation=F("index_generation") + 1,
+    )
+    document.refresh_from_db(fields=["is_processed", "index_generation"])
+
+def chunk_hash(text: str, embedding_provider: EmbeddingProvider) -> str:
+    # Keyed on the provider too, so switching embedding models re-embeds
+    # everything instead of mixing vectors from two models.
+    return hash_text(f"{embedding_provider.cache_namespace}\n{text}").hex()
+
+def load_previous_store(index_dir: Path, embedding_provider: EmbeddingProvider) -> Optional[FAISSVectorStore]:
+    if not (index_dir / "index.faiss").exists():
+        return None
+    try:
+        store = FAISSVectorStore(dim=embedding_provider.dim)
+        store.load(index_dir)
+    except Exception:
+        return None
+    if store.dim != embedding_provider.dim:
+        return None
+    return store
+
+def _previous_rows(previous: Optional[FAISSVectorStore]) -> Dict[str, int]:
+    if previous is None or previous.ntotal == 0:
+        return {}
 
-    texts = [c["chunk_text"] for c in chunks]
-    embeddings = embedding_provider.embed(texts)
+    rows: Dict[str, int] = {}
+    for row, meta in enumerate(previous.metadatas):
+        h = meta.get("chunk_hash")
+        if h is not None:
+            rows.setdefault(h, row)
+    return rows
 
-    if len(embeddings) != len(chunks):
-        raise IngestionError("Embedding count mismatch")
+def build_vector_store(
+    chunks: Iterable[dict],
+    embedding_provider: EmbeddingProvider,
+    *,
+    progress: Optional[Callable[[dict], None]] = None,
+    previous: Optional[FAISSVectorStore] = None,
+) -> FAISSVectorStore:
+    # Consumes chunks as they are produced. A chunk whose hash matches a chunk
+    # of the previous index reuses its vector; only new or edited chunks are
+    # sent to the embedding provider, and vectors of chunks that disappeared
+    # are simply not carried over.
+    previous_rows = _previous_rows(previous)
+    previous_vectors = previous.raw_vectors() if previous_rows else None
 
-    vector_store = FAISSVectorStore(dim=embedding_provider.dim)
-    vector_store.add(
-        embeddings=embeddings,
-        metadatas=chunks,
+    vector_store = FAISSVectorStore(
+        dim=embedding_provider.dim,
+        keep_raw_vectors=True,
+        **settings.VECTOR_INDEX_OPTIONS,
     )
+    batch_size = settings.EMBEDDING_BATCH_SIZE
+    buffered: List[dict] = []
+    vectors: List[Optional[np.ndarray]] = []
+
+    # Buffered chunks are added in order once a full batch needs embedding
+    # (or enough reused vectors piled up), so memory is bounded by the batch
+    # size rather than the document size.
+    def flush():
+        pending = [i for i, v in enumerate(vectors) if v is None]
+        if pending:
+            embedded = embedding_provider.embed_array([buffered[i]["chunk_text"] for i in pending])
+            if len(embedded) != len(pending):
+                raise IngestionError("Embedding count mismatch")
+            for i, vector in zip(pending, embedded):
+                vectors[i] = vector
+        vector_store.add(np.stack(vectors), list(buffered))
+        if progress is not None:
+            progress(buffered[-1])
+        buffered.clear()
+        vectors.clear()
+
+    pending_count = 0
+    for chunk in chunks:
+        chunk["chunk_hash"] = chunk_hash(chunk["chunk_text"], embedding_provider)
+        row = previous_rows.get(chunk["chunk_hash"])
+        buffered.append(chunk)
+        vectors.append(previous_vectors[row] if row is not None else None)
+        if row is None:
+            pending_count += 1
+
+        if pending_count >= batch_size or len(buffered) >= REUSED_FLUSH_SIZE:
+            flush()
+            pending_count = 0
+
+    if buffered:
+        flush()
+
+    return vector_store
+
+def write_index_atomically(vector_store: FAISSVectorStore, index_dir: Path) -> None:
+    # index_dir is a symlink to a versioned sibling directory. The new version
+    # is written to a temp dir, renamed into place and the symlink swapped
+    # with os.replace, so readers see either the old or the new index, never
+    # a partially written one.
+    index_dir = Path(index_dir)
+    root = index_dir.parent
+    root.mkdir(parents=True, exist_ok=True)
+
+    tmp_dir = Path(tempfile.mkdtemp(dir=root, prefix=f".{index_dir.name}.tmp-"))
+    try:
+        vector_store.save(tmp_dir)
+        version_dir = root / f"{index_dir.name}.v{time.time_ns()}"
+        os.rename(tmp_dir, version_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    previous = index_dir.resolve() if index_dir.is_symlink() else None
+    if index_dir.exists() and not index_dir.is_symlink():
+        # Directories written before versioning: move aside so the symlink
+        # can take their place.
+        legacy = root / f"{index_dir.name}.v0"
+        os.rename(index_dir, legacy)
+        previous = legacy
+
+    # Unique per call: two threads of one process may swap the same document.
+    link_tmp = root / f".{index_dir.name}.link-{os.getpid()}-{uuid.uuid4().hex}"
+    os.symlink(version_dir.name, link_tmp)
+    os.replace(link_tmp, index_dir)
+
+    _remove_old_versions(index_dir, keep={version_dir, previous})
+
+def _remove_old_versions(index_dir: Path, *, keep) -> None:
+    # The version just replaced is kept for readers that resolved the symlink
+    # before the swap and are still opening its files.
+    for path in index_dir.parent.glob(f"{index_dir.name}.v*"):
+        if path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+def _report_progress(progress: Optional[Callable[[int], None]], percent: int) -> None:
+    if progress is not None:
+        progress(percent)
+
+# Not wrapped in a transaction: the only write is the final is_processed
+# update, and progress updates must be visible to other connections while
+# a background worker is still embedding.
+def ingest_document(
+    *,
+    document: Document,
+    embedding_provider: EmbeddingProvider,
+    force: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+    extraction_workers: Optional[int] = None,
+) -> None:
+
+    if document.is_processed and not force:
+        return
+
+    start = time.perf_counter()
+    try:
+        vector_store = _ingest(document, embedding_provider, progress, extraction_workers)
+    except Exception:
+        INGESTION_DURATION.labels(result="failed").observe(time.perf_counter() - start)
+        raise
+    INGESTION_DURATION.labels(result="succeeded").observe(time.perf_counter() - start)
+    INGESTION_CHUNKS.observe(vector_store.ntotal)
+
+def _ingest(
+    document: Document,
+    embedding_provider: EmbeddingProvider,
+    progress: Optional[Callable[[int], None]],
+    extraction_workers: Optional[int],
+) -> FAISSVectorStore:
+    extracted = extract_document_text(document, extraction_workers=extraction_workers)
+    text = extracted.text
+
+    print("TEXT LENGTH:", len(text))
+    _report_progress(progress, 20)
+
+    if not text.strip():
+        raise IngestionError("Document text is empty")
+
+    _report_progress(progress, 30)
 
     index_dir = get_document_index_dir(document.id)
 
-    if index_dir.exists():
-        for f in index_dir.iterdir():
-            f.unlink()
-    else:
-        index_dir.mkdir(parents=True, exist_ok=True)
+    vector_store = build_vector_store(
+        document_chunks(extracted),
+        embedding_provider,
+        progress=lambda chunk: _report_progress(progress, 30 + 50 * chunk["char_end"] // len(text)),
+        previous=load_previous_store(index_dir, embedding_provider),
+    )
+    if vector_store.ntotal == 0:
+        raise IngestionError("No chunks produced during ingestion")
 
-    vector_store.save(index_dir)
+    write_index_atomically(vector_store, index_dir)
+    get_index_cache().invalidate(document.id)
+    add_to_corpus_index(document, vector_store)
 
-    document.is_processed = True
-    document.save(update_fields=["is_processed"])
\ No newline at end of file
+    mark_index_rebuilt(document)
+    _report_progress(progress, 100)
+    return vector_store
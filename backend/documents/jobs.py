@@ -0,0 +1,253 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from contextlib import contextmanager
+from typing import Callable, Optional
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Document, IngestionJob
+from .ingestion import ingest_document
+from llm.embeddings import EmbeddingProvider
+
+ACTIVE_JOB_STATUSES = (IngestionJob.Status.PENDING, IngestionJob.Status.RUNNING)
+LEASE_EXPIRED_ERROR = "Worker stopped before the job finished (lease expired)"
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _set_document_status(document_id: int, status: str, **fields) -> None:
+    Document.objects.filter(id=document_id).update(ingestion_status=status, **fields)
+
+
+@transaction.atomic
+def enqueue_ingestion(document: Document, *, force: bool = False) -> IngestionJob:
+    active = (
+        IngestionJob.objects.filter(document=document, status__in=ACTIVE_JOB_STATUSES)
+        .order_by("-created_at")
+        .first()
+    )
+    if active is not None:
+        if force and not active.force:
+            IngestionJob.objects.filter(id=active.id).update(force=True)
+            active.force = True
+        return active
+
+    job = IngestionJob.objects.create(
+        document=document,
+        force=force,
+        max_attempts=settings.INGESTION_MAX_ATTEMPTS,
+    )
+    _set_document_status(
+        document.id,
+        Document.IngestionStatus.QUEUED,
+        ingestion_progress=0,
+        ingestion_error="",
+    )
+    return job
+
+
+def claim_next_job(worker_name: str) -> Optional[IngestionJob]:
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.INGESTION_JOB_TIMEOUT_SECONDS)
+
+    # Jobs whose worker died mid-run are picked up again once their lease
+    # expires, unless they have used up their attempts: a PDF that kills
+    # its worker (OOM, segfault) would otherwise be re-claimed forever.
+    expired = IngestionJob.objects.filter(
+        status=IngestionJob.Status.RUNNING,
+        locked_at__lt=lease_expired,
+    )
+    exhausted = list(
+        expired.filter(attempts__gte=F("max_attempts")).values_list("id", "document_id")
+    )
+    for job_id, document_id in exhausted:
+        failed = IngestionJob.objects.filter(
+            id=job_id,
+            status=IngestionJob.Status.RUNNING,
+        ).update(
+            status=IngestionJob.Status.FAILED,
+            finished_at=now,
+            last_error=LEASE_EXPIRED_ERROR,
+        )
+        if failed:
+            _set_document_status(
+                document_id,
+                Document.IngestionStatus.FAILED,
+                ingestion_error=LEASE_EXPIRED_ERROR,
+            )
+    expired.filter(attempts__lt=F("max_attempts")).update(status=IngestionJob.Status.PENDING)
+
+    candidates = list(
+        IngestionJob.objects.filter(
+            status=IngestionJob.Status.PENDING,
+            run_after__lte=now,
+        )
+        .order_by("run_after", "id")
+        .values_list("id", flat=True)[:10]
+    )
+
+    for job_id in candidates:
+        # Conditional update instead of SELECT ... FOR UPDATE so claiming
+        # also works on SQLite: only one worker sees a row count of 1.
+        claimed = IngestionJob.objects.filter(
+            id=job_id,
+            status=IngestionJob.Status.PENDING,
+        ).update(
+            status=IngestionJob.Status.RUNNING,
+            started_at=now,
+            locked_at=now,
+            worker=worker_name,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return IngestionJob.objects.select_related("document").get(id=job_id)
+
+    return None
+
+
+def _current_claim(job: IngestionJob):
+    # The claim is identified by its attempt: once the lease expires and
+    # another worker re-claims the job, attempts moves on and this filter
+    # no longer matches, so the stale worker cannot touch the job.
+    return IngestionJob.objects.filter(
+        id=job.id,
+        status=IngestionJob.Status.RUNNING,
+        worker=job.worker,
+        attempts=job.attempts,
+    )
+
+
+def renew_lease(job: IngestionJob) -> bool:
+    return bool(_current_claim(job).update(locked_at=timezone.now()))
+
+
+@contextmanager
+def _lease_heartbeat(job: IngestionJob):
+    stop = threading.Event()
+
+    def beat() -> None:
+        try:
+            while not stop.wait(settings.INGESTION_JOB_HEARTBEAT_SECONDS):
+                if not renew_lease(job):
+                    return
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"ingestion-lease-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(
+    job: IngestionJob,
+    *,
+    embedding_provider: EmbeddingProvider,
+    extraction_workers: Optional[int] = None,
+) -> bool:
+    document = job.document
+    _set_document_status(document.id, Document.IngestionStatus.RUNNING, ingestion_progress=0)
+
+    def progress(percent: int) -> None:
+        Document.objects.filter(id=document.id).update(ingestion_progress=percent)
+
+    try:
+        with _lease_heartbeat(job):
+            ingest_document(
+                document=document,
+                embedding_provider=embedding_provider,
+                force=job.force,
+                progress=progress,
+                extraction_workers=extraction_workers,
+            )
+    except Exception as e:
+        error = f"{e}\n{traceback.format_exc()}"
+        if job.attempts < job.max_attempts:
+            delay = settings.INGESTION_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1)
+            released = _current_claim(job).update(
+                status=IngestionJob.Status.PENDING,
+                run_after=timezone.now() + timedelta(seconds=delay),
+                last_error=error,
+            )
+            if released:
+                _set_document_status(
+                    document.id,
+                    Document.IngestionStatus.QUEUED,
+                    ingestion_error=str(e),
+                )
+        else:
+            failed = _current_claim(job).update(
+                status=IngestionJob.Status.FAILED,
+                finished_at=timezone.now(),
+                last_error=error,
+            )
+            if failed:
+                _set_document_status(
+                    document.id,
+                    Document.IngestionStatus.FAILED,
+                    ingestion_error=str(e),
+                )
+        return False
+
+    completed = _current_claim(job).update(
+        status=IngestionJob.Status.SUCCEEDED,
+        finished_at=timezone.now(),
+        last_error="",
+    )
+    if not completed:
+        # The lease was lost mid-run; the worker now holding the job
+        # reports its outcome.
+        return False
+    _set_document_status(
+        document.id,
+        Document.IngestionStatus.SUCCEEDED,
+        ingestion_progress=100,
+        ingestion_error="",
+    )
+    return True
+
+
+def run_next_job(
+    *,
+    embedding_provider: EmbeddingProvider,
+    worker_name: Optional[str] = None,
+    extraction_workers: Optional[int] = None,
+) -> bool:
+    job = claim_next_job(worker_name or default_worker_name())
+    if job is None:
+        return False
+    run_job(job, embedding_provider=embedding_provider, extraction_workers=extraction_workers)
+    return True
+
+
+def run_worker(
+    *,
+    embedding_provider_factory: Callable[[], EmbeddingProvider],
+    poll_interval: float = 2.0,
+    once: bool = False,
+    extraction_workers: Optional[int] = None,
+) -> None:
+    embedding_provider = embedding_provider_factory()
+    worker_name = default_worker_name()
+
+    while True:
+        close_old_connections()
+        ran = run_next_job(
+            embedding_provider=embedding_provider,
+            worker_name=worker_name,
+            extraction_workers=extraction_workers,
+        )
+        if not ran:
+            if once:
+                return
+            time.sleep(poll_interval)
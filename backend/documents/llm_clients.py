@@ -0,0 +1,131 @@
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+from django.conf import settings
+from .metrics import LLMMetricsHandler
+
+PROVIDER_MODELS = {
+    "gemini": "gemini-2.5-flash-lite",
+    "openai": "gpt-4o-mini",
+}
+
+
+# Provider SDKs are imported on first use: they are slow to import and
+# management commands, the ingestion worker and tests never need them.
+PROVIDER_MODULES = {
+    "gemini": "langchain_google_genai",
+    "openai": "langchain_openai",
+}
+
+
+def _build_gemini(model: str, api_key: str):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=api_key,
+        temperature=0,
+        callbacks=[LLMMetricsHandler("gemini")],
+    )
+
+
+def _build_openai(model: str, api_key: str):
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=model,
+        api_key=api_key,
+        temperature=0,
+        callbacks=[LLMMetricsHandler("openai")],
+    )
+
+
+PROVIDER_FACTORIES: Dict[str, Callable] = {
+    "gemini": _build_gemini,
+    "openai": _build_openai,
+}
+
+
+def import_provider_modules() -> None:
+    for module in PROVIDER_MODULES.values():
+        importlib.import_module(module)
+
+
+def client_key(provider: str, model: str, api_key: str) -> Tuple[str, str, str]:
+    # API keys are only held by the clients themselves, never as pool keys.
+    return provider, model, hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class LLMClientPool:
+    # Clients keep their HTTP connection pools alive, so reusing one skips
+    # client construction and the TLS handshake on later requests.
+    def __init__(self, max_size: int):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+
+        self.max_size = max_size
+        self._clients: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, provider: str, api_key: str):
+        factory = PROVIDER_FACTORIES.get(provider)
+        if factory is None:
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+        model = PROVIDER_MODELS[provider]
+        key = client_key(provider, model, api_key)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+
+        client = factory(model, api_key)
+
+        with self._lock:
+            # Another thread may have built the same client meanwhile; keep
+            # the one already pooled so its connections stay in use.
+            existing = self._clients.get(key)
+            if existing is not None:
+                self._clients.move_to_end(key)
+                return existing
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+            return client
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_llm_client_pool() -> LLMClientPool:
+    global _client_pool
+    if _client_pool is None:
+        with _client_pool_lock:
+            if _client_pool is None:
+                _client_pool = LLMClientPool(max_size=settings.LLM_CLIENT_POOL_SIZE)
+    return _client_pool
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+from multiprocessing.connection import wait
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from prometheus_client import multiprocess
+from chatpdf_backend.metrics_dir import remove_stale_metrics
+
+
+def _embedding_provider_factory():
+    from documents.embeddings import get_embedding_provider
+    return get_embedding_provider()
+
+
+def _worker_main(poll_interval: float, once: bool, extraction_workers: int) -> None:
+    import django
+    django.setup()
+
+    from documents.jobs import run_worker
+    run_worker(
+        embedding_provider_factory=_embedding_provider_factory,
+        poll_interval=poll_interval,
+        once=once,
+        extraction_workers=extraction_workers,
+    )
+
+
+class Command(BaseCommand):
+    help = "Run background workers that process queued document ingestion jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.INGESTION_WORKER_PROCESSES,
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is drained",
+        )
+        parser.add_argument(
+            "--extraction-workers",
+            type=int,
+            default=None,
+            help="PDF extraction processes per worker (default: cores / --processes)",
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options["processes"])
+        poll_interval = options["poll_interval"]
+        once = options["once"]
+        # PDF_EXTRACTION_WORKERS is sized for INGESTION_WORKER_PROCESSES; a
+        # different --processes splits the cores again.
+        extraction_workers = options["extraction_workers"]
+        if not extraction_workers:
+            if processes == settings.INGESTION_WORKER_PROCESSES:
+                extraction_workers = settings.PDF_EXTRACTION_WORKERS
+            else:
+                extraction_workers = max(1, (os.cpu_count() or 1) // processes)
+
+        # Workers record their metrics in the directory the web server's
+        # /metrics aggregates. prometheus_client reads it when it is first
+        # imported, which has already happened in this process, so workers
+        # are spawned rather than forked. Files of workers from an earlier
+        # run that died without cleanup are removed first.
+        metrics_dir = settings.PROMETHEUS_MULTIPROC_DIR
+        os.makedirs(metrics_dir, exist_ok=True)
+        remove_stale_metrics(Path(metrics_dir))
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+        context = multiprocessing.get_context("spawn")
+
+        # Child processes open their own database connections.
+        connections.close_all()
+
+        workers = [
+            context.Process(
+                target=_worker_main,
+                args=(poll_interval, once, extraction_workers),
+                name=f"ingestion-worker-{i}",
+            )
+            for i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        self.stdout.write(f"Started {processes} ingestion workers")
+
+        try:
+            # A worker that exits while the others keep running has its
+            # live gauges dropped right away, not when the command ends.
+            running = {worker.sentinel: worker for worker in workers}
+            while running:
+                for sentinel in wait(list(running)):
+                    worker = running.pop(sentinel)
+                    worker.join()
+                    multiprocess.mark_process_dead(worker.pid, metrics_dir)
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+        finally:
+            for worker in workers:
+                if worker.pid is not None and not worker.is_alive():
+                    multiprocess.mark_process_dead(worker.pid, metrics_dir)
@@ -0,0 +1,133 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter so modules already imported by manage.py do not
+# hide their cost. Each step only pays for what earlier steps did not import.
+IMPORT_SCRIPT = """
+import json, sys, time
+timings = {}
+start = time.perf_counter()
+import django
+django.setup()
+timings["django_setup"] = time.perf_counter() - start
+for module in sys.argv[1:]:
+    start = time.perf_counter()
+    try:
+        __import__(module)
+    except ImportError:
+        timings[module] = None
+        continue
+    timings[module] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+IMPORT_MODULES = [
+    "documents.urls",
+    "langchain_openai",
+    "langchain_google_genai",
+    "sentence_transformers",
+]
+
+QUESTION = "What are the safety requirements?"
+
+
+def _elapsed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Report import time and first-query latency of a fresh worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--document-id",
+            type=int,
+            help="Also time loading and searching this document's index",
+        )
+        parser.add_argument(
+            "--skip-imports",
+            action="store_true",
+            help="Do not measure import time in a fresh interpreter",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print the report as JSON",
+        )
+
+    def handle(self, *args, **options):
+        report = {}
+        if not options["skip_imports"]:
+            report["imports_s"] = self.measure_imports()
+        report["first_query_s"] = self.measure_first_query(options["document_id"])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        for section, timings in report.items():
+            self.stdout.write(section)
+            for name, seconds in timings.items():
+                if seconds is None:
+                    self.stdout.write(f"  {name:<32} {'not installed':>13}")
+                else:
+                    self.stdout.write(f"  {name:<32} {seconds * 1000:10.1f} ms")
+
+    def measure_imports(self):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "chatpdf_backend.settings"),
+            PRELOAD_EMBEDDING_MODEL="False",
+            # manage.py puts the project root (for the llm package) on sys.path.
+            PYTHONPATH=os.pathsep.join(p for p in sys.path if p),
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT, *IMPORT_MODULES],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Import timing failed:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def measure_first_query(self, document_id):
+        from documents.embeddings import get_embedding_provider
+
+        timings = {}
+        provider, timings["embedding_model_load"] = _elapsed(get_embedding_provider)
+        query_embedding, timings["first_embedding"] = _elapsed(lambda: provider.embed([QUESTION])[0])
+        _, timings["second_embedding"] = _elapsed(lambda: provider.embed([QUESTION]))
+
+        if document_id is None:
+            return timings
+
+        from documents.models import Document
+        from documents.services import _load_vector_store, retrieve_document_context
+
+        try:
+            document = Document.objects.get(id=document_id)
+        except Document.DoesNotExist:
+            raise CommandError(f"Document {document_id} does not exist")
+
+        def retrieve():
+            vector_store = _load_vector_store(document, provider)
+            return retrieve_document_context(
+                question=QUESTION,
+                query_embedding=query_embedding,
+                embedding_provider=provider,
+                vector_store=vector_store,
+                llm=None,
+            )
+
+        _, timings["first_retrieval"] = _elapsed(retrieve)
+        _, timings["second_retrieval"] = _elapsed(retrieve)
+        return timings
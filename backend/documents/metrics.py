@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Sequence
+from uuid import UUID
+import numpy as np
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from llm.embeddings import EmbeddingProvider
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py and the
+# ingestion_worker command) every process writes its samples to files in
+# that directory and /metrics aggregates all of them, so a scrape sees the
+# whole server, ingestion included, rather than one worker.
+
+REQUEST_LATENCY = Histogram(
+    "chatpdf_request_latency_seconds",
+    "Time until the response is returned, per route.",
+    ["view", "method", "status"],
+)
+INGESTION_DURATION = Histogram(
+    "chatpdf_ingestion_duration_seconds",
+    "Duration of ingest_document.",
+    ["result"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+INGESTION_CHUNKS = Histogram(
+    "chatpdf_ingestion_chunks",
+    "Chunks indexed per ingested document.",
+    buckets=(10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+INDEX_CACHE_LOOKUPS = Counter(
+    "chatpdf_index_cache_lookups_total",
+    "FAISS index cache lookups by result.",
+    ["result"],
+)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "chatpdf_embedding_cache_lookups_total",
+    "Texts looked up in the persistent embedding cache by result.",
+    ["result"],
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "chatpdf_embedding_batch_size",
+    "Texts per call to the embedding model.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+EMBEDDING_SECONDS = Histogram(
+    "chatpdf_embedding_seconds",
+    "Time per call to the embedding model.",
+)
+EMBEDDED_TEXTS = Counter(
+    "chatpdf_embedded_texts_total",
+    "Texts embedded by the model (throughput: rate of this over rate of "
+    "chatpdf_embedding_seconds_sum).",
+)
+LLM_LATENCY = Histogram(
+    "chatpdf_llm_latency_seconds",
+    "Duration of LLM calls by provider.",
+    ["provider"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+LLM_ERRORS = Counter(
+    "chatpdf_llm_errors_total",
+    "LLM failures by provider; kind is 'request' for a missing or unsupported "
+    "provider and 'call' for a failed LLM call.",
+    ["provider", "kind"],
+)
+
+
+def metrics_view(request):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    # Streaming responses are timed until their headers are returned.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, start)
+        return response
+
+    def _observe(self, request, response, start: float) -> None:
+        # Labelled by route pattern, not path, to keep the label set bounded.
+        match = getattr(request, "resolver_match", None)
+        REQUEST_LATENCY.labels(
+            view=match.route if match is not None else "unmatched",
+            method=request.method,
+            status=str(response.status_code),
+        ).observe(time.perf_counter() - start)
+
+
+class MeteredEmbeddingProvider(EmbeddingProvider):
+    # Wraps the model itself, under the embedding cache, so only texts that
+    # actually reach the model are counted.
+    def __init__(self, inner: EmbeddingProvider):
+        self.inner = inner
+
+    @property
+    def dim(self) -> int:
+        return self.inner.dim
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.inner.cache_namespace
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self._timed(self.inner.embed, texts)
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        return self._timed(self.inner.embed_array, texts)
+
+    def _timed(self, embed, texts):
+        if not texts:
+            return embed(texts)
+        start = time.perf_counter()
+        result = embed(texts)
+        EMBEDDING_SECONDS.observe(time.perf_counter() - start)
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        EMBEDDED_TEXTS.inc(len(texts))
+        return result
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    # Attached to every pooled LLM client, so it sees each call made through
+    # any chain built on that client.
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._starts: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID) -> None:
+        with self._lock:
+            self._starts[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID):
+        with self._lock:
+            start = self._starts.pop(run_id, None)
+        if start is not None:
+            LLM_LATENCY.labels(provider=self.provider).observe(time.perf_counter() - start)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+        LLM_ERRORS.labels(provider=self.provider, kind="call").inc()
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0002_ingestion_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querylog",
+            name="context_token_budget",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="querylog",
+            name="context_tokens",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
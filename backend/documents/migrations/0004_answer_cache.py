@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0003_querylog_context_tokens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="index_generation",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="querylog",
+            name="cache_hit",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="querylog",
+            name="index_generation",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="querylog",
+            name="question_embedding",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
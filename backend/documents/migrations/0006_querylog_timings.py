@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0005_corpus_queries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querylog",
+            name="timings",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.1.2 on 2026-10-18 21:02
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_started_at(apps, schema_editor):
+    # Running jobs claimed before leases were renewed keep their claim time.
+    IngestionJob = apps.get_model("documents", "IngestionJob")
+    IngestionJob.objects.filter(status="running").update(locked_at=F("started_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0006_querylog_timings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestionjob",
+            name="locked_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_started_at, migrations.RunPython.noop),
+    ]
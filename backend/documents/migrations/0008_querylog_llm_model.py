@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0007_ingestionjob_locked_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querylog",
+            name="llm_model",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
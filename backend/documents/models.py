@@ -1,6 +1,14 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 class Document(models.Model):
+    class IngestionStatus(models.TextChoices):
+        NOT_QUEUED = "not_queued", "Not queued"
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -11,21 +19,89 @@ class Document(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_processed = models.BooleanField(default=False)
     databricks_job_id = models.CharField(max_length=100, blank=True, null=True)
+    ingestion_status = models.CharField(
+        max_length=20,
+        choices=IngestionStatus.choices,
+        default=IngestionStatus.NOT_QUEUED,
+    )
+    ingestion_progress = models.PositiveSmallIntegerField(default=0)
+    ingestion_error = models.TextField(blank=True)
+    # Bumped every time the FAISS index is rebuilt; cached answers from an
+    # older generation are ignored.
+    index_generation = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.filename} ({self.owner.username})"
+class IngestionJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name="ingestion_jobs",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    force = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Lease of the running attempt, renewed by the worker while it runs.
+    locked_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+    def __str__(self):
+        return f"Ingestion of document {self.document_id} ({self.status})"
 class QueryLog(models.Model):
+    # Corpus-wide questions span several documents and are logged against
+    # the asking user instead of a single document.
     document = models.ForeignKey(
         Document,
         on_delete=models.CASCADE,
         related_name="queries",
+        null=True,
+        blank=True,
+    )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="query_logs",
+        null=True,
+        blank=True,
     )
     question = models.TextField()
     answer = models.TextField(blank=True)
     
     latency_ms = models.IntegerField(null=True, blank=True)
     tokens_used = models.IntegerField(null=True, blank=True)
+    context_tokens = models.IntegerField(null=True, blank=True)
+    context_token_budget = models.IntegerField(null=True, blank=True)
+    question_embedding = models.BinaryField(null=True, blank=True)
+    index_generation = models.PositiveIntegerField(null=True, blank=True)
+    # Model that generated the answer; cached answers are only reused for it.
+    llm_model = models.CharField(max_length=255, blank=True)
+    cache_hit = models.BooleanField(default=False)
+    # Milliseconds per pipeline stage (see llm.tracing.Trace), plus "total".
+    timings = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
+        if self.document is None:
+            return f"Corpus query at {self.created_at}"
         return f"Query on {self.document.filename} at {self.created_at}"
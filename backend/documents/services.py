@@ -1,15 +1,32 @@
 import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
 from django.core.exceptions import PermissionDenied
 from django.conf import settings
-from django.db import transaction
 from .models import Document, QueryLog
-from llm.chains import build_rag_chain
-from llm.retrieval_faiss import load_faiss_store, retrieve_context_from_faiss
+from llm.chains import get_rag_chain
+from llm.context import PackedContext, context_budget_for_model, pack_context
+from llm.tokens import DEFAULT_MODEL, count_tokens_batch
+from llm.retrieval_faiss import retrieve_packed_context_from_faiss, retrieve_packed_contexts_from_faiss
 from llm.embeddings import EmbeddingProvider
 from llm.vectorstore import FAISSVectorStore
-from llm.chunking import chunk_text
 from llm.grounding import enforce_grounding
+from llm.tracing import Trace
+from .index_cache import get_index_cache
+from .embeddings import get_document_embedding_provider
+from .ingestion import (
+    build_vector_store,
+    document_chunks,
+    extract_document_text,
+    load_previous_store,
+    mark_index_rebuilt,
+    write_index_atomically,
+)
+from .answer_cache import encode_embedding, find_cached_answer, find_cached_answers
+from .corpus import add_to_corpus_index, ensure_in_corpus, load_corpus_store
+from .jobs import enqueue_ingestion
 
 def get_user_document(user, document_id):
     try:
@@ -20,45 +37,169 @@ def get_user_document(user, document_id):
         raise PermissionDenied("You do not own this document")
     return document
 
-def log_query(document, question, answer="", latency_ms=None, tokens_used=None):
+def get_user_documents(user, document_ids=None) -> List[Document]:
+    if document_ids is None:
+        return list(Document.objects.filter(owner=user))
+    return [get_user_document(user, document_id) for document_id in document_ids]
+
+def log_query(document, question, answer="", latency_ms=None, tokens_used=None, **fields):
     return QueryLog.objects.create(
         document=document,
         question=question,
         answer=answer,
         latency_ms=latency_ms,
         tokens_used=tokens_used,
+        **fields,
     )
 
 def _get_index_dir(document_id: int) -> Path:
     return Path(settings.VECTOR_INDEX_ROOT) / f"document_{document_id}"
 
 def _rebuild_index(document: Document, embedding_provider: EmbeddingProvider):
-    document.pdf_file.open("rb")
-    try:
-        raw = document.pdf_file.read()
-    finally:
-        document.pdf_file.close()
+    extracted = extract_document_text(document)
+    index_dir = _get_index_dir(document.id)
+    vector_store = build_vector_store(
+        document_chunks(extracted),
+        embedding_provider,
+        previous=load_previous_store(index_dir, embedding_provider),
+    )
+    write_index_atomically(vector_store, index_dir)
+    get_index_cache().invalidate(document.id)
+    add_to_corpus_index(document, vector_store)
+    mark_index_rebuilt(document)
+
+GREETINGS = {"hi", "hello", "hey", "thanks", "thank you"}
+GREETING_ANSWER = "Hi! Ask me a question about the document."
+
+def _is_greeting(question: str) -> bool:
+    return question.strip().lower() in GREETINGS
+
+def get_llm_model_name(llm) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or DEFAULT_MODEL
 
-    text = raw.decode("utf-8", errors="ignore")
-    chunks = chunk_text(text)
-    texts = [c["chunk_text"] for c in chunks]
-    embeddings = embedding_provider.embed(texts)
+def count_query_tokens(question: str, answer: str, packed: PackedContext, model: str) -> int:
+    # The context was already counted while packing it.
+    return packed.tokens_used + sum(count_tokens_batch([question, answer], model))
 
-    vector_store = FAISSVectorStore(dim=embedding_provider.dim)
-    vector_store.add(embeddings, chunks)
+def get_context_token_budget(llm) -> int:
+    return settings.CONTEXT_TOKEN_BUDGET or context_budget_for_model(get_llm_model_name(llm))
 
+class DocumentNotReady(Exception):
+    # Raised for documents whose ingestion job has not (successfully)
+    # finished; the views answer with the ingestion status instead.
+    def __init__(self, document: Document):
+        super().__init__(f"Document is {document.ingestion_status}")
+        self.document = document
+
+NOT_READY_STATUSES = (
+    Document.IngestionStatus.QUEUED,
+    Document.IngestionStatus.RUNNING,
+    Document.IngestionStatus.FAILED,
+)
+
+def ensure_document_ready(document: Document) -> None:
+    if document.ingestion_status in NOT_READY_STATUSES:
+        raise DocumentNotReady(document)
+
+def _requeue_ingestion(document: Document) -> DocumentNotReady:
+    # A document whose job succeeded but whose index is missing or unreadable
+    # goes back through the worker rather than being rebuilt on the request.
+    enqueue_ingestion(document, force=True)
+    document.ingestion_status = Document.IngestionStatus.QUEUED
+    document.ingestion_progress = 0
+    return DocumentNotReady(document)
+
+def _load_indexed_vector_store(
+    document: Document, embedding_provider: EmbeddingProvider
+) -> Optional[FAISSVectorStore]:
+    # The common case, without database access: the document is indexed and
+    # its index loads. None when _load_vector_store has to rebuild or requeue.
+    ensure_document_ready(document)
     index_dir = _get_index_dir(document.id)
-    if index_dir.exists():
-        for f in index_dir.iterdir():
-            f.unlink()
-    else:
-        index_dir.mkdir(parents=True, exist_ok=True)
+    if not index_dir.exists() or not document.is_processed:
+        return None
+
+    try:
+        return get_index_cache().get(
+            document.id,
+            index_dir=index_dir,
+            embedding_provider=embedding_provider,
+        )
+    except Exception:
+        return None
+
+def _load_vector_store(document: Document, embedding_provider: EmbeddingProvider) -> FAISSVectorStore:
+    vector_store = _load_indexed_vector_store(document, embedding_provider)
+    if vector_store is not None:
+        return vector_store
+
+    # Only documents uploaded before the ingestion queue have no job; they
+    # are still indexed on their first question.
+    if document.ingestion_status != Document.IngestionStatus.NOT_QUEUED:
+        raise _requeue_ingestion(document)
+    _rebuild_index(document, get_document_embedding_provider(embedding_provider))
+    return get_index_cache().get(
+        document.id,
+        index_dir=_get_index_dir(document.id),
+        embedding_provider=embedding_provider,
+    )
+
+def retrieve_document_context(
+    *,
+    question: str,
+    query_embedding: List[float],
+    embedding_provider: EmbeddingProvider,
+    vector_store: FAISSVectorStore,
+    llm,
+    trace: Optional[Trace] = None,
+) -> PackedContext:
+    return retrieve_packed_context_from_faiss(
+        question=question,
+        embedding_provider=embedding_provider,
+        vector_store=vector_store,
+        token_budget=get_context_token_budget(llm),
+        model=get_llm_model_name(llm),
+        query_embedding=query_embedding,
+        k=settings.RETRIEVAL_K,
+        hybrid=settings.HYBRID_RETRIEVAL,
+        trace=trace,
+    )
+
+def finish_trace(log: QueryLog, trace: Trace) -> QueryLog:
+    # The INSERT itself is part of the request, so the span totals are only
+    # complete once the row exists.
+    log.timings = trace.as_dict()
+    log.latency_ms = int(log.timings["total"])
+    log.save(update_fields=["timings", "latency_ms"])
+    return log
+
+def log_answer(
+    document: Document,
+    question: str,
+    answer: str,
+    *,
+    trace: Trace,
+    packed: PackedContext,
+    llm,
+    query_embedding: List[float],
+) -> QueryLog:
+    model = get_llm_model_name(llm)
+    tokens_used = count_query_tokens(question, answer, packed, model)
 
-    vector_store.save(index_dir)
-    document.is_processed = True
-    document.save(update_fields=["is_processed"])
+    with trace.span("db_write"):
+        log = log_query(
+            document,
+            question,
+            answer,
+            tokens_used=tokens_used,
+            context_tokens=packed.tokens_used,
+            context_token_budget=packed.token_budget,
+            question_embedding=encode_embedding(query_embedding),
+            index_generation=document.index_generation,
+            llm_model=model,
+        )
+    return finish_trace(log, trace)
 
-@transaction.atomic
 def answer_document_question(
     *,
     user,
@@ -67,60 +208,381 @@ def answer_document_question(
     embedding_provider: EmbeddingProvider,
     llm,
 ):
-    normalized = question.strip().lower()
-    if normalized in {"hi", "hello", "hey", "thanks", "thank you"}:
+    if _is_greeting(question):
         return QueryLog.objects.create(
             document=document,
             question=question,
-            answer="Hi! Ask me a question about the document.",
+            answer=GREETING_ANSWER,
             latency_ms=0,
             tokens_used=0,
         )
 
-    index_dir = _get_index_dir(document.id)
+    # Timed from the start: a missing or stale index is rebuilt here, which
+    # is by far the slowest path.
+    trace = Trace()
+    with trace.span("index_load"):
+        vector_store = _load_vector_store(document, embedding_provider)
 
-    if not index_dir.exists() or not document.is_processed:
-        _rebuild_index(document, embedding_provider)
+    with trace.span("embed_query"):
+        query_embedding = embedding_provider.embed([question])[0]
+    with trace.span("cache_lookup"):
+        cached = find_cached_answer(document, question, query_embedding, model=get_llm_model_name(llm))
+    if cached is not None:
+        return _log_cache_hit(document, question, cached, trace)
 
-    start_time = time.time()
+    packed = retrieve_document_context(
+        question=question,
+        query_embedding=query_embedding,
+        embedding_provider=embedding_provider,
+        vector_store=vector_store,
+        llm=llm,
+        trace=trace,
+    )
+    context, citations = packed.text, packed.citations
 
-    try:
-        vector_store = load_faiss_store(
-            index_dir=index_dir,
-            embedding_provider=embedding_provider,
+    chain = get_rag_chain(llm)
+    with trace.span("llm_total"):
+        raw_answer = chain.invoke(
+            {
+                "question": question,
+                "context": context,
+            }
         )
-    except Exception:
-        _rebuild_index(document, embedding_provider)
-        vector_store = load_faiss_store(
-            index_dir=index_dir,
-            embedding_provider=embedding_provider,
+
+    with trace.span("grounding"):
+        answer = enforce_grounding(
+            answer=raw_answer,
+            citations=citations,
         )
 
-    context, citations = retrieve_context_from_faiss(
+    return log_answer(
+        document,
+        question,
+        answer,
+        trace=trace,
+        packed=packed,
+        llm=llm,
+        query_embedding=query_embedding,
+    )
+
+def stream_document_answer(
+    *,
+    user,
+    document: Document,
+    question: str,
+    embedding_provider: EmbeddingProvider,
+    llm,
+) -> Iterator[Tuple[str, dict]]:
+    # Yields ("token", {"text": ...}) events while the answer is generated and
+    # a final ("done", {...}) event once the QueryLog row has been written.
+    if _is_greeting(question):
+        log = log_query(document, question, GREETING_ANSWER, latency_ms=0, tokens_used=0)
+        yield "token", {"text": GREETING_ANSWER}
+        yield "done", _log_summary(log)
+        return
+
+    trace = Trace()
+    with trace.span("index_load"):
+        vector_store = _load_vector_store(document, embedding_provider)
+
+    with trace.span("embed_query"):
+        query_embedding = embedding_provider.embed([question])[0]
+    with trace.span("cache_lookup"):
+        cached = find_cached_answer(document, question, query_embedding, model=get_llm_model_name(llm))
+    if cached is not None:
+        log = _log_cache_hit(document, question, cached, trace)
+        yield "token", {"text": log.answer}
+        yield "done", _log_summary(log)
+        return
+
+    packed = retrieve_document_context(
         question=question,
+        query_embedding=query_embedding,
         embedding_provider=embedding_provider,
         vector_store=vector_store,
+        llm=llm,
+        trace=trace,
     )
+    context, citations = packed.text, packed.citations
 
-    chain = build_rag_chain(llm)
-    raw_answer = chain.invoke(
-        {
-            "question": question,
-            "context": context,
-        }
-    )
+    parts: List[str] = []
 
-    answer = enforce_grounding(
-        answer=raw_answer,
-        citations=citations,
+    # Grounding can only refuse up front: without citations the LLM is never
+    # called, so no ungrounded tokens are streamed to the client.
+    if citations:
+        chain = get_rag_chain(llm)
+        with trace.span("llm_total"):
+            llm_start = time.perf_counter()
+            for token in chain.stream(
+                {
+                    "question": question,
+                    "context": context,
+                }
+            ):
+                if token:
+                    if not parts:
+                        trace.record("llm_first_token", (time.perf_counter() - llm_start) * 1000)
+                    parts.append(token)
+                    yield "token", {"text": token}
+
+    raw_answer = "".join(parts)
+    with trace.span("grounding"):
+        answer = enforce_grounding(
+            answer=raw_answer,
+            citations=citations,
+        )
+    if answer != raw_answer:
+        yield "token", {"text": answer}
+
+    log = log_answer(
+        document,
+        question,
+        answer,
+        trace=trace,
+        packed=packed,
+        llm=llm,
+        query_embedding=query_embedding,
     )
+    yield "done", _log_summary(log)
 
-    latency_ms = int((time.time() - start_time) * 1000)
+@dataclass
+class _QuestionBatch:
+    # Intermediate state of answer_document_questions, shared with the async
+    # variant: rows of embeddings follow `pending` (non-greeting questions)
+    # and contexts are only packed for questions without a cached answer.
+    questions: List[str]
+    pending: List[int]
+    embeddings: np.ndarray
+    cached: Dict[int, QueryLog] = field(default_factory=dict)
+    packed: Dict[int, PackedContext] = field(default_factory=dict)
 
-    return QueryLog.objects.create(
-        document=document,
-        question=question,
-        answer=answer,
-        latency_ms=latency_ms,
-        tokens_used=0,
+    @property
+    def llm_indexes(self) -> List[int]:
+        # Questions without citations are refused without calling the LLM.
+        return [i for i, packed in self.packed.items() if packed.citations]
+
+    def llm_inputs(self) -> List[dict]:
+        return [
+            {"question": self.questions[i], "context": self.packed[i].text}
+            for i in self.llm_indexes
+        ]
+
+def _embed_question_batch(
+    questions: List[str], embedding_provider: EmbeddingProvider, trace: Trace
+) -> _QuestionBatch:
+    pending = [i for i, q in enumerate(questions) if not _is_greeting(q)]
+    with trace.span("embed_query"):
+        embeddings = embedding_provider.embed_array([questions[i] for i in pending])
+    return _QuestionBatch(questions=questions, pending=pending, embeddings=embeddings)
+
+def _find_cached_batch_answers(document: Document, batch: _QuestionBatch, llm, trace: Trace) -> None:
+    with trace.span("cache_lookup"):
+        cached = find_cached_answers(
+            document,
+            [batch.questions[i] for i in batch.pending],
+            batch.embeddings,
+            model=get_llm_model_name(llm),
+        )
+    batch.cached = {batch.pending[j]: hit for j, hit in enumerate(cached) if hit is not None}
+
+def _retrieve_batch_contexts(
+    batch: _QuestionBatch, vector_store: FAISSVectorStore, llm, trace: Trace
+) -> None:
+    to_answer = [j for j, i in enumerate(batch.pending) if i not in batch.cached]
+    packed_contexts = retrieve_packed_contexts_from_faiss(
+        questions=[batch.questions[batch.pending[j]] for j in to_answer],
+        query_embeddings=batch.embeddings[to_answer],
+        vector_store=vector_store,
+        token_budget=get_context_token_budget(llm),
+        model=get_llm_model_name(llm),
+        k=settings.RETRIEVAL_K,
+        hybrid=settings.HYBRID_RETRIEVAL,
+        trace=trace,
     )
+    batch.packed = {batch.pending[j]: packed for j, packed in zip(to_answer, packed_contexts)}
+
+def _build_batch_logs(
+    document: Document, batch: _QuestionBatch, raw_answers: Dict[int, object], llm, trace: Trace
+) -> List[Union[QueryLog, Exception]]:
+    # Unsaved QueryLogs in question order, or the exception a question's LLM
+    # call raised.
+    model = get_llm_model_name(llm)
+    results: List[Union[QueryLog, Exception]] = []
+    embedding_rows = {i: row for row, i in enumerate(batch.pending)}
+
+    for i, question in enumerate(batch.questions):
+        if i not in embedding_rows:
+            log = QueryLog(
+                document=document,
+                question=question,
+                answer=GREETING_ANSWER,
+                latency_ms=0,
+                tokens_used=0,
+            )
+        elif i in batch.cached:
+            log = QueryLog(
+                document=document,
+                question=question,
+                answer=batch.cached[i].answer,
+                tokens_used=0,
+                index_generation=document.index_generation,
+                cache_hit=True,
+            )
+        else:
+            raw_answer = raw_answers.get(i, "")
+            if isinstance(raw_answer, Exception):
+                results.append(raw_answer)
+                continue
+            packed = batch.packed[i]
+            with trace.span("grounding"):
+                answer = enforce_grounding(answer=raw_answer, citations=packed.citations)
+            log = QueryLog(
+                document=document,
+                question=question,
+                answer=answer,
+                tokens_used=count_query_tokens(question, answer, packed, model),
+                context_tokens=packed.tokens_used,
+                context_token_budget=packed.token_budget,
+                question_embedding=encode_embedding(batch.embeddings[embedding_rows[i]]),
+                index_generation=document.index_generation,
+                llm_model=model,
+            )
+        results.append(log)
+    return results
+
+def _save_batch_logs(results: List[Union[QueryLog, Exception]], trace: Trace) -> None:
+    # A single INSERT for the batch, so its own time is not in the timings.
+    # Greetings were created with zero latency and get no timings.
+    timings = trace.as_dict()
+    logs = [r for r in results if isinstance(r, QueryLog)]
+    for log in logs:
+        if log.latency_ms is None:
+            log.timings = timings
+            log.latency_ms = int(timings["total"])
+    QueryLog.objects.bulk_create(logs)
+
+def answer_document_questions(
+    *,
+    user,
+    document: Document,
+    questions: List[str],
+    embedding_provider: EmbeddingProvider,
+    llm,
+) -> List[Union[QueryLog, Exception]]:
+    # Answers a checklist of questions against one document: the index is
+    # loaded once, all questions are embedded in one call and searched as one
+    # matrix, and the LLM calls run concurrently through chain.batch. Returns
+    # one QueryLog per question, or the exception its LLM call raised. The
+    # rows share the batch's timings and latency.
+    trace = Trace()
+    with trace.span("index_load"):
+        vector_store = _load_vector_store(document, embedding_provider)
+
+    batch = _embed_question_batch(questions, embedding_provider, trace)
+    _find_cached_batch_answers(document, batch, llm, trace)
+    _retrieve_batch_contexts(batch, vector_store, llm, trace)
+
+    raw_answers: Dict[int, object] = {}
+    if batch.llm_indexes:
+        chain = get_rag_chain(llm)
+        with trace.span("llm_total"):
+            outputs = chain.batch(
+                batch.llm_inputs(),
+                config={"max_concurrency": settings.BATCH_QUERY_LLM_CONCURRENCY},
+                return_exceptions=True,
+            )
+        raw_answers = dict(zip(batch.llm_indexes, outputs))
+
+    results = _build_batch_logs(document, batch, raw_answers, llm, trace)
+    _save_batch_logs(results, trace)
+    return results
+
+def answer_corpus_question(
+    *,
+    user,
+    question: str,
+    embedding_provider: EmbeddingProvider,
+    llm,
+    document_ids=None,
+):
+    # Answers across all of the user's documents, or the given subset. Every
+    # requested document goes through the same ownership check as the
+    # single-document endpoints, and the corpus search itself is restricted
+    # to the user's documents.
+    documents = get_user_documents(user, document_ids)
+
+    if _is_greeting(question):
+        return log_query(None, question, GREETING_ANSWER, latency_ms=0, tokens_used=0, owner=user)
+
+    trace = Trace()
+    with trace.span("index_load"):
+        ensure_in_corpus(documents, embedding_provider)
+        corpus = load_corpus_store(embedding_provider)
+
+    with trace.span("embed_query"):
+        query_embedding = embedding_provider.embed([question])[0]
+    with trace.span("search"):
+        candidates = corpus.search(
+            query_embedding,
+            k=200,
+            owner_id=user.id,
+            document_ids=[d.id for d in documents] if document_ids is not None else None,
+        )
+    model = get_llm_model_name(llm)
+    with trace.span("context"):
+        packed = pack_context(candidates, token_budget=get_context_token_budget(llm), model=model)
+    context, citations = packed.text, packed.citations
+
+    chain = get_rag_chain(llm)
+    with trace.span("llm_total"):
+        raw_answer = chain.invoke(
+            {
+                "question": question,
+                "context": context,
+            }
+        )
+
+    with trace.span("grounding"):
+        answer = enforce_grounding(
+            answer=raw_answer,
+            citations=citations,
+        )
+
+    tokens_used = count_query_tokens(question, answer, packed, model)
+
+    with trace.span("db_write"):
+        log = log_query(
+            None,
+            question,
+            answer,
+            tokens_used=tokens_used,
+            context_tokens=packed.tokens_used,
+            context_token_budget=packed.token_budget,
+            owner=user,
+        )
+    finish_trace(log, trace)
+    log.citations = citations
+    return log
+
+def _log_cache_hit(document: Document, question: str, cached: QueryLog, trace: Trace) -> QueryLog:
+    with trace.span("db_write"):
+        log = log_query(
+            document,
+            question,
+            cached.answer,
+            tokens_used=0,
+            index_generation=document.index_generation,
+            cache_hit=True,
+        )
+    return finish_trace(log, trace)
+
+def _log_summary(log: QueryLog) -> dict:
+    return {
+        "query_id": log.id,
+        "cache_hit": log.cache_hit,
+        "latency_ms": log.latency_ms,
+        "tokens_used": log.tokens_used,
+        "context_tokens": log.context_tokens,
+        "context_token_budget": log.context_token_budget,
+        "timings": log.timings,
+    }
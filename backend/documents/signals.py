@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .corpus import remove_from_corpus_index
+from .models import Document
+
+
+@receiver(post_delete, sender=Document)
+def remove_deleted_document_from_corpus(sender, instance, **kwargs):
+    remove_from_corpus_index(instance.id)
@@ -1,4 +1,5 @@
-from django.test import TestCase
+import tempfile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
 from documents.models import Document
@@ -9,6 +10,18 @@ from documents.tests import DummyLLM
 User = get_user_model()
 
 class DjangoFAISSIntegrationTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
     def test_django_answers_using_faiss_index(self):
         user = User.objects.create_user("alice", password="pass")
         doc = Document.objects.create(
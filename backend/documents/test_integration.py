@@ -1,4 +1,5 @@
-from django.test import TestCase
+import tempfile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
 
@@ -13,6 +14,18 @@ User = get_user_model()
 
 
 class EndToEndQATest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
     def test_full_pipeline_after_ingestion(self):
         user = User.objects.create_user("alice", password="pass")
 
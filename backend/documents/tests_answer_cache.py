@@ -0,0 +1,103 @@
+import tempfile
+from typing import List
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from langchain_core.runnables import RunnableLambda
+from documents.models import Document
+from documents.ingestion import ingest_document
+from documents.services import answer_document_question
+from llm.embeddings import EmbeddingProvider, HashingEmbeddingProvider
+
+User = get_user_model()
+
+
+class LengthBucketEmbeddingProvider(EmbeddingProvider):
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [[float(i == len(t) % 5) + 0.01 for i in range(self.dim)] for t in texts]
+
+    @property
+    def dim(self) -> int:
+        return 5
+
+
+@override_settings(ANSWER_CACHE_ENABLED=True)
+class AnswerCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user("alice", password="pass")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile("SG-01 The vehicle shall stop."))
+        self.provider = LengthBucketEmbeddingProvider()
+        self.llm_calls = []
+        self.llm = RunnableLambda(lambda _: self.llm_calls.append(1) or "SG-01 requires stopping.")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def _ask(self, question, llm=None):
+        self.doc.refresh_from_db()
+        return answer_document_question(
+            user=self.user,
+            document=self.doc,
+            question=question,
+            embedding_provider=self.provider,
+            llm=llm or self.llm,
+        )
+
+    def test_repeated_question_is_served_from_cache(self):
+        first = self._ask("List all safety goals")
+        second = self._ask("List all safety goals")
+
+        self.assertFalse(first.cache_hit)
+        self.assertTrue(second.cache_hit)
+        self.assertEqual(second.answer, first.answer)
+        self.assertEqual(len(self.llm_calls), 1)
+
+    def test_dissimilar_question_misses(self):
+        self._ask("List all safety goals")
+        other = self._ask("List all safety goals!")
+
+        self.assertFalse(other.cache_hit)
+        self.assertEqual(len(self.llm_calls), 2)
+
+    def test_reingestion_invalidates_cached_answers(self):
+        self._ask("List all safety goals")
+        self.doc.refresh_from_db()
+        ingest_document(document=self.doc, embedding_provider=self.provider, force=True)
+
+        again = self._ask("List all safety goals")
+
+        self.assertFalse(again.cache_hit)
+        self.assertEqual(len(self.llm_calls), 2)
+
+    def test_answers_of_another_model_are_not_reused(self):
+        self._ask("List all safety goals")
+        other_model = RunnableLambda(lambda _: self.llm_calls.append(1) or "SG-01 requires stopping.")
+        other_model.model_name = "gemini-2.5-flash-lite"
+
+        self.assertFalse(self._ask("List all safety goals", llm=other_model).cache_hit)
+        self.assertTrue(self._ask("List all safety goals", llm=other_model).cache_hit)
+        self.assertEqual(len(self.llm_calls), 2)
+
+    @override_settings(ANSWER_CACHE_SIMILARITY_THRESHOLD=0.5)
+    def test_questions_about_different_identifiers_do_not_collide(self):
+        self.provider = HashingEmbeddingProvider(dim=64)
+        self._ask("What does clause 4.2 require for the braking system?")
+
+        other = self._ask("What does clause 4.3 require for the braking system?")
+
+        self.assertFalse(other.cache_hit)
+        self.assertEqual(len(self.llm_calls), 2)
+        self.assertTrue(self._ask("What does clause 4.2 require for the braking system?").cache_hit)
+
+    @override_settings(ANSWER_CACHE_ENABLED=False)
+    def test_cache_can_be_disabled(self):
+        self._ask("List all safety goals")
+        self.assertFalse(self._ask("List all safety goals").cache_hit)
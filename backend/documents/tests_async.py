@@ -0,0 +1,115 @@
+import asyncio
+import tempfile
+import time
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.runnables import RunnableLambda
+from documents.async_services import aanswer_document_question, astream_document_answer
+from documents.index_cache import get_index_cache
+from documents.ingestion import ingest_document
+from documents.models import Document, QueryLog
+from llm.embeddings import DummyEmbeddingProvider
+
+User = get_user_model()
+
+
+def slow_llm(delay: float):
+    def answer(_):
+        time.sleep(delay)
+        return "SG-01: stop the vehicle."
+
+    async def aanswer(_):
+        await asyncio.sleep(delay)
+        return "SG-01: stop the vehicle."
+
+    return RunnableLambda(answer, afunc=aanswer)
+
+
+class AsyncAnswerTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+            ANSWER_CACHE_ENABLED=False,
+        )
+        self.settings_override.enable()
+        get_index_cache().clear()
+        self.provider = DummyEmbeddingProvider()
+        self.user = User.objects.create_user("alice", password="pass")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile("SG-01 The vehicle shall stop."))
+        ingest_document(document=self.doc, embedding_provider=self.provider)
+        self.doc.refresh_from_db()
+
+    def tearDown(self):
+        get_index_cache().clear()
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    async def test_answer_is_logged(self):
+        log = await aanswer_document_question(
+            user=self.user,
+            document=self.doc,
+            question="What does SG-01 require?",
+            embedding_provider=self.provider,
+            llm=FakeStreamingListLLM(responses=["SG-01: stop the vehicle."]),
+        )
+
+        self.assertEqual(log.answer, "SG-01: stop the vehicle.")
+        self.assertGreater(log.context_tokens, 0)
+        self.assertEqual(await QueryLog.objects.acount(), 1)
+
+    async def test_indexed_document_loads_off_the_orm_thread(self):
+        with mock.patch("documents.async_services._load_vector_store") as load:
+            await aanswer_document_question(
+                user=self.user,
+                document=self.doc,
+                question="What does SG-01 require?",
+                embedding_provider=self.provider,
+                llm=FakeStreamingListLLM(responses=["SG-01: stop the vehicle."]),
+            )
+
+        load.assert_not_called()
+
+    async def test_stream_yields_tokens_then_done(self):
+        events = [
+            event
+            async for event in astream_document_answer(
+                user=self.user,
+                document=self.doc,
+                question="What does SG-01 require?",
+                embedding_provider=self.provider,
+                llm=FakeStreamingListLLM(responses=["SG-01: stop the vehicle."]),
+            )
+        ]
+
+        tokens = [data["text"] for event, data in events if event == "token"]
+        self.assertEqual("".join(tokens), "SG-01: stop the vehicle.")
+        self.assertEqual(events[-1][0], "done")
+
+    async def test_slow_llm_calls_run_concurrently(self):
+        requests = 100
+        delay = 0.2
+
+        start = time.perf_counter()
+        logs = await asyncio.gather(
+            *(
+                aanswer_document_question(
+                    user=self.user,
+                    document=self.doc,
+                    question=f"What does SG-01 require? ({i})",
+                    embedding_provider=self.provider,
+                    llm=slow_llm(delay),
+                )
+                for i in range(requests)
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(logs), requests)
+        # Serially this would take requests * delay = 20 s.
+        self.assertLess(elapsed, requests * delay / 4)
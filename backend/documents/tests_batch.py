@@ -0,0 +1,217 @@
+import json
+import tempfile
+import threading
+import time
+from unittest import mock
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.runnables import RunnableLambda
+from documents.async_services import aanswer_document_questions
+from documents.index_cache import get_index_cache
+from documents.ingestion import ingest_document
+from documents.models import Document, QueryLog
+from documents.services import GREETING_ANSWER, answer_document_question, answer_document_questions
+from documents.views import query_document_batch_async
+from llm.embeddings import DummyEmbeddingProvider
+
+User = get_user_model()
+
+TEXT = "SG-01 The vehicle shall stop.\n\nSG-02 The driver shall be warned.\n"
+
+
+class CountingEmbeddingProvider(DummyEmbeddingProvider):
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return super().embed(texts)
+
+
+@override_settings(ANSWER_CACHE_ENABLED=False)
+class BatchAnswerTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        get_index_cache().clear()
+        self.provider = CountingEmbeddingProvider()
+        self.user = User.objects.create_user("alice", password="pass")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile(TEXT))
+        ingest_document(document=self.doc, embedding_provider=self.provider)
+        self.doc.refresh_from_db()
+        self.provider.calls = 0
+
+    def tearDown(self):
+        get_index_cache().clear()
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def test_answers_in_order_with_one_embedding_call(self):
+        questions = ["What does SG-01 require?", "hello", "What does SG-02 require?"]
+        llm = FakeListLLM(responses=["SG-01: stop.", "SG-02: warn."])
+
+        results = answer_document_questions(
+            user=self.user,
+            document=self.doc,
+            questions=questions,
+            embedding_provider=self.provider,
+            llm=llm,
+        )
+
+        self.assertEqual(self.provider.calls, 1)
+        self.assertEqual([r.question for r in results], questions)
+        self.assertEqual(results[1].answer, GREETING_ANSWER)
+        self.assertEqual(QueryLog.objects.count(), 3)
+        for log in QueryLog.objects.exclude(answer=GREETING_ANSWER):
+            self.assertIn("search", log.timings)
+            self.assertGreater(log.context_tokens, 0)
+
+    def test_failed_llm_call_does_not_drop_the_batch(self):
+        def answer(prompt):
+            if "SG-02" in prompt.to_string().split("Task:")[-1]:
+                raise RuntimeError("rate limited")
+            return "SG-01: stop."
+
+        results = answer_document_questions(
+            user=self.user,
+            document=self.doc,
+            questions=["What does SG-01 require?", "What does SG-02 require?"],
+            embedding_provider=self.provider,
+            llm=RunnableLambda(answer),
+        )
+
+        self.assertEqual(results[0].answer, "SG-01: stop.")
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(QueryLog.objects.count(), 1)
+
+    async def test_async_variant_answers_in_order(self):
+        questions = ["What does SG-01 require?", "hello", "What does SG-02 require?"]
+
+        results = await aanswer_document_questions(
+            user=self.user,
+            document=self.doc,
+            questions=questions,
+            embedding_provider=self.provider,
+            llm=FakeListLLM(responses=["SG-01: stop.", "SG-01: stop."]),
+        )
+
+        self.assertEqual(self.provider.calls, 1)
+        self.assertEqual([r.question for r in results], questions)
+        self.assertEqual(results[1].answer, GREETING_ANSWER)
+        self.assertEqual(await QueryLog.objects.acount(), 3)
+
+    @override_settings(BATCH_QUERY_LLM_CONCURRENCY=2)
+    def test_llm_concurrency_is_limited(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def answer(_):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.05)
+            with lock:
+                state["running"] -= 1
+            return "SG-01: stop."
+
+        answer_document_questions(
+            user=self.user,
+            document=self.doc,
+            questions=[f"What does SG-01 require? ({i})" for i in range(6)],
+            embedding_provider=self.provider,
+            llm=RunnableLambda(answer),
+        )
+
+        self.assertEqual(state["peak"], 2)
+
+    @override_settings(ANSWER_CACHE_ENABLED=True)
+    def test_uses_answer_cache(self):
+        answer_document_question(
+            user=self.user,
+            document=self.doc,
+            question="What does SG-01 require?",
+            embedding_provider=self.provider,
+            llm=FakeListLLM(responses=["SG-01: stop."]),
+        )
+
+        results = answer_document_questions(
+            user=self.user,
+            document=self.doc,
+            questions=["What does SG-01 require?"],
+            embedding_provider=self.provider,
+            llm=FakeListLLM(responses=["unused"]),
+        )
+
+        self.assertTrue(results[0].cache_hit)
+        self.assertEqual(results[0].answer, "SG-01: stop.")
+
+
+@override_settings(STREAMLIT_API_KEY="secret", ANSWER_CACHE_ENABLED=False)
+class BatchEndpointTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        get_index_cache().clear()
+        self.user = User.objects.create_user("streamlit_service_user")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile(TEXT))
+
+    def tearDown(self):
+        get_index_cache().clear()
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def post(self, payload):
+        return self.client.post(
+            f"/api/documents/{self.doc.id}/query/batch/",
+            data=json.dumps(payload),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer secret",
+        )
+
+    @override_settings(BATCH_QUERY_MAX_QUESTIONS=2)
+    def test_validates_questions(self):
+        self.assertEqual(self.post({"questions": []}).status_code, 400)
+        self.assertEqual(self.post({"questions": ["a", ""]}).status_code, 400)
+        self.assertEqual(self.post({"questions": ["a", "b", "c"]}).status_code, 400)
+
+    def test_returns_one_result_per_question(self):
+        llm = FakeListLLM(responses=["SG-01: stop."] * 2)
+        with mock.patch("documents.views.get_llm_from_request", return_value=(llm, None)), \
+                mock.patch("documents.views.get_query_embedding_provider", return_value=DummyEmbeddingProvider()):
+            response = self.post({"questions": ["What does SG-01 require?", "And SG-02?"]})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["question"] for r in results], ["What does SG-01 require?", "And SG-02?"])
+        self.assertEqual(
+            {r["query_id"] for r in results},
+            set(QueryLog.objects.values_list("id", flat=True)),
+        )
+
+    async def test_async_view_returns_one_result_per_question(self):
+        request = AsyncRequestFactory().post(
+            f"/api/documents/{self.doc.id}/query/batch/",
+            data=json.dumps({"questions": ["What does SG-01 require?", "And SG-02?"]}),
+            content_type="application/json",
+            headers={"Authorization": "Bearer secret"},
+        )
+        llm = FakeListLLM(responses=["SG-01: stop."] * 2)
+        with mock.patch("documents.views.get_llm_from_request", return_value=(llm, None)), \
+                mock.patch("documents.views.get_query_embedding_provider", return_value=DummyEmbeddingProvider()):
+            response = await query_document_batch_async(request, self.doc.id)
+
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)["results"]
+        self.assertEqual([r["question"] for r in results], ["What does SG-01 require?", "And SG-02?"])
@@ -0,0 +1,76 @@
+import tempfile
+from pathlib import Path
+import numpy as np
+from django.test import TestCase
+from llm.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from llm.vectorstore import FAISSVectorStore
+
+CHUNKS = [
+    "SG-01 The vehicle shall stop within 40 m.",
+    "SG-02 The vehicle shall warn the driver.",
+    "SG-04 The controller shall log every emergency stop.",
+    "General description of the braking controller and the vehicle.",
+]
+
+
+class BM25IndexTests(TestCase):
+    def setUp(self):
+        self.index = BM25Index.build(CHUNKS)
+
+    def test_tokenize_keeps_identifiers(self):
+        self.assertEqual(tokenize("What does SG-04 require (v1.2)?"), ["what", "does", "sg-04", "require", "v1.2"])
+
+    def test_exact_identifier_ranks_first(self):
+        self.assertEqual(self.index.search("what does SG-04 require?", k=3)[0], 2)
+
+    def test_unmatched_chunks_are_not_returned(self):
+        self.assertEqual(self.index.search("SG-02", k=10).tolist(), [1])
+        self.assertEqual(self.index.search("unknown", k=10).tolist(), [])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.index.save(Path(tmp))
+            loaded = BM25Index.load(Path(tmp))
+            np.testing.assert_allclose(loaded.scores("vehicle stop"), self.index.scores("vehicle stop"))
+
+    def test_reciprocal_rank_fusion(self):
+        self.assertEqual(reciprocal_rank_fusion([[1, 2, 3], [3, 1]]), [1, 3, 2])
+
+
+class HybridSearchTests(TestCase):
+    def setUp(self):
+        # Dense vectors that know nothing about identifiers: every chunk is
+        # equally close to the query.
+        self.store = FAISSVectorStore(dim=2)
+        self.store.add([[1.0, 0.0]] * len(CHUNKS), [{"chunk_text": t} for t in CHUNKS])
+
+    def test_identifier_found_with_small_k(self):
+        self.assertNotIn("SG-04", self.store.search([1.0, 0.0], k=1)[0]["chunk_text"])
+
+        results = self.store.hybrid_search([1.0, 0.0], "What does SG-04 require?", k=1)
+
+        self.assertEqual(results[0]["chunk_text"], CHUNKS[2])
+
+    def test_hybrid_search_many_matches_single_queries(self):
+        questions = ["What does SG-04 require?", "SG-02", "braking controller"]
+        embeddings = [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]
+
+        batched = self.store.hybrid_search_many(embeddings, questions, k=2)
+
+        self.assertEqual(
+            batched,
+            [self.store.hybrid_search(e, q, k=2) for e, q in zip(embeddings, questions)],
+        )
+
+    def test_bm25_is_persisted_next_to_faiss_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.save(Path(tmp))
+            self.assertTrue((Path(tmp) / "bm25.docs.npy").exists())
+
+            loaded = FAISSVectorStore(dim=2)
+            loaded.load(Path(tmp))
+            self.assertIsNotNone(loaded._bm25)
+            self.assertEqual(
+                loaded.hybrid_search([1.0, 0.0], "SG-02", k=1)[0]["chunk_text"],
+                CHUNKS[1],
+            )
@@ -0,0 +1,142 @@
+import tempfile
+from pathlib import Path
+from django.test import TestCase
+from databricks.ingest_pdf import MANIFEST_NAME, PARTS_DIR_NAME, discover_files, ingest_files
+from llm.embeddings import HashingEmbeddingProvider
+from llm.vectorstore import FAISSVectorStore
+
+
+class CountingEmbeddingProvider(HashingEmbeddingProvider):
+    def __init__(self):
+        super().__init__(dim=32)
+        self.batches = []
+
+    def embed_array(self, texts):
+        self.batches.append(len(texts))
+        return super().embed_array(texts)
+
+
+def _spec(name: str, requirements: int) -> str:
+    return "\n\n".join(
+        f"SYS-{i:03d} The {name} controller shall report fault {i}." for i in range(requirements)
+    )
+
+
+class BulkIngestionTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.data = self.root / "data"
+        self.data.mkdir()
+        self.index_dir = self.root / "index"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str) -> Path:
+        path = self.data / name
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def ingest(self, provider, **kwargs):
+        return ingest_files(
+            files=discover_files([self.data]),
+            embedding_provider=provider,
+            index_dir=self.index_dir,
+            workers=1,
+            batch_size=4,
+            progress_seconds=3600,
+            **kwargs,
+        )
+
+    def load_store(self) -> FAISSVectorStore:
+        store = FAISSVectorStore(dim=32)
+        store.load(self.index_dir)
+        return store
+
+    def test_batches_span_files_into_one_index(self):
+        for name in ("a.txt", "b.txt", "c.txt"):
+            self.write(name, _spec(name, 100))
+        provider = CountingEmbeddingProvider()
+
+        manifest = self.ingest(provider)
+
+        chunks = sum(entry["chunks"] for entry in manifest["files"].values())
+        self.assertGreater(chunks, 2 * 4)
+        self.assertTrue(all(size == 4 for size in provider.batches[:-1]))
+        self.assertEqual(sum(provider.batches), chunks)
+
+        store = self.load_store()
+        self.assertEqual(store.ntotal, chunks)
+        self.assertEqual(
+            {meta["source"] for meta in store.metadatas[:]},
+            {str(self.data / name) for name in ("a.txt", "b.txt", "c.txt")},
+        )
+        self.assertTrue((self.index_dir / MANIFEST_NAME).exists())
+
+    def test_resume_only_ingests_new_files(self):
+        self.write("a.txt", _spec("a", 100))
+        self.ingest(CountingEmbeddingProvider())
+        before = self.load_store().ntotal
+
+        self.write("b.txt", _spec("b", 60))
+        provider = CountingEmbeddingProvider()
+        manifest = self.ingest(provider)
+
+        self.assertEqual(sum(provider.batches), manifest["files"][str(self.data / "b.txt")]["chunks"])
+        self.assertEqual(self.load_store().ntotal, before + sum(provider.batches))
+
+    def test_empty_files_are_recorded_and_unreadable_files_retried(self):
+        self.write("empty.txt", "   ")
+        self.write("broken.txt", "").write_bytes(b"\xff\xfe\xfa")
+
+        manifest = self.ingest(CountingEmbeddingProvider())
+
+        self.assertEqual(manifest["files"][str(self.data / "empty.txt")]["skipped"], "no text extracted")
+        self.assertNotIn(str(self.data / "broken.txt"), manifest["files"])
+
+    def test_checkpoint_from_another_provider_is_rejected(self):
+        self.write("a.txt", _spec("a", 2))
+        self.ingest(CountingEmbeddingProvider())
+
+        with self.assertRaises(ValueError):
+            self.ingest(HashingEmbeddingProvider(dim=16))
+
+    def test_checkpoints_only_write_new_chunks(self):
+        for name in ("a.txt", "b.txt", "c.txt"):
+            self.write(name, _spec(name, 40))
+
+        manifest = self.ingest(CountingEmbeddingProvider(), checkpoint_seconds=0)
+
+        # One part per checkpoint; earlier parts are never rewritten.
+        parts = sorted(p.name for p in (self.index_dir / PARTS_DIR_NAME).iterdir())
+        self.assertEqual(parts, manifest["parts"])
+        self.assertEqual(len(parts), 3)
+        chunks = sum(entry["chunks"] for entry in manifest["files"].values())
+        self.assertEqual(self.load_store().ntotal, chunks)
+
+    def test_ivf_is_trained_once_on_all_chunks(self):
+        for name in ("a.txt", "b.txt", "c.txt"):
+            self.write(name, _spec(name, 100))
+
+        manifest = self.ingest(CountingEmbeddingProvider(), checkpoint_seconds=0, index_type="ivf_flat")
+
+        chunks = sum(entry["chunks"] for entry in manifest["files"].values())
+        store = self.load_store()
+        self.assertEqual(store.ntotal, chunks)
+        self.assertEqual(store.index.nlist, max(1, chunks // 39))
+
+    def test_limits_are_opt_in_and_recorded(self):
+        self.write("long.txt", _spec("long", 100))
+        self.write("huge.txt", "x " * 20000)
+
+        unlimited = self.ingest(CountingEmbeddingProvider())
+        long_chunks = unlimited["files"][str(self.data / "long.txt")]["chunks"]
+        self.assertNotIn("skipped", unlimited["files"][str(self.data / "huge.txt")])
+
+        limited = self.ingest(CountingEmbeddingProvider(), fresh=True, max_doc_chars=20000, max_chunks=2)
+
+        long_entry = limited["files"][str(self.data / "long.txt")]
+        self.assertEqual(long_entry["chunks"], 2)
+        self.assertEqual(long_entry["truncated"], f"truncated to 2 of {long_chunks} chunks")
+        self.assertTrue(limited["files"][str(self.data / "huge.txt")]["skipped"].startswith("too large"))
@@ -0,0 +1,67 @@
+import types
+from django.test import TestCase
+from llm.chunking import iter_chunks
+from llm.tokens import count_tokens
+
+SPEC = """1 INTRODUCTION
+This specification covers the braking controller.
+
+2.1 Functional requirements
+SYS-101 The vehicle shall stop within 40 m from 100 km/h.
+SYS-102 The controller shall warn the driver when brake fluid is low.
+SYS-103 The controller shall log every emergency stop.
+
+| Signal | Rate |
+| brake_pressure | 100 Hz |
+| wheel_speed | 50 Hz |
+
+2.2 Diagnostics
+DIAG-7 Faults shall be reported within 200 ms.
+"""
+
+
+class StructuredChunkerTests(TestCase):
+    def test_is_a_generator(self):
+        self.assertIsInstance(iter_chunks(SPEC), types.GeneratorType)
+
+    def test_chunks_are_non_overlapping_slices(self):
+        chunks = list(iter_chunks(SPEC, max_tokens=30))
+        previous_end = 0
+        for i, chunk in enumerate(chunks):
+            self.assertEqual(chunk["chunk_index"], i)
+            self.assertEqual(SPEC[chunk["char_start"]:chunk["char_end"]], chunk["chunk_text"])
+            self.assertGreaterEqual(chunk["char_start"], previous_end)
+            previous_end = chunk["char_end"]
+
+    def test_requirements_and_table_rows_are_not_cut(self):
+        chunks = list(iter_chunks(SPEC, max_tokens=30))
+        for line in SPEC.splitlines():
+            if line.strip():
+                self.assertTrue(
+                    any(line in c["chunk_text"] for c in chunks),
+                    f"line was split: {line!r}",
+                )
+
+    def test_respects_token_budget(self):
+        text = "\n\n".join(f"REQ-{i} " + "word " * 50 for i in range(20)) + "\n" + "long " * 400
+        for chunk in iter_chunks(text, max_tokens=120):
+            self.assertLessEqual(count_tokens(chunk["chunk_text"]), 120 + 5)
+
+    def test_section_and_page_metadata(self):
+        page_two = SPEC.index("2.2 Diagnostics")
+        chunks = list(iter_chunks(SPEC, max_tokens=30, page_offsets=[0, page_two]))
+
+        diag = next(c for c in chunks if "DIAG-7" in c["chunk_text"])
+        self.assertEqual(diag["section"], "2.2 Diagnostics")
+        self.assertEqual(diag["page"], 2)
+
+        stop = next(c for c in chunks if "SYS-101" in c["chunk_text"])
+        self.assertEqual(stop["section"], "2.1 Functional requirements")
+        self.assertEqual(stop["page"], 1)
+
+    def test_headings_start_new_chunks(self):
+        chunks = list(iter_chunks(SPEC, max_tokens=1000))
+        self.assertEqual(
+            [c["chunk_text"].splitlines()[0] for c in chunks],
+            ["1 INTRODUCTION", "2.1 Functional requirements", "2.2 Diagnostics"],
+        )
@@ -0,0 +1,42 @@
+from django.test import TestCase
+from llm.chunking import chunk_text
+from llm.context import context_budget_for_model, pack_context, DEFAULT_CONTEXT_BUDGET
+from llm.tokens import count_tokens
+
+
+class ContextPackingTests(TestCase):
+    def setUp(self):
+        self.text = " ".join(f"SYS-{i:03d} shall report status." for i in range(200))
+        self.chunks = chunk_text(self.text, max_chars=500, overlap=100)
+
+    def test_overlaps_are_removed_and_document_order_kept(self):
+        ranked = list(reversed(self.chunks))
+        packed = pack_context(ranked, token_budget=100_000)
+
+        self.assertEqual(packed.text, self.text)
+        self.assertEqual(
+            [c["chunk_index"] for c in packed.citations],
+            [c["chunk_index"] for c in self.chunks],
+        )
+
+    def test_respects_budget_and_prefers_higher_ranked_chunks(self):
+        best = self.chunks[5]
+        ranked = [best] + [c for c in self.chunks if c is not best]
+        packed = pack_context(ranked, token_budget=300)
+
+        self.assertLessEqual(packed.tokens_used, packed.token_budget)
+        self.assertEqual(packed.tokens_used, count_tokens(packed.text))
+        self.assertIn(best, packed.citations)
+        self.assertLess(len(packed.citations), len(self.chunks))
+
+    def test_chunks_without_offsets_are_deduplicated(self):
+        citations = [{"chunk_text": "SG-01"}, {"chunk_text": "SG-01"}, {"chunk_text": "SG-02"}]
+        packed = pack_context(citations, token_budget=1_000)
+        self.assertEqual(packed.text, "SG-01\n\nSG-02")
+
+    def test_budget_lookup_handles_prefixed_and_unknown_models(self):
+        self.assertEqual(
+            context_budget_for_model("models/gemini-2.5-flash-lite"),
+            context_budget_for_model("gemini-2.5-flash-lite"),
+        )
+        self.assertEqual(context_budget_for_model("unknown"), DEFAULT_CONTEXT_BUDGET)
@@ -0,0 +1,222 @@
+import json
+import tempfile
+from pathlib import Path
+from django.core.exceptions import PermissionDenied
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from documents.corpus import get_corpus_index_dir, load_corpus_store
+from documents.index_cache import get_index_cache
+from documents.ingestion import ingest_document
+from documents.models import Document, QueryLog
+from documents.services import answer_corpus_question
+from llm.context import pack_context
+from llm.corpus import SEGMENTS_DIR_NAME, CorpusVectorStore, append_segment, read_manifest
+from llm.embeddings import DummyEmbeddingProvider
+
+User = get_user_model()
+
+
+class CorpusVectorStoreTests(TestCase):
+    def setUp(self):
+        self.store = CorpusVectorStore(dim=2)
+        self.store.add_document(
+            document_id=1,
+            owner_id=10,
+            embeddings=[[1.0, 0.0], [0.9, 0.1]],
+            metadatas=[{"chunk_text": "a0"}, {"chunk_text": "a1"}],
+        )
+        self.store.add_document(
+            document_id=2,
+            owner_id=20,
+            embeddings=[[1.0, 0.0]],
+            metadatas=[{"chunk_text": "b0"}],
+        )
+        self.store.add_document(
+            document_id=3,
+            owner_id=10,
+            embeddings=[[0.0, 1.0]],
+            metadatas=[{"chunk_text": "c0"}],
+        )
+
+    def _texts(self, **filters):
+        return [m["chunk_text"] for m in self.store.search([1.0, 0.0], k=10, **filters)]
+
+    def test_filters_by_owner(self):
+        self.assertEqual(self._texts(owner_id=10), ["a0", "a1", "c0"])
+        self.assertEqual(self._texts(owner_id=20), ["b0"])
+        self.assertEqual(self._texts(owner_id=30), [])
+
+    def test_filters_by_document_set(self):
+        self.assertEqual(self._texts(document_ids=[2, 3]), ["b0", "c0"])
+        self.assertEqual(self._texts(owner_id=10, document_ids=[2]), [])
+
+    def test_results_carry_document_id(self):
+        results = self.store.search([0.0, 1.0], k=1)
+        self.assertEqual(results[0]["document_id"], 3)
+
+    def test_remove_and_replace_document(self):
+        self.assertTrue(self.store.remove_document(1))
+        self.assertFalse(self.store.remove_document(1))
+        self.assertEqual(self.store.ntotal, 2)
+        self.assertEqual(self._texts(owner_id=10), ["c0"])
+
+        self.store.add_document(
+            document_id=3,
+            owner_id=10,
+            embeddings=[[1.0, 0.0]],
+            metadatas=[{"chunk_text": "c0 v2"}],
+        )
+        self.assertEqual(self.store.ntotal, 2)
+        self.assertEqual(self._texts(owner_id=10), ["c0 v2"])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            self.store.save(path)
+            self.store.remove_document(2)
+            self.store.save(path)
+
+            # Compaction leaves one segment; the one it replaced is only
+            # deleted by the next compaction.
+            self.assertEqual(len(read_manifest(path)["segments"]), 1)
+            self.assertEqual(len(list((path / SEGMENTS_DIR_NAME).iterdir())), 2)
+
+            loaded = CorpusVectorStore(dim=2)
+            loaded.load(path)
+            self.assertEqual(loaded.document_ids(owner_id=10), [1, 3])
+            self.assertEqual(
+                [m["chunk_text"] for m in loaded.search([1.0, 0.0], k=10)],
+                ["a0", "a1", "c0"],
+            )
+
+    def test_appended_segments_replace_and_remove_documents(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp)
+            self.store.save(path)
+            append_segment(path, [(3, 10, [[1.0, 0.0]], [{"chunk_text": "c0 v2"}])])
+            append_segment(path, removed=[1])
+
+            loaded = CorpusVectorStore(dim=2)
+            loaded.load(path)
+            self.assertEqual(sorted(loaded.document_ids()), [2, 3])
+            self.assertEqual(
+                [m["chunk_text"] for m in loaded.search([1.0, 0.0], k=10, owner_id=10)],
+                ["c0 v2"],
+            )
+
+            # A document added again after its removal is visible again.
+            append_segment(path, [(1, 10, [[0.0, 1.0]], [{"chunk_text": "a0 v2"}])])
+            loaded.load(path)
+            self.assertEqual(loaded.search([0.0, 1.0], k=1)[0]["chunk_text"], "a0 v2")
+
+    def test_packing_keeps_overlapping_offsets_from_different_documents(self):
+        citations = [
+            {"chunk_text": "alpha", "char_start": 0, "document_id": 1},
+            {"chunk_text": "bravo", "char_start": 0, "document_id": 2},
+        ]
+        packed = pack_context(citations, token_budget=100)
+        self.assertEqual(packed.text, "alpha\n\nbravo")
+
+
+class CorpusQuestionTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        get_index_cache().clear()
+
+        self.provider = DummyEmbeddingProvider()
+        self.alice = User.objects.create_user("alice", password="pass")
+        self.bob = User.objects.create_user("bob", password="pass")
+        self.alice_docs = [
+            self._ingest(self.alice, "SG-01 The vehicle shall stop."),
+            self._ingest(self.alice, "SG-02 The vehicle shall warn the driver."),
+        ]
+        self.bob_doc = self._ingest(self.bob, "SG-99 Bob's private requirement.")
+
+    def tearDown(self):
+        get_index_cache().clear()
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def _ingest(self, owner, content):
+        doc = Document.objects.create(owner=owner, filename="doc.txt")
+        doc.pdf_file.save("doc.txt", ContentFile(content))
+        ingest_document(document=doc, embedding_provider=self.provider)
+        return doc
+
+    def _ask(self, user, **kwargs):
+        return answer_corpus_question(
+            user=user,
+            question="What are the requirements?",
+            embedding_provider=self.provider,
+            llm=FakeStreamingListLLM(responses=["SG-01 and SG-02."]),
+            **kwargs,
+        )
+
+    def test_ingestion_adds_documents_to_corpus(self):
+        corpus = load_corpus_store(self.provider)
+        self.assertEqual(
+            sorted(corpus.document_ids()),
+            sorted(d.id for d in self.alice_docs + [self.bob_doc]),
+        )
+
+    def test_answers_from_own_documents_only(self):
+        log = self._ask(self.alice)
+
+        self.assertEqual(
+            {c["document_id"] for c in log.citations},
+            {d.id for d in self.alice_docs},
+        )
+        self.assertIsNone(log.document)
+        self.assertEqual(log.owner, self.alice)
+        self.assertEqual(QueryLog.objects.filter(owner=self.alice).count(), 1)
+
+    def test_document_subset(self):
+        log = self._ask(self.alice, document_ids=[self.alice_docs[1].id])
+        self.assertEqual({c["document_id"] for c in log.citations}, {self.alice_docs[1].id})
+
+    def test_rejects_other_users_documents(self):
+        with self.assertRaises(PermissionDenied):
+            self._ask(self.alice, document_ids=[self.bob_doc.id])
+
+    def test_deleting_document_removes_it_from_corpus(self):
+        deleted_id = self.alice_docs[0].id
+        self.alice_docs[0].delete()
+
+        corpus = load_corpus_store(self.provider)
+        self.assertNotIn(deleted_id, corpus.document_ids())
+        self.assertIn(self.bob_doc.id, corpus.document_ids())
+
+    def test_ingestion_appends_without_rewriting_segments(self):
+        segments = read_manifest(get_corpus_index_dir())["segments"]
+        self.assertEqual(len(segments), 3)
+
+        before = {s["name"] for s in segments}
+        self._ingest(self.alice, "SG-03 The vehicle shall log faults.")
+        after = {s["name"] for s in read_manifest(get_corpus_index_dir())["segments"]}
+        self.assertEqual(len(after - before), 1)
+        self.assertLessEqual(before, after)
+
+    def test_segments_are_compacted(self):
+        with self.settings(CORPUS_MAX_SEGMENTS=3):
+            self._ingest(self.alice, "SG-03 The vehicle shall log faults.")
+
+        self.assertEqual(len(read_manifest(get_corpus_index_dir())["segments"]), 1)
+        get_index_cache().clear()
+        self.assertEqual(len(load_corpus_store(self.provider).document_ids()), 4)
+
+    @override_settings(STREAMLIT_API_KEY="secret")
+    def test_non_integer_document_ids_are_rejected(self):
+        response = self.client.post(
+            "/api/documents/query/",
+            data=json.dumps({"question": "What are the requirements?", "document_ids": ["abc"]}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer secret",
+        )
+        self.assertEqual(response.status_code, 400)
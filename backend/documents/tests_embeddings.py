@@ -0,0 +1,173 @@
+import tempfile
+from pathlib import Path
+from typing import List
+from unittest import mock
+import numpy as np
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from documents import embeddings
+from llm.embedding_cache import CachedEmbeddingProvider
+from llm.embeddings import DummyEmbeddingProvider, HashingEmbeddingProvider
+from llm.vectorstore import FAISSVectorStore
+
+
+class EmbeddingBatchTests(TestCase):
+    def setUp(self):
+        self.provider = DummyEmbeddingProvider()
+
+    def test_embed_array_is_contiguous_float32(self):
+        vectors = self.provider.embed_array(["a", "bb", "ccc"])
+
+        self.assertEqual(vectors.shape, (3, self.provider.dim))
+        self.assertEqual(vectors.dtype, np.float32)
+        self.assertTrue(vectors.flags["C_CONTIGUOUS"])
+        self.assertEqual(self.provider.embed_array([]).shape, (0, self.provider.dim))
+
+    def test_embed_batches_streams_fixed_size_batches(self):
+        texts = (f"chunk {i}" for i in range(7))
+        batches = list(self.provider.embed_batches(texts, batch_size=3))
+
+        self.assertEqual([len(b) for b in batches], [3, 3, 1])
+        np.testing.assert_array_equal(
+            np.vstack(batches),
+            self.provider.embed_array([f"chunk {i}" for i in range(7)]),
+        )
+
+    def test_batches_can_be_added_to_faiss_directly(self):
+        store = FAISSVectorStore(dim=self.provider.dim)
+        texts = [f"chunk {i}" for i in range(5)]
+        offset = 0
+        for vectors in self.provider.embed_batches(texts, batch_size=2):
+            store.add(vectors, [{"chunk_text": t} for t in texts[offset:offset + len(vectors)]])
+            offset += len(vectors)
+
+        self.assertEqual(store.index.ntotal, 5)
+        self.assertEqual(len(store.metadatas), 5)
+
+
+class CountingEmbeddingProvider(DummyEmbeddingProvider):
+    def __init__(self):
+        self.embedded: List[str] = []
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(t)), float(i), 0.0, 0.0, 1.0] for i, t in enumerate(texts)]
+
+
+class EmbeddingCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_unseen_texts_are_embedded(self):
+        inner = CountingEmbeddingProvider()
+        cached = CachedEmbeddingProvider(inner, cache_dir=self.tmp.name)
+
+        first = cached.embed_array(["boilerplate", "SG-01", "boilerplate"])
+        second = cached.embed_array(["SG-01", "SG-02", "boilerplate"])
+
+        self.assertEqual(inner.embedded, ["boilerplate", "SG-01", "SG-02"])
+        np.testing.assert_array_equal(first[0], first[2])
+        np.testing.assert_array_equal(second[0], first[1])
+        np.testing.assert_array_equal(second[2], first[0])
+        self.assertEqual(cached.stats(), {"hits": 2, "misses": 4, "entries": 3})
+
+    def test_cache_persists_across_instances(self):
+        first = CachedEmbeddingProvider(CountingEmbeddingProvider(), cache_dir=self.tmp.name)
+        expected = first.embed_array(["SYS-123 shall log faults."])
+
+        inner = CountingEmbeddingProvider()
+        second = CachedEmbeddingProvider(inner, cache_dir=self.tmp.name)
+        np.testing.assert_array_equal(second.embed_array(["SYS-123 shall log faults."]), expected)
+        self.assertEqual(inner.embedded, [])
+
+    def test_namespaces_are_isolated_by_provider(self):
+        class OtherProvider(CountingEmbeddingProvider):
+            pass
+
+        CachedEmbeddingProvider(CountingEmbeddingProvider(), cache_dir=self.tmp.name).embed(["x"])
+        inner = OtherProvider()
+        CachedEmbeddingProvider(inner, cache_dir=self.tmp.name).embed(["x"])
+        self.assertEqual(inner.embedded, ["x"])
+
+    def test_torn_append_is_truncated_before_the_next_write(self):
+        first = CachedEmbeddingProvider(CountingEmbeddingProvider(), cache_dir=self.tmp.name)
+        expected = first.embed_array(["SG-01"])
+        # A writer killed mid-append left half a vector and half a record.
+        with open(first.cache._vectors_path, "ab") as f:
+            f.write(b"\0" * (first.cache._row_bytes // 2))
+        with open(first.cache._index_path, "ab") as f:
+            f.write(b"\0" * 5)
+
+        second = CachedEmbeddingProvider(CountingEmbeddingProvider(), cache_dir=self.tmp.name)
+        added = second.embed_array(["SG-02"])
+
+        inner = CountingEmbeddingProvider()
+        third = CachedEmbeddingProvider(inner, cache_dir=self.tmp.name)
+        np.testing.assert_array_equal(third.embed_array(["SG-01", "SG-02"]), np.vstack([expected, added]))
+        self.assertEqual(inner.embedded, [])
+
+
+class HashingEmbeddingTests(TestCase):
+    def test_deterministic_and_normalised(self):
+        texts = ["SG-01 the vehicle shall stop", "brake pressure threshold", ""]
+        first = HashingEmbeddingProvider(dim=64).embed_array(texts)
+        second = HashingEmbeddingProvider(dim=64).embed_array(texts)
+
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_allclose(np.linalg.norm(first[:2], axis=1), 1.0, rtol=1e-5)
+        self.assertFalse(first[2].any())
+
+    def test_shared_terms_are_closer(self):
+        provider = HashingEmbeddingProvider(dim=256)
+        query, near, far = provider.embed_array(
+            ["SG-01 brake pressure", "SG-01 shall limit brake pressure", "display colour palette"]
+        )
+
+        self.assertGreater(query @ near, query @ far)
+
+
+class BackendEmbeddingProviderTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.multiple(embeddings, _model_provider=None, _embedding_provider=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_queries_skip_the_cache_and_share_the_model(self):
+        with override_settings(EMBEDDING_CACHE_ENABLED=True, EMBEDDING_CACHE_ROOT=Path(self.tmp.name)), \
+                mock.patch.object(embeddings, "HuggingFaceEmbeddingProvider", return_value=DummyEmbeddingProvider()):
+            query_provider = embeddings.get_query_embedding_provider()
+            ingest_provider = embeddings.get_embedding_provider()
+
+        self.assertNotIsInstance(query_provider, CachedEmbeddingProvider)
+        self.assertIsInstance(ingest_provider, CachedEmbeddingProvider)
+        self.assertIs(ingest_provider.provider, query_provider)
+
+    def test_document_texts_of_the_query_model_use_the_cache(self):
+        with override_settings(EMBEDDING_CACHE_ENABLED=True, EMBEDDING_CACHE_ROOT=Path(self.tmp.name)), \
+                mock.patch.object(embeddings, "HuggingFaceEmbeddingProvider", return_value=DummyEmbeddingProvider()):
+            query_provider = embeddings.get_query_embedding_provider()
+            document_provider = embeddings.get_document_embedding_provider(query_provider)
+
+        self.assertIs(document_provider, embeddings.get_embedding_provider())
+        other = DummyEmbeddingProvider()
+        self.assertIs(embeddings.get_document_embedding_provider(other), other)
+
+    def test_cache_lookups_are_exported(self):
+        def lookups(result):
+            return REGISTRY.get_sample_value("chatpdf_embedding_cache_lookups_total", {"result": result}) or 0.0
+
+        with override_settings(EMBEDDING_CACHE_ENABLED=True, EMBEDDING_CACHE_ROOT=Path(self.tmp.name)), \
+                mock.patch.object(embeddings, "HuggingFaceEmbeddingProvider", return_value=DummyEmbeddingProvider()):
+            provider = embeddings.get_embedding_provider()
+        hits, misses = lookups("hit"), lookups("miss")
+
+        provider.embed_array(["SG-01", "SG-02"])
+        provider.embed_array(["SG-01"])
+
+        self.assertEqual(lookups("hit"), hits + 1)
+        self.assertEqual(lookups("miss"), misses + 2)
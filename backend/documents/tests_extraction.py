@@ -0,0 +1,45 @@
+from io import BytesIO
+from django.test import TestCase
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from llm.chunking import chunk_text
+from llm.extraction import ExtractedText, extract_pdf_text
+
+
+def _make_pdf(page_count: int) -> bytes:
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for i in range(1, page_count + 1):
+        pdf.drawString(72, 720, f"SYS-{i:03d} The system shall respond on page {i}.")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class PDFExtractionTests(TestCase):
+    def test_parallel_matches_serial_in_page_order(self):
+        pdf_bytes = _make_pdf(40)
+
+        serial = extract_pdf_text(pdf_bytes, max_workers=1)
+        parallel = extract_pdf_text(pdf_bytes, max_workers=4, pages_per_task=8)
+
+        self.assertEqual(parallel.text, serial.text)
+        self.assertEqual(parallel.page_offsets, serial.page_offsets)
+        self.assertEqual(parallel.page_count, 40)
+        self.assertLess(parallel.text.index("SYS-001"), parallel.text.index("SYS-040"))
+
+    def test_page_offsets_map_chunks_to_pages(self):
+        extracted = extract_pdf_text(_make_pdf(3), max_workers=1)
+
+        page_two = extracted.text.index("SYS-002")
+        self.assertEqual(extracted.page_for_offset(0), 1)
+        self.assertEqual(extracted.page_for_offset(page_two), 2)
+
+        chunks = extracted.annotate_chunks(chunk_text(extracted.text, max_chars=20, overlap=0))
+        self.assertEqual(chunks[0]["page"], 1)
+        self.assertEqual(chunks[-1]["page"], 3)
+
+    def test_plain_text_has_no_pages(self):
+        extracted = ExtractedText(text="plain text")
+        chunks = extracted.annotate_chunks(chunk_text(extracted.text))
+        self.assertNotIn("page", chunks[0])
@@ -0,0 +1,73 @@
+import os
+import tempfile
+from pathlib import Path
+from django.test import TestCase
+from llm.embeddings import DummyEmbeddingProvider
+from llm.index_cache import FAISSIndexCache
+from llm.vectorstore import FAISSVectorStore
+
+
+def _write_index(index_dir: Path, texts):
+    provider = DummyEmbeddingProvider()
+    store = FAISSVectorStore(dim=provider.dim)
+    store.add(
+        embeddings=provider.embed(texts),
+        metadatas=[{"chunk_text": t, "chunk_index": i} for i, t in enumerate(texts)],
+    )
+    store.save(index_dir)
+
+
+class FAISSIndexCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.provider = DummyEmbeddingProvider()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_get_is_a_hit(self):
+        index_dir = self.root / "document_1"
+        _write_index(index_dir, ["alpha", "beta"])
+        cache = FAISSIndexCache(max_bytes=10 * 1024 * 1024)
+
+        first = cache.get(1, index_dir=index_dir, embedding_provider=self.provider)
+        second = cache.get(1, index_dir=index_dir, embedding_provider=self.provider)
+
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_reloads_when_files_change(self):
+        index_dir = self.root / "document_1"
+        _write_index(index_dir, ["alpha"])
+        cache = FAISSIndexCache(max_bytes=10 * 1024 * 1024)
+        first = cache.get(1, index_dir=index_dir, embedding_provider=self.provider)
+
+        _write_index(index_dir, ["alpha", "beta", "gamma"])
+        for f in index_dir.iterdir():
+            stat = f.stat()
+            os.utime(f, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        second = cache.get(1, index_dir=index_dir, embedding_provider=self.provider)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.index.ntotal, 3)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_evicts_least_recently_used(self):
+        for doc_id in (1, 2, 3):
+            _write_index(self.root / f"document_{doc_id}", ["x" * 100])
+        one_index = sum(f.stat().st_size for f in (self.root / "document_1").iterdir())
+        cache = FAISSIndexCache(max_bytes=one_index * 2)
+
+        cache.get(1, index_dir=self.root / "document_1", embedding_provider=self.provider)
+        cache.get(2, index_dir=self.root / "document_2", embedding_provider=self.provider)
+        cache.get(1, index_dir=self.root / "document_1", embedding_provider=self.provider)
+        cache.get(3, index_dir=self.root / "document_3", embedding_provider=self.provider)
+
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["entries"], 2)
+        cache.get(1, index_dir=self.root / "document_1", embedding_provider=self.provider)
+        self.assertEqual(cache.stats()["hits"], 2)
@@ -0,0 +1,236 @@
+import json
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from documents.models import Document, IngestionJob
+from documents.jobs import claim_next_job, enqueue_ingestion, renew_lease, run_job, run_next_job
+from documents.services import DocumentNotReady, _load_vector_store
+from llm.embeddings import DummyEmbeddingProvider
+from llm.extraction import ExtractedText
+
+User = get_user_model()
+
+
+class IngestionJobQueueTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+            INGESTION_MAX_ATTEMPTS=2,
+            INGESTION_RETRY_DELAY_SECONDS=0,
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user("alice", password="pass")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def _document(self, content=None):
+        doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        if content is not None:
+            doc.pdf_file.save("doc.txt", ContentFile(content))
+        return doc
+
+    def test_enqueue_is_idempotent_while_active(self):
+        doc = self._document("LangChain is a framework for LLMs.")
+        first = enqueue_ingestion(doc)
+        second = enqueue_ingestion(doc)
+
+        self.assertEqual(first.id, second.id)
+        doc.refresh_from_db()
+        self.assertEqual(doc.ingestion_status, Document.IngestionStatus.QUEUED)
+
+    def test_worker_ingests_queued_document(self):
+        doc = self._document("LangChain is a framework for LLMs.")
+        job = enqueue_ingestion(doc)
+
+        self.assertTrue(run_next_job(embedding_provider=DummyEmbeddingProvider()))
+        self.assertFalse(run_next_job(embedding_provider=DummyEmbeddingProvider()))
+
+        job.refresh_from_db()
+        doc.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.Status.SUCCEEDED)
+        self.assertTrue(doc.is_processed)
+        self.assertEqual(doc.ingestion_status, Document.IngestionStatus.SUCCEEDED)
+        self.assertEqual(doc.ingestion_progress, 100)
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        doc = self._document()
+        job = enqueue_ingestion(doc)
+
+        run_next_job(embedding_provider=DummyEmbeddingProvider())
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.Status.PENDING)
+        self.assertEqual(job.attempts, 1)
+
+        run_next_job(embedding_provider=DummyEmbeddingProvider())
+        job.refresh_from_db()
+        doc.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.Status.FAILED)
+        self.assertEqual(doc.ingestion_status, Document.IngestionStatus.FAILED)
+        self.assertIn("no file", doc.ingestion_error)
+
+    def test_expired_lease_without_attempts_left_is_failed(self):
+        doc = self._document("LangChain is a framework for LLMs.")
+        job = enqueue_ingestion(doc)
+        # The worker claimed the job for its last attempt and then died.
+        IngestionJob.objects.filter(id=job.id).update(
+            status=IngestionJob.Status.RUNNING,
+            attempts=2,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertFalse(run_next_job(embedding_provider=DummyEmbeddingProvider()))
+
+        job.refresh_from_db()
+        doc.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.Status.FAILED)
+        self.assertEqual(doc.ingestion_status, Document.IngestionStatus.FAILED)
+
+    def test_expired_lease_with_attempts_left_is_reclaimed(self):
+        doc = self._document("LangChain is a framework for LLMs.")
+        job = enqueue_ingestion(doc)
+        IngestionJob.objects.filter(id=job.id).update(
+            status=IngestionJob.Status.RUNNING,
+            attempts=1,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertTrue(run_next_job(embedding_provider=DummyEmbeddingProvider()))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.Status.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_extraction_workers_are_passed_to_the_pdf_extractor(self):
+        doc = Document.objects.create(owner=self.user, filename="doc.pdf")
+        doc.pdf_file.save("doc.pdf", ContentFile(b"%PDF-1.4"))
+        enqueue_ingestion(doc)
+
+        with mock.patch(
+            "documents.ingestion.extract_pdf_text",
+            return_value=ExtractedText(text="LangChain is a framework for LLMs."),
+        ) as extract:
+            run_next_job(embedding_provider=DummyEmbeddingProvider(), extraction_workers=3)
+
+        self.assertEqual(extract.call_args.kwargs["max_workers"], 3)
+
+    def test_renewed_lease_is_not_reclaimed(self):
+        doc = self._document("LangChain is a framework for LLMs.")
+        enqueue_ingestion(doc)
+        job = claim_next_job("worker-a")
+        # Running for longer than the timeout, but still heartbeating.
+        IngestionJob.objects.filter(id=job.id).update(
+            started_at=timezone.now() - timedelta(days=1),
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertTrue(renew_lease(job))
+        self.assertIsNone(claim_next_job("worker-b"))
+
+    def test_worker_that_lost_its_lease_does_not_complete_the_job(self):
+        doc = self._document("LangChain is a framework for LLMs.")
+        enqueue_ingestion(doc)
+        job = claim_next_job("worker-a")
+        IngestionJob.objects.filter(id=job.id).update(
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+        reclaimed = claim_next_job("worker-b")
+        self.assertEqual(reclaimed.id, job.id)
+
+        self.assertFalse(run_job(job, embedding_provider=DummyEmbeddingProvider()))
+        self.assertFalse(renew_lease(job))
+
+        reclaimed.refresh_from_db()
+        self.assertEqual(reclaimed.status, IngestionJob.Status.RUNNING)
+        self.assertEqual(reclaimed.worker, "worker-b")
+
+
+@override_settings(STREAMLIT_API_KEY="secret")
+class QueryBeforeIngestionTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user("streamlit_service_user")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile("SG-01 The vehicle shall stop."))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def post(self, path, payload):
+        return self.client.post(
+            f"/api/documents/{self.doc.id}/{path}",
+            data=json.dumps(payload),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer secret",
+            HTTP_X_LLM_PROVIDER="openai",
+            HTTP_X_LLM_API_KEY="sk-test",
+        )
+
+    def test_queued_document_is_not_indexed_on_the_request(self):
+        enqueue_ingestion(self.doc)
+
+        with mock.patch("documents.services._rebuild_index") as rebuild, \
+                mock.patch("documents.views.get_llm_from_request", return_value=(object(), None)):
+            response = self.post("query/", {"question": "What does SG-01 require?"})
+            batch = self.post("query/batch/", {"questions": ["What does SG-01 require?"]})
+
+        rebuild.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["ingestion_status"], Document.IngestionStatus.QUEUED)
+        self.assertEqual(batch.status_code, 202)
+
+    def test_failed_document_returns_conflict(self):
+        Document.objects.filter(id=self.doc.id).update(
+            ingestion_status=Document.IngestionStatus.FAILED,
+            ingestion_error="boom",
+        )
+
+        with mock.patch("documents.views.get_llm_from_request", return_value=(object(), None)):
+            response = self.post("query/", {"question": "What does SG-01 require?"})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["ingestion_error"], "boom")
+
+    def test_requeue_from_the_view_is_committed(self):
+        Document.objects.filter(id=self.doc.id).update(
+            ingestion_status=Document.IngestionStatus.SUCCEEDED,
+            is_processed=True,
+        )
+
+        with mock.patch("documents.views.get_llm_from_request", return_value=(object(), None)), \
+                mock.patch("documents.views.get_query_embedding_provider", return_value=DummyEmbeddingProvider()):
+            response = self.post("query/", {"question": "What does SG-01 require?"})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(
+            IngestionJob.objects.filter(document=self.doc, status=IngestionJob.Status.PENDING).exists()
+        )
+        self.doc.refresh_from_db()
+        self.assertEqual(self.doc.ingestion_status, Document.IngestionStatus.QUEUED)
+
+    def test_missing_index_of_ingested_document_is_requeued(self):
+        Document.objects.filter(id=self.doc.id).update(
+            ingestion_status=Document.IngestionStatus.SUCCEEDED,
+            is_processed=True,
+        )
+        self.doc.refresh_from_db()
+
+        with self.assertRaises(DocumentNotReady):
+            _load_vector_store(self.doc, DummyEmbeddingProvider())
+
+        self.assertTrue(
+            IngestionJob.objects.filter(document=self.doc, status=IngestionJob.Status.PENDING).exists()
+        )
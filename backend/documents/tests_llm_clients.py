@@ -0,0 +1,90 @@
+from django.test import RequestFactory, TestCase, override_settings
+from langchain_core.language_models.fake import FakeListLLM
+from documents.llm_clients import LLMClientPool, get_llm_client_pool
+from documents.views import get_llm_from_request
+from llm.chains import get_rag_chain
+
+
+class LLMClientPoolTests(TestCase):
+    def setUp(self):
+        get_llm_client_pool().clear()
+
+    def tearDown(self):
+        get_llm_client_pool().clear()
+
+    def test_same_key_reuses_client(self):
+        pool = LLMClientPool(max_size=4)
+
+        first = pool.get("openai", "sk-one")
+        second = pool.get("openai", "sk-one")
+        other = pool.get("openai", "sk-two")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(pool.stats()["hits"], 1)
+        self.assertEqual(pool.stats()["misses"], 2)
+
+    def test_api_key_not_used_as_pool_key(self):
+        pool = LLMClientPool(max_size=4)
+        pool.get("openai", "sk-secret")
+
+        for key in pool._clients:
+            self.assertNotIn("sk-secret", key)
+
+    def test_least_recently_used_client_is_evicted(self):
+        pool = LLMClientPool(max_size=2)
+
+        a = pool.get("openai", "a")
+        pool.get("openai", "b")
+        pool.get("openai", "a")
+        pool.get("openai", "c")
+
+        self.assertIs(pool.get("openai", "a"), a)
+        self.assertEqual(pool.stats()["evictions"], 1)
+        self.assertEqual(pool.stats()["clients"], 2)
+
+    def test_unsupported_provider(self):
+        with self.assertRaises(ValueError):
+            LLMClientPool(max_size=2).get("unknown", "key")
+
+    @override_settings(LLM_CLIENT_POOL_SIZE=4)
+    def test_request_uses_pooled_client(self):
+        factory = RequestFactory()
+
+        def request():
+            return factory.post(
+                "/api/documents/1/query/",
+                HTTP_X_LLM_PROVIDER="openai",
+                HTTP_X_LLM_API_KEY="sk-test",
+            )
+
+        first, error = get_llm_from_request(request())
+        second, _ = get_llm_from_request(request())
+
+        self.assertIsNone(error)
+        self.assertIs(first, second)
+
+        _, error = get_llm_from_request(
+            factory.post("/", HTTP_X_LLM_PROVIDER="other", HTTP_X_LLM_API_KEY="k")
+        )
+        self.assertIn("Unsupported", error)
+
+
+class RagChainMemoTests(TestCase):
+    def test_chain_reused_per_llm(self):
+        llm = FakeListLLM(responses=["a"])
+        other = FakeListLLM(responses=["b"])
+
+        self.assertIs(get_rag_chain(llm), get_rag_chain(llm))
+        self.assertIsNot(get_rag_chain(llm), get_rag_chain(other))
+
+    def test_chain_cache_is_bounded(self):
+        from llm import chains
+
+        llms = [FakeListLLM(responses=["a"]) for _ in range(chains.RAG_CHAIN_CACHE_SIZE + 1)]
+        first_chain = get_rag_chain(llms[0])
+        for llm in llms[1:]:
+            get_rag_chain(llm)
+
+        self.assertEqual(len(chains._chains), chains.RAG_CHAIN_CACHE_SIZE)
+        self.assertIsNot(get_rag_chain(llms[0]), first_chain)
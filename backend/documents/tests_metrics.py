@@ -0,0 +1,145 @@
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from django.test import RequestFactory, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from langchain_core.language_models.fake import FakeListLLM
+from prometheus_client import REGISTRY
+from chatpdf_backend.metrics_dir import remove_stale_metrics
+from documents.index_cache import get_index_cache
+from documents.ingestion import ingest_document
+from documents.metrics import LLMMetricsHandler, MeteredEmbeddingProvider
+from documents.models import Document
+from documents.services import _load_vector_store
+from documents.views import get_llm_from_request
+from llm.embeddings import DummyEmbeddingProvider
+
+User = get_user_model()
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class FailingLLM(FakeListLLM):
+    def _call(self, *args, **kwargs):
+        raise RuntimeError("provider down")
+
+
+class MetricsEndpointTests(TestCase):
+    def test_exposes_metrics(self):
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"chatpdf_request_latency_seconds", response.content)
+        self.assertIn(b"chatpdf_llm_errors_total", response.content)
+
+    def test_records_request_latency_by_route(self):
+        labels = {"view": "api/documents/<int:document_id>/status/", "method": "GET", "status": "401"}
+        before = sample("chatpdf_request_latency_seconds_count", **labels)
+
+        self.client.get("/api/documents/1/status/")
+
+        self.assertEqual(sample("chatpdf_request_latency_seconds_count", **labels), before + 1)
+
+
+class MetricsDirTests(TestCase):
+    def test_only_files_of_dead_processes_are_removed(self):
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        with tempfile.TemporaryDirectory() as tmp:
+            live_file = Path(tmp) / f"counter_{os.getpid()}.db"
+            dead_file = Path(tmp) / f"counter_{dead.pid}.db"
+            live_file.touch()
+            dead_file.touch()
+
+            remove_stale_metrics(Path(tmp))
+
+            self.assertTrue(live_file.exists())
+            self.assertFalse(dead_file.exists())
+
+
+class PipelineMetricsTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        get_index_cache().clear()
+        self.provider = DummyEmbeddingProvider()
+        self.user = User.objects.create_user("alice", password="pass")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile("SG-01 The vehicle shall stop."))
+
+    def tearDown(self):
+        get_index_cache().clear()
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def test_ingestion_and_index_cache(self):
+        ingested = sample("chatpdf_ingestion_duration_seconds_count", result="succeeded")
+        chunks = sample("chatpdf_ingestion_chunks_sum")
+        misses = sample("chatpdf_index_cache_lookups_total", result="miss")
+        hits = sample("chatpdf_index_cache_lookups_total", result="hit")
+
+        ingest_document(document=self.doc, embedding_provider=self.provider)
+        self.doc.refresh_from_db()
+        _load_vector_store(self.doc, self.provider)
+        _load_vector_store(self.doc, self.provider)
+
+        self.assertEqual(sample("chatpdf_ingestion_duration_seconds_count", result="succeeded"), ingested + 1)
+        self.assertEqual(sample("chatpdf_ingestion_chunks_sum"), chunks + 1)
+        self.assertEqual(sample("chatpdf_index_cache_lookups_total", result="miss"), misses + 1)
+        self.assertEqual(sample("chatpdf_index_cache_lookups_total", result="hit"), hits + 1)
+
+    def test_failed_ingestion(self):
+        failed = sample("chatpdf_ingestion_duration_seconds_count", result="failed")
+        self.doc.pdf_file.save("empty.txt", ContentFile(" "))
+
+        with self.assertRaises(Exception):
+            ingest_document(document=self.doc, embedding_provider=self.provider)
+
+        self.assertEqual(sample("chatpdf_ingestion_duration_seconds_count", result="failed"), failed + 1)
+
+    def test_metered_embeddings(self):
+        provider = MeteredEmbeddingProvider(self.provider)
+        texts = sample("chatpdf_embedded_texts_total")
+        batches = sample("chatpdf_embedding_batch_size_count")
+
+        provider.embed_array(["a", "b", "c"])
+        provider.embed(["d"])
+        provider.embed_array([])
+
+        self.assertEqual(sample("chatpdf_embedded_texts_total"), texts + 4)
+        self.assertEqual(sample("chatpdf_embedding_batch_size_count"), batches + 2)
+        self.assertEqual(provider.cache_namespace, self.provider.cache_namespace)
+        self.assertEqual(provider.dim, self.provider.dim)
+
+
+class LLMMetricsTests(TestCase):
+    def test_latency_and_errors_by_provider(self):
+        calls = sample("chatpdf_llm_latency_seconds_count", provider="test")
+        errors = sample("chatpdf_llm_errors_total", provider="test", kind="call")
+
+        FakeListLLM(responses=["ok"], callbacks=[LLMMetricsHandler("test")]).invoke("hi")
+        with self.assertRaises(RuntimeError):
+            FailingLLM(responses=["ok"], callbacks=[LLMMetricsHandler("test")]).invoke("hi")
+
+        self.assertEqual(sample("chatpdf_llm_latency_seconds_count", provider="test"), calls + 2)
+        self.assertEqual(sample("chatpdf_llm_errors_total", provider="test", kind="call"), errors + 1)
+
+    def test_rejected_requests(self):
+        factory = RequestFactory()
+        unsupported = sample("chatpdf_llm_errors_total", provider="unsupported", kind="request")
+        missing = sample("chatpdf_llm_errors_total", provider="missing", kind="request")
+
+        get_llm_from_request(factory.post("/", HTTP_X_LLM_PROVIDER="acme", HTTP_X_LLM_API_KEY="k"))
+        get_llm_from_request(factory.post("/"))
+
+        self.assertEqual(sample("chatpdf_llm_errors_total", provider="unsupported", kind="request"), unsupported + 1)
+        self.assertEqual(sample("chatpdf_llm_errors_total", provider="missing", kind="request"), missing + 1)
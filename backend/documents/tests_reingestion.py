@@ -0,0 +1,121 @@
+import tempfile
+import zlib
+from pathlib import Path
+from typing import List
+import numpy as np
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from documents.ingestion import get_document_index_dir, ingest_document, write_index_atomically
+from documents.models import Document
+from llm.embeddings import DummyEmbeddingProvider
+from llm.vectorstore import FAISSVectorStore
+
+User = get_user_model()
+
+
+class RecordingEmbeddingProvider(DummyEmbeddingProvider):
+    def __init__(self):
+        self.embedded: List[str] = []
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [
+            np.random.default_rng(zlib.crc32(t.encode())).standard_normal(self.dim).tolist()
+            for t in texts
+        ]
+
+
+class IncrementalReingestionTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+            EMBEDDING_BATCH_SIZE=2,
+            CHUNK_MAX_TOKENS=100,
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user("alice", password="pass")
+        self.provider = RecordingEmbeddingProvider()
+        self.text = "".join(
+            f"REQ-{i:03d} " + "The system shall log every braking event. " * 8 + "\n\n"
+            for i in range(12)
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def _ingest(self, doc, text):
+        doc.pdf_file.save("doc.txt", ContentFile(text))
+        self.provider.embedded = []
+        ingest_document(document=doc, embedding_provider=self.provider, force=True)
+        store = FAISSVectorStore(dim=self.provider.dim)
+        store.load(get_document_index_dir(doc.id))
+        return store
+
+    def _fresh(self, text):
+        doc = Document.objects.create(owner=self.user, filename="fresh.txt")
+        return self._ingest(doc, text)
+
+    def test_unchanged_document_is_not_re_embedded(self):
+        doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        first = self._ingest(doc, self.text)
+        self.assertEqual(len(self.provider.embedded), len(first.metadatas))
+
+        second = self._ingest(doc, self.text)
+
+        self.assertEqual(self.provider.embedded, [])
+        np.testing.assert_array_equal(second.reconstruct_vectors(), first.reconstruct_vectors())
+
+    def test_only_changed_chunks_are_embedded(self):
+        doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        before = self._ingest(doc, self.text)
+
+        edited = self.text.replace("REQ-005 The system", "REQ-005 The XYZ system")
+        after = self._ingest(doc, edited)
+        changed = set(self.provider.embedded)
+
+        # Exactly the chunks whose text is new are embedded, wherever the
+        # tokenizer puts the chunk boundaries.
+        before_texts = {m["chunk_text"] for m in before.metadatas}
+        new_texts = {m["chunk_text"] for m in after.metadatas} - before_texts
+        self.assertTrue(new_texts)
+        self.assertEqual(changed, new_texts)
+        self.assertLess(len(self.provider.embedded), len(after.metadatas))
+
+        expected = self._fresh(edited)
+        self.assertEqual(
+            [m["chunk_text"] for m in after.metadatas],
+            [m["chunk_text"] for m in expected.metadatas],
+        )
+        np.testing.assert_array_equal(after.reconstruct_vectors(), expected.reconstruct_vectors())
+
+    def test_index_dir_is_swapped_atomically(self):
+        doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        index_dir = get_document_index_dir(doc.id)
+        for i in range(3):
+            self._ingest(doc, self.text + f" revision {i}")
+            self.assertTrue(index_dir.is_symlink())
+
+        versions = sorted(Path(self.tmp.name).glob(f"{index_dir.name}.v*"))
+        # The current version plus the one it replaced.
+        self.assertEqual(len(versions), 2)
+        self.assertIn(index_dir.resolve(), versions)
+        self.assertEqual(list(Path(self.tmp.name).glob(f".{index_dir.name}.*")), [])
+
+    def test_legacy_directory_is_replaced(self):
+        index_dir = Path(self.tmp.name) / "document_legacy"
+        legacy = FAISSVectorStore(dim=2)
+        legacy.add([[1.0, 0.0]], [{"chunk_text": "old"}])
+        legacy.save(index_dir)
+
+        store = FAISSVectorStore(dim=2)
+        store.add([[0.0, 1.0]], [{"chunk_text": "new"}])
+        write_index_atomically(store, index_dir)
+
+        self.assertTrue(index_dir.is_symlink())
+        loaded = FAISSVectorStore(dim=2)
+        loaded.load(index_dir)
+        self.assertEqual(loaded.metadatas[0]["chunk_text"], "new")
@@ -0,0 +1,74 @@
+import tempfile
+from pathlib import Path
+import numpy as np
+from django.test import TestCase
+from llm.sharded import ShardedVectorStore, shard_dir, shard_for_document
+from llm.vectorstore import FAISSVectorStore
+
+
+def _corpus(documents: int, chunks: int, dim: int):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((documents * chunks, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadatas = [
+        {"document_id": i // chunks, "chunk_index": i % chunks, "chunk_text": f"chunk {i}"}
+        for i in range(len(vectors))
+    ]
+    return vectors, metadatas
+
+
+class ShardedVectorStoreTests(TestCase):
+    def setUp(self):
+        self.vectors, self.metadatas = _corpus(documents=40, chunks=5, dim=16)
+        self.store = ShardedVectorStore(dim=16, num_shards=4)
+        self.store.add(self.vectors, self.metadatas)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "sharded"
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_documents_stay_in_one_shard(self):
+        self.assertEqual(self.store.ntotal, len(self.vectors))
+        for shard, store in enumerate(self.store.shards):
+            self.assertGreater(store.ntotal, 0)
+            for metadata in store.metadatas:
+                self.assertEqual(shard_for_document(metadata["document_id"], 4), shard)
+
+    def test_fan_out_matches_unsharded_search(self):
+        flat = FAISSVectorStore(dim=16)
+        flat.add(self.vectors, self.metadatas)
+        queries = self.vectors[::17]
+
+        self.assertEqual(self.store.search_many(queries, k=7), flat.search_many(queries, k=7))
+        self.assertEqual(self.store.search(queries[0].tolist(), k=3), flat.search(queries[0].tolist(), k=3))
+
+    def test_round_trip_and_single_shard_save(self):
+        self.store.save(self.path)
+        loaded = ShardedVectorStore.load(self.path)
+        self.addCleanup(loaded.close)
+        query = self.vectors[3]
+        self.assertEqual(loaded.search_many([query], k=5), self.store.search_many([query], k=5))
+
+        # Index files removed here are only rewritten for dirty shards.
+        for shard in range(4):
+            (shard_dir(self.path, shard) / "index.faiss").unlink()
+        extra, extra_metadatas = _corpus(documents=1, chunks=2, dim=16)
+        for metadata in extra_metadatas:
+            metadata["document_id"] = 1000
+        loaded.add(extra, extra_metadatas)
+        loaded.save(self.path, only_dirty=True)
+
+        changed = shard_for_document(1000, 4)
+        for shard in range(4):
+            written = (shard_dir(self.path, shard) / "index.faiss").exists()
+            self.assertEqual(written, shard == changed)
+
+        reloaded = ShardedVectorStore(dim=16, num_shards=4)
+        reloaded.load_shard(changed, self.path)
+        self.assertEqual(reloaded.ntotal, self.store.shards[changed].ntotal + 2)
+
+    def test_missing_document_id_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.store.add(self.vectors[:1], [{"chunk_index": 0}])
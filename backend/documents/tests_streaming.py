@@ -0,0 +1,48 @@
+import tempfile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from documents.models import Document, QueryLog
+from documents.services import stream_document_answer
+from llm.embeddings import DummyEmbeddingProvider
+
+User = get_user_model()
+
+
+class StreamingAnswerTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user("alice", password="pass")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile("SG-01 The vehicle shall stop."))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def test_streams_tokens_then_logs_query(self):
+        events = list(
+            stream_document_answer(
+                user=self.user,
+                document=self.doc,
+                question="What does SG-01 require?",
+                embedding_provider=DummyEmbeddingProvider(),
+                llm=FakeStreamingListLLM(responses=["SG-01: stop the vehicle."]),
+            )
+        )
+
+        tokens = [data["text"] for event, data in events if event == "token"]
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual("".join(tokens), "SG-01: stop the vehicle.")
+
+        event, done = events[-1]
+        self.assertEqual(event, "done")
+        log = QueryLog.objects.get(id=done["query_id"])
+        self.assertEqual(log.answer, "SG-01: stop the vehicle.")
+        self.assertGreater(log.tokens_used, log.context_tokens)
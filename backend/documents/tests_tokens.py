@@ -0,0 +1,28 @@
+from django.test import TestCase
+from llm.tokens import (
+    count_tokens,
+    count_tokens_batch,
+    get_encoding,
+)
+
+
+class TokenCountingTests(TestCase):
+    def test_encoder_is_memoized(self):
+        self.assertIs(get_encoding("gpt-4o-mini"), get_encoding("gpt-4o-mini"))
+
+    def test_batch_matches_individual_counts(self):
+        texts = ["SG-01 The vehicle shall stop.", "", "SYS-123 " * 50]
+        self.assertEqual(
+            count_tokens_batch(texts),
+            [count_tokens(t) for t in texts],
+        )
+
+    def test_unknown_models_fall_back_to_default_encoding(self):
+        self.assertGreater(count_tokens("hello world", "models/gemini-2.5-flash-lite"), 0)
+
+    def test_approximate_mode_does_not_encode(self):
+        self.assertEqual(count_tokens("a" * 10, approximate=True), 3)
+        self.assertEqual(count_tokens_batch(["abcd", ""], approximate=True), [1, 0])
+
+    def test_special_token_text_is_counted_as_plain_text(self):
+        self.assertGreater(count_tokens("<|endoftext|>"), 1)
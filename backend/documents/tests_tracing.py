@@ -0,0 +1,123 @@
+import tempfile
+import time
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from documents.index_cache import get_index_cache
+from documents.models import Document, QueryLog
+from documents.services import answer_document_question, stream_document_answer
+from llm.embeddings import DummyEmbeddingProvider
+from llm.tracing import Trace, aggregate_timings
+
+User = get_user_model()
+
+STAGES = {
+    "index_load",
+    "embed_query",
+    "cache_lookup",
+    "search",
+    "context",
+    "llm_total",
+    "grounding",
+    "db_write",
+    "total",
+}
+
+
+class TraceTests(TestCase):
+    def test_spans_accumulate(self):
+        trace = Trace()
+        for _ in range(2):
+            with trace.span("search"):
+                time.sleep(0.01)
+
+        timings = trace.as_dict()
+        self.assertGreaterEqual(timings["search"], 20)
+        self.assertGreaterEqual(timings["total"], timings["search"])
+
+    def test_span_recorded_when_body_raises(self):
+        trace = Trace()
+        with self.assertRaises(ValueError):
+            with trace.span("llm_total"):
+                raise ValueError
+
+        self.assertIn("llm_total", trace.spans)
+
+    def test_aggregate_percentiles(self):
+        timings = [{"search": float(ms), "total": 2.0 * ms} for ms in range(1, 101)]
+        timings.append(None)
+
+        aggregates = aggregate_timings(timings)
+
+        self.assertEqual(list(aggregates), ["total", "search"])
+        self.assertEqual(aggregates["search"]["count"], 100)
+        self.assertAlmostEqual(aggregates["search"]["p50"], 50.5)
+        self.assertAlmostEqual(aggregates["search"]["p99"], 99.0, places=0)
+
+
+class QueryTimingTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+            ANSWER_CACHE_ENABLED=False,
+        )
+        self.settings_override.enable()
+        get_index_cache().clear()
+        self.user = User.objects.create_user("alice", password="pass")
+        self.doc = Document.objects.create(owner=self.user, filename="doc.txt")
+        self.doc.pdf_file.save("doc.txt", ContentFile("SG-01 The vehicle shall stop."))
+
+    def tearDown(self):
+        get_index_cache().clear()
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def test_answer_records_every_stage(self):
+        log = answer_document_question(
+            user=self.user,
+            document=self.doc,
+            question="What does SG-01 require?",
+            embedding_provider=DummyEmbeddingProvider(),
+            llm=FakeStreamingListLLM(responses=["SG-01: stop the vehicle."]),
+        )
+
+        log.refresh_from_db()
+        self.assertEqual(set(log.timings), STAGES)
+        # The index is built on this first query and counted in the latency.
+        self.assertEqual(log.latency_ms, int(log.timings["total"]))
+        self.assertGreaterEqual(log.timings["total"], log.timings["index_load"])
+
+    def test_stream_records_time_to_first_token(self):
+        events = list(
+            stream_document_answer(
+                user=self.user,
+                document=self.doc,
+                question="What does SG-01 require?",
+                embedding_provider=DummyEmbeddingProvider(),
+                llm=FakeStreamingListLLM(responses=["SG-01: stop the vehicle."]),
+            )
+        )
+
+        timings = events[-1][1]["timings"]
+        self.assertLessEqual(timings["llm_first_token"], timings["llm_total"])
+        self.assertEqual(QueryLog.objects.get().timings, timings)
+
+
+class QueryLogAdminTests(TestCase):
+    def test_changelist_shows_percentiles(self):
+        admin_user = User.objects.create_superuser("admin", password="pass")
+        QueryLog.objects.create(question="q1", latency_ms=30, timings={"search": 10.0, "total": 30.0})
+        QueryLog.objects.create(question="q2", latency_ms=50, timings={"search": 20.0, "total": 50.0})
+        QueryLog.objects.create(question="q3")
+
+        self.client.force_login(admin_user)
+        response = self.client.get("/admin/documents/querylog/")
+
+        messages = [str(m) for m in response.context["messages"]]
+        latency = [m for m in messages if m.startswith("Latency")]
+        self.assertEqual(len(latency), 1)
+        self.assertIn("last 2 traced queries", latency[0])
+        self.assertIn("search 15/", latency[0])
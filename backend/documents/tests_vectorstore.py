@@ -0,0 +1,204 @@
+import tempfile
+from pathlib import Path
+import numpy as np
+from django.test import TestCase
+from llm.columnar import ColumnarMetadata
+from llm.vectorstore import FAISSVectorStore, InMemoryVectorStore
+
+
+class FAISSVectorStorePersistenceTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "document_1"
+        self.metadatas = [
+            {"chunk_text": "Überblick SG-01", "chunk_index": 0, "page": 1},
+            {"chunk_text": "SYS-123 shall", "chunk_index": 1},
+            {"chunk_text": "", "chunk_index": 2, "page": 3},
+        ]
+        self.embeddings = np.eye(3, dtype="float32").tolist()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_is_pickle_free(self):
+        store = FAISSVectorStore(dim=3)
+        store.add(self.embeddings, self.metadatas)
+        store.save(self.path)
+
+        self.assertFalse((self.path / "metadatas.npy").exists())
+        loaded = FAISSVectorStore(dim=3)
+        loaded.load(self.path)
+
+        self.assertIsInstance(loaded.metadatas, ColumnarMetadata)
+        self.assertEqual(list(loaded.metadatas), self.metadatas)
+        self.assertEqual(loaded.search([0.0, 1.0, 0.0], k=1), [self.metadatas[1]])
+
+    def test_legacy_metadata_is_migrated_on_load(self):
+        store = FAISSVectorStore(dim=3)
+        store.add(self.embeddings, self.metadatas)
+        store.save(self.path)
+        for f in self.path.iterdir():
+            if f.name != "index.faiss":
+                f.unlink()
+        np.save(self.path / "metadatas.npy", np.array(self.metadatas, dtype=object))
+
+        loaded = FAISSVectorStore(dim=3)
+        loaded.load(self.path)
+
+        self.assertFalse((self.path / "metadatas.npy").exists())
+        self.assertEqual(list(loaded.metadatas), self.metadatas)
+
+    def test_add_after_load(self):
+        store = FAISSVectorStore(dim=3)
+        store.add(self.embeddings, self.metadatas)
+        store.save(self.path)
+
+        loaded = FAISSVectorStore(dim=3)
+        loaded.load(self.path)
+        loaded.add([[1.0, 1.0, 1.0]], [{"chunk_text": "new", "chunk_index": 3}])
+
+        self.assertEqual(len(loaded.metadatas), 4)
+        self.assertEqual(loaded.search([1.0, 1.0, 1.0], k=1)[0]["chunk_text"], "new")
+
+    def test_resave_drops_stale_missing_mask(self):
+        store = FAISSVectorStore(dim=3)
+        store.add(self.embeddings, self.metadatas)
+        store.save(self.path)
+        self.assertTrue((self.path / "page.missing.npy").exists())
+
+        complete = [dict(meta, page=i + 1) for i, meta in enumerate(self.metadatas)]
+        store = FAISSVectorStore(dim=3)
+        store.add(self.embeddings, complete)
+        store.save(self.path)
+
+        self.assertFalse((self.path / "page.missing.npy").exists())
+        loaded = FAISSVectorStore(dim=3)
+        loaded.load(self.path)
+        self.assertEqual(list(loaded.metadatas), complete)
+
+    def test_resave_leaves_mapped_readers_intact(self):
+        store = FAISSVectorStore(dim=3)
+        store.add(self.embeddings, self.metadatas)
+        store.save(self.path)
+        reader = FAISSVectorStore(dim=3)
+        reader.load(self.path)
+
+        store.add([[1.0, 1.0, 1.0]], [{"chunk_text": "new", "chunk_index": 3}])
+        store.save(self.path)
+
+        self.assertEqual(list(reader.metadatas), self.metadatas)
+
+
+class InMemoryVectorStoreTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.standard_normal((300, 8)).astype("float32")
+        self.metadatas = [{"chunk_index": i} for i in range(300)]
+        self.store = InMemoryVectorStore(initial_capacity=16)
+        for start in range(0, 300, 70):
+            self.store.add(self.vectors[start:start + 70], self.metadatas[start:start + 70])
+
+    def test_grows_past_initial_capacity(self):
+        self.assertEqual(self.store.vectors.shape, (300, 8))
+        np.testing.assert_array_equal(self.store.vectors, self.vectors)
+
+    def test_top_k_matches_full_sort(self):
+        query = self.vectors[42] + 0.1
+        expected = np.argsort(-(self.vectors @ query), kind="stable")[:10]
+
+        results = self.store.search(query.tolist(), k=10)
+
+        self.assertEqual([m["chunk_index"] for m in results], expected.tolist())
+
+    def test_search_many_matches_search(self):
+        queries = self.vectors[:5]
+        batched = self.store.search_many(queries, k=3)
+        self.assertEqual(batched, [self.store.search(q, k=3) for q in queries])
+
+    def test_ties_keep_insertion_order(self):
+        store = InMemoryVectorStore()
+        store.add([[1.0, 0.0]] * 4, [{"chunk_index": i} for i in range(4)])
+        self.assertEqual(
+            [m["chunk_index"] for m in store.search([1.0, 0.0], k=2)],
+            [0, 1],
+        )
+
+
+class FAISSIndexTypeTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        centers = rng.standard_normal((20, 32)).astype("float32")
+        self.vectors = centers[rng.integers(0, 20, size=2000)]
+        self.vectors += 0.1 * rng.standard_normal(self.vectors.shape).astype("float32")
+        self.metadatas = [{"chunk_index": i} for i in range(len(self.vectors))]
+        self.queries = self.vectors[:50]
+
+        exact = FAISSVectorStore(dim=32)
+        exact.add(self.vectors, self.metadatas)
+        _, self.truth = exact.search_rows(self.queries, 10)
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _recall(self, store):
+        _, rows = store.search_rows(self.queries, 10)
+        hits = sum(len(set(r) & set(t)) for r, t in zip(rows, self.truth))
+        return hits / self.truth.size
+
+    def test_rejects_unknown_index_type(self):
+        with self.assertRaises(ValueError):
+            FAISSVectorStore(dim=32, index_type="lsh")
+
+    def test_approximate_indexes_keep_recall(self):
+        for options in (
+            {"index_type": "ivf_flat", "nlist": 16, "nprobe": 8},
+            {"index_type": "ivf_pq", "nlist": 16, "nprobe": 8, "pq_m": 8},
+            {"index_type": "hnsw", "ef_search": 64},
+        ):
+            with self.subTest(**options):
+                store = FAISSVectorStore(dim=32, **options)
+                store.add(self.vectors, self.metadatas)
+                self.assertGreater(self._recall(store), 0.5 if options["index_type"] == "ivf_pq" else 0.9)
+
+    def test_raw_vectors_survive_lossy_index(self):
+        store = FAISSVectorStore(dim=32, index_type="ivf_pq", nlist=16, pq_m=8, keep_raw_vectors=True)
+        store.add(self.vectors, self.metadatas)
+        store.save(self.path)
+
+        loaded = FAISSVectorStore(dim=32)
+        loaded.load(self.path)
+        np.testing.assert_array_equal(loaded.raw_vectors(), self.vectors)
+        self.assertFalse(np.array_equal(loaded.reconstruct_vectors(), self.vectors))
+
+    def test_small_corpus_shrinks_nlist(self):
+        store = FAISSVectorStore(dim=32, index_type="ivf_flat", nlist=1024, nprobe=1024)
+        store.add(self.vectors[:100], self.metadatas[:100])
+        exact = FAISSVectorStore(dim=32)
+        exact.add(self.vectors[:100], self.metadatas[:100])
+
+        self.assertEqual(store.ntotal, 100)
+        self.assertEqual(
+            store.search(self.vectors[3].tolist(), k=5),
+            exact.search(self.vectors[3].tolist(), k=5),
+        )
+
+    def test_round_trip_keeps_index_config(self):
+        store = FAISSVectorStore(dim=32, index_type="ivf_flat", nlist=16, nprobe=4)
+        store.add(self.vectors, self.metadatas)
+        store.save(self.path)
+
+        loaded = FAISSVectorStore(dim=32)
+        loaded.load(self.path)
+
+        self.assertEqual(loaded.index_type, "ivf_flat")
+        self.assertEqual(loaded.nprobe, 4)
+        np.testing.assert_array_equal(
+            loaded.search_rows(self.queries, 10)[1],
+            store.search_rows(self.queries, 10)[1],
+        )
+
+        loaded.set_search_params(nprobe=16)
+        self.assertGreaterEqual(self._recall(loaded), self._recall(store))
@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from documents import warmup
+from documents.index_cache import get_index_cache
+from documents.ingestion import ingest_document
+from documents.models import Document
+from llm.embeddings import DummyEmbeddingProvider
+
+User = get_user_model()
+
+
+class WarmStartTests(SimpleTestCase):
+    def test_views_do_not_import_provider_sdks(self):
+        script = (
+            "import sys, django; django.setup(); import documents.views; "
+            "print(sorted(m for m in ('langchain_openai', 'langchain_google_genai') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=settings.BASE_DIR,
+            env={
+                "DJANGO_SETTINGS_MODULE": "chatpdf_backend.settings",
+                "PYTHONPATH": os.pathsep.join(p for p in sys.path if p),
+            },
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_warm_start_loads_model_and_freezes_gc(self):
+        with mock.patch.object(warmup, "get_embedding_provider") as provider, \
+                mock.patch.object(warmup, "import_provider_modules") as imports, \
+                mock.patch.object(warmup.gc, "freeze") as freeze:
+            timings = warmup.warm_start()
+
+        provider.assert_called_once_with()
+        imports.assert_called_once_with()
+        freeze.assert_called_once_with()
+        self.assertEqual(set(timings), {"provider_imports_s", "embedding_model_s"})
+
+    def test_ready_preloads_only_when_enabled(self):
+        config = apps.get_app_config("documents")
+
+        with mock.patch.object(warmup, "warm_start") as warm_start:
+            with override_settings(PRELOAD_EMBEDDING_MODEL=False):
+                config.ready()
+            warm_start.assert_not_called()
+
+            with override_settings(PRELOAD_EMBEDDING_MODEL=True):
+                config.ready()
+            warm_start.assert_called_once_with()
+
+
+class StartupProfileCommandTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            VECTOR_INDEX_ROOT=self.tmp.name,
+            MEDIA_ROOT=self.tmp.name,
+        )
+        self.settings_override.enable()
+        get_index_cache().clear()
+
+    def tearDown(self):
+        get_index_cache().clear()
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def test_reports_first_query_latency(self):
+        provider = DummyEmbeddingProvider()
+        user = User.objects.create_user(username="u", password="p")
+        document = Document.objects.create(owner=user, filename="spec.txt")
+        document.pdf_file.save("spec.txt", ContentFile(b"SG-01: The vehicle shall stop."))
+        ingest_document(document=document, embedding_provider=provider)
+
+        out = StringIO()
+        with mock.patch("documents.embeddings.get_embedding_provider", return_value=provider):
+            call_command("startup_profile", "--skip-imports", "--json", document_id=document.id, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertNotIn("imports_s", report)
+        self.assertEqual(
+            set(report["first_query_s"]),
+            {
+                "embedding_model_load",
+                "first_embedding",
+                "second_embedding",
+                "first_retrieval",
+                "second_retrieval",
+            },
+        )
@@ -1,7 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from .views import upload_document, query_document
+from .views import (
+    upload_document,
+    query_document,
+    query_document_async,
+    query_document_batch,
+    query_document_batch_async,
+    query_corpus,
+    query_document_stream,
+    query_document_stream_async,
+    document_status,
+)
+
+# Under ASGI the query endpoints are served by their async variants; the
+# sync ones stay for WSGI, where an async streaming body would be buffered.
+if settings.ASYNC_QUERY_VIEWS:
+    query_view, query_stream_view = query_document_async, query_document_stream_async
+    query_batch_view = query_document_batch_async
+else:
+    query_view, query_stream_view = query_document, query_document_stream
+    query_batch_view = query_document_batch
 
 urlpatterns = [
     path("documents/upload/", upload_document),
-    path("documents/<int:document_id>/query/", query_document),
+    path("documents/query/", query_corpus),
+    path("documents/<int:document_id>/query/", query_view),
+    path("documents/<int:document_id>/query/batch/", query_batch_view),
+    path("documents/<int:document_id>/query/stream/", query_stream_view),
+    path("documents/<int:document_id>/status/", document_status),
 ]
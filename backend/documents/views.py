@@ -1,18 +1,32 @@
 import json
-from django.http import JsonResponse, FileResponse
-from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, FileResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import PermissionDenied
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
-
 from .models import Document
-from .services import get_user_document, answer_document_question
+from .services import (
+    DocumentNotReady,
+    ensure_document_ready,
+    get_user_document,
+    answer_document_question,
+    answer_document_questions,
+    answer_corpus_question,
+    stream_document_answer,
+)
+from .async_services import (
+    aanswer_document_question,
+    aanswer_document_questions,
+    astream_document_answer,
+)
+from .jobs import enqueue_ingestion
+from .llm_clients import PROVIDER_MODELS, get_llm_client_pool
+from .metrics import LLM_ERRORS
 from .pdf_utils import generate_pdf
-from llm.embeddings import HuggingFaceEmbeddingProvider
+from .embeddings import get_query_embedding_provider
 
 User = get_user_model()
 
@@ -38,25 +52,33 @@ def get_llm_from_request(request):
     api_key = request.META.get("HTTP_X_LLM_API_KEY")
 
     if not provider or not api_key:
+        LLM_ERRORS.labels(provider="missing", kind="request").inc()
         return None, "LLM provider or API key missing"
 
     provider = provider.lower().strip()
 
-    if provider == "gemini":
-        return ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite",
-            google_api_key=api_key,
-            temperature=0,
-        ), None
+    if provider not in PROVIDER_MODELS:
+        # Not labelled with the header value, which is client controlled.
+        LLM_ERRORS.labels(provider="unsupported", kind="request").inc()
+        return None, f"Unsupported LLM provider: {provider}"
+
+    return get_llm_client_pool().get(provider, api_key), None
 
-    if provider == "openai":
-        return ChatOpenAI(
-            model="gpt-4o-mini",
-            api_key=api_key,
-            temperature=0,
-        ), None
 
-    return None, f"Unsupported LLM provider: {provider}"
+def _not_ready_response(document):
+    # 202 while the ingestion job is queued or running, so clients poll the
+    # status endpoint; 409 once it has failed.
+    failed = document.ingestion_status == Document.IngestionStatus.FAILED
+    return JsonResponse(
+        {
+            "error": "Document ingestion failed" if failed else "Document is still being ingested",
+            "document_id": document.id,
+            "ingestion_status": document.ingestion_status,
+            "ingestion_progress": document.ingestion_progress,
+            "ingestion_error": document.ingestion_error,
+        },
+        status=409 if failed else 202,
+    )
 
 
 @csrf_exempt
@@ -74,11 +96,13 @@ def upload_document(request):
             filename=uploaded_file.name,
             pdf_file=uploaded_file,
         )
+        enqueue_ingestion(document)
 
         return JsonResponse(
             {
                 "document_id": document.id,
                 "filename": document.filename,
+                "ingestion_status": Document.IngestionStatus.QUEUED,
             },
             status=201,
         )
@@ -89,6 +113,30 @@ def upload_document(request):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+@csrf_exempt
+@require_GET
+def document_status(request, document_id):
+    try:
+        api_auth(request)
+
+        document = get_user_document(request.user, document_id)
+
+        return JsonResponse(
+            {
+                "document_id": document.id,
+                "is_processed": document.is_processed,
+                "ingestion_status": document.ingestion_status,
+                "ingestion_progress": document.ingestion_progress,
+                "ingestion_error": document.ingestion_error,
+            }
+        )
+
+    except PermissionDenied as e:
+        return JsonResponse({"error": str(e)}, status=401)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
 @csrf_exempt
 @require_POST
 def query_document(request, document_id):
@@ -106,12 +154,13 @@ def query_document(request, document_id):
             return JsonResponse({"error": error}, status=400)
 
         document = get_user_document(request.user, document_id)
+        ensure_document_ready(document)
 
         log = answer_document_question(
             user=request.user,
             document=document,
             question=question,
-            embedding_provider=HuggingFaceEmbeddingProvider(),
+            embedding_provider=get_query_embedding_provider(),
             llm=llm,
         )
 
@@ -133,6 +182,146 @@ def query_document(request, document_id):
                 "answer": log.answer,
                 "latency_ms": log.latency_ms,
                 "tokens_used": log.tokens_used,
+                "context_tokens": log.context_tokens,
+                "context_token_budget": log.context_token_budget,
+                "cache_hit": log.cache_hit,
+            }
+        )
+
+    except PermissionDenied as e:
+        return JsonResponse({"error": str(e)}, status=401)
+    except DocumentNotReady as e:
+        return _not_ready_response(e.document)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def _batch_questions(payload):
+    # (questions, None) or (None, error response).
+    questions = payload.get("questions")
+
+    if not isinstance(questions, list) or not questions:
+        return None, JsonResponse({"error": "questions must be a non-empty list"}, status=400)
+
+    if len(questions) > settings.BATCH_QUERY_MAX_QUESTIONS:
+        return None, JsonResponse(
+            {"error": f"At most {settings.BATCH_QUERY_MAX_QUESTIONS} questions per request"},
+            status=400,
+        )
+
+    questions = [q.strip() if isinstance(q, str) else "" for q in questions]
+    if not all(questions):
+        return None, JsonResponse({"error": "Every question must be a non-empty string"}, status=400)
+
+    return questions, None
+
+
+def _batch_response(questions, results):
+    return JsonResponse(
+        {
+            "results": [
+                {"question": question, "error": str(result)}
+                if isinstance(result, Exception)
+                else {
+                    "question": question,
+                    "answer": result.answer,
+                    "query_id": result.id,
+                    "tokens_used": result.tokens_used,
+                    "context_tokens": result.context_tokens,
+                    "context_token_budget": result.context_token_budget,
+                    "cache_hit": result.cache_hit,
+                }
+                for question, result in zip(questions, results)
+            ],
+            "latency_ms": max(
+                (r.latency_ms for r in results if not isinstance(r, Exception)),
+                default=None,
+            ),
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+def query_document_batch(request, document_id):
+    try:
+        api_auth(request)
+
+        payload = json.loads(request.body or "{}")
+        questions, error_response = _batch_questions(payload)
+        if error_response:
+            return error_response
+
+        llm, error = get_llm_from_request(request)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        document = get_user_document(request.user, document_id)
+        ensure_document_ready(document)
+
+        results = answer_document_questions(
+            user=request.user,
+            document=document,
+            questions=questions,
+            embedding_provider=get_query_embedding_provider(),
+            llm=llm,
+        )
+
+        return _batch_response(questions, results)
+
+    except PermissionDenied as e:
+        return JsonResponse({"error": str(e)}, status=401)
+    except DocumentNotReady as e:
+        return _not_ready_response(e.document)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+def query_corpus(request):
+    try:
+        api_auth(request)
+
+        payload = json.loads(request.body or "{}")
+        question = payload.get("question", "").strip()
+        document_ids = payload.get("document_ids")
+
+        if not question:
+            return JsonResponse({"error": "Question required"}, status=400)
+
+        if document_ids is not None and (
+            not isinstance(document_ids, list)
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in document_ids)
+        ):
+            return JsonResponse({"error": "document_ids must be a list of integers"}, status=400)
+
+        llm, error = get_llm_from_request(request)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        log = answer_corpus_question(
+            user=request.user,
+            question=question,
+            embedding_provider=get_query_embedding_provider(),
+            llm=llm,
+            document_ids=document_ids,
+        )
+
+        return JsonResponse(
+            {
+                "answer": log.answer,
+                "document_ids": sorted(
+                    {c["document_id"] for c in getattr(log, "citations", [])}
+                ),
+                "latency_ms": log.latency_ms,
+                "tokens_used": log.tokens_used,
+                "context_tokens": log.context_tokens,
+                "context_token_budget": log.context_token_budget,
             }
         )
 
@@ -142,3 +331,217 @@ def query_document(request, document_id):
         return JsonResponse({"error": "Invalid JSON"}, status=400)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_stream(events):
+    try:
+        for event, data in events:
+            yield _sse_event(event, data)
+    except Exception as e:
+        yield _sse_event("error", {"error": str(e)})
+
+
+@csrf_exempt
+@require_POST
+def query_document_stream(request, document_id):
+    try:
+        api_auth(request)
+
+        payload = json.loads(request.body or "{}")
+        question = payload.get("question", "").strip()
+
+        if not question:
+            return JsonResponse({"error": "Question required"}, status=400)
+
+        llm, error = get_llm_from_request(request)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        document = get_user_document(request.user, document_id)
+        ensure_document_ready(document)
+
+        events = stream_document_answer(
+            user=request.user,
+            document=document,
+            question=question,
+            embedding_provider=get_query_embedding_provider(),
+            llm=llm,
+        )
+
+        response = StreamingHttpResponse(
+            _sse_stream(events),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    except PermissionDenied as e:
+        return JsonResponse({"error": str(e)}, status=401)
+    except DocumentNotReady as e:
+        return _not_ready_response(e.document)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+# Async variants of the query endpoints, routed instead of the sync ones when
+# served through chatpdf_backend.asgi. The LLM call is awaited, so one worker
+# process can hold hundreds of slow generations open at once.
+@csrf_exempt
+@require_POST
+async def query_document_async(request, document_id):
+    try:
+        await sync_to_async(api_auth)(request)
+
+        payload = json.loads(request.body or "{}")
+        question = payload.get("question", "").strip()
+
+        if not question:
+            return JsonResponse({"error": "Question required"}, status=400)
+
+        llm, error = get_llm_from_request(request)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        document = await sync_to_async(get_user_document)(request.user, document_id)
+        ensure_document_ready(document)
+
+        log = await aanswer_document_question(
+            user=request.user,
+            document=document,
+            question=question,
+            embedding_provider=get_query_embedding_provider(),
+            llm=llm,
+        )
+
+        if payload.get("download_pdf"):
+            pdf_buffer = await sync_to_async(generate_pdf)(
+                title="ChatPDF Technical Specification",
+                content=log.answer,
+            )
+
+            return FileResponse(
+                pdf_buffer,
+                as_attachment=True,
+                filename="ChatPDF_Output.pdf",
+                content_type="application/pdf",
+            )
+
+        return JsonResponse(
+            {
+                "answer": log.answer,
+                "latency_ms": log.latency_ms,
+                "tokens_used": log.tokens_used,
+                "context_tokens": log.context_tokens,
+                "context_token_budget": log.context_token_budget,
+                "cache_hit": log.cache_hit,
+            }
+        )
+
+    except PermissionDenied as e:
+        return JsonResponse({"error": str(e)}, status=401)
+    except DocumentNotReady as e:
+        return _not_ready_response(e.document)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+# A checklist of up to BATCH_QUERY_MAX_QUESTIONS LLM calls: under ASGI the
+# event loop stays free for other requests while they are in flight.
+@csrf_exempt
+@require_POST
+async def query_document_batch_async(request, document_id):
+    try:
+        await sync_to_async(api_auth)(request)
+
+        payload = json.loads(request.body or "{}")
+        questions, error_response = _batch_questions(payload)
+        if error_response:
+            return error_response
+
+        llm, error = get_llm_from_request(request)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        document = await sync_to_async(get_user_document)(request.user, document_id)
+        ensure_document_ready(document)
+
+        results = await aanswer_document_questions(
+            user=request.user,
+            document=document,
+            questions=questions,
+            embedding_provider=get_query_embedding_provider(),
+            llm=llm,
+        )
+
+        return _batch_response(questions, results)
+
+    except PermissionDenied as e:
+        return JsonResponse({"error": str(e)}, status=401)
+    except DocumentNotReady as e:
+        return _not_ready_response(e.document)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+async def _asse_stream(events):
+    try:
+        async for event, data in events:
+            yield _sse_event(event, data)
+    except Exception as e:
+        yield _sse_event("error", {"error": str(e)})
+
+
+@csrf_exempt
+@require_POST
+async def query_document_stream_async(request, document_id):
+    try:
+        await sync_to_async(api_auth)(request)
+
+        payload = json.loads(request.body or "{}")
+        question = payload.get("question", "").strip()
+
+        if not question:
+            return JsonResponse({"error": "Question required"}, status=400)
+
+        llm, error = get_llm_from_request(request)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+
+        document = await sync_to_async(get_user_document)(request.user, document_id)
+        ensure_document_ready(document)
+
+        events = astream_document_answer(
+            user=request.user,
+            document=document,
+            question=question,
+            embedding_provider=get_query_embedding_provider(),
+            llm=llm,
+        )
+
+        response = StreamingHttpResponse(
+            _asse_stream(events),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    except PermissionDenied as e:
+        return JsonResponse({"error": str(e)}, status=401)
+    except DocumentNotReady as e:
+        return _not_ready_response(e.document)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
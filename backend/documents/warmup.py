@@ -0,0 +1,27 @@
+import gc
+import time
+from typing import Dict
+from .embeddings import get_embedding_provider
+from .llm_clients import import_provider_modules
+
+
+def warm_start() -> Dict[str, float]:
+    # Runs in the server process before workers fork. The model weights and
+    # imported modules are then shared copy-on-write by every worker instead
+    # of being loaded again on each worker's first request. No text is
+    # embedded here: torch thread pools started before fork are not fork-safe.
+    timings: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    import_provider_modules()
+    timings["provider_imports_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_embedding_provider()
+    timings["embedding_model_s"] = time.perf_counter() - start
+
+    # Move everything loaded so far out of the collector's reach; otherwise
+    # the first collection in each worker touches (and copies) those pages.
+    gc.collect()
+    gc.freeze()
+    return timings
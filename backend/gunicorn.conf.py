@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+from pathlib import Path
+from chatpdf_backend.metrics_dir import remove_stale_metrics
+
+# gunicorn -c gunicorn.conf.py chatpdf_backend.wsgi:application
+# (or chatpdf_backend.asgi:application with -k uvicorn.workers.UvicornWorker)
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# The application, and with it the embedding model, is loaded once in the
+# master and inherited by the workers.
+preload_app = True
+os.environ.setdefault("PRELOAD_EMBEDDING_MODEL", "True")
+
+
+# Workers write their metrics to files here and /metrics aggregates them,
+# together with the files of the ingestion_worker processes. Files left by
+# processes of a previous run are removed before anything is loaded.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/chatpdf-prometheus")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+remove_stale_metrics(Path(os.environ["PROMETHEUS_MULTIPROC_DIR"]))
+
+
+def pre_fork(server, worker):
+    # Workers must not share the master's database connection.
+    from django.db import connections
+
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,130 @@
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+import argparse
+import json
+import tempfile
+import time
+import numpy as np
+from llm.vectorstore import FAISSVectorStore
+
+# Recall-vs-latency comparison of the approximate FAISS index types against
+# the exact flat index. Vectors are clustered and L2-normalised so the data
+# looks like sentence embeddings rather than uniform noise.
+
+CONFIGS = [
+    {"index_type": "flat"},
+    {"index_type": "ivf_flat", "nprobe": 4},
+    {"index_type": "ivf_flat", "nprobe": 16},
+    {"index_type": "ivf_flat", "nprobe": 64},
+    {"index_type": "ivf_pq", "nprobe": 16},
+    {"index_type": "ivf_pq", "nprobe": 64},
+    {"index_type": "hnsw", "ef_search": 32},
+    {"index_type": "hnsw", "ef_search": 128},
+]
+
+
+def synthetic_embeddings(n: int, dim: int, *, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    assignment = rng.integers(0, clusters, size=n)
+    vectors = centers[assignment] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run_config(config, vectors, queries, truth, *, k: int, nlist: int, pq_m: int) -> dict:
+    options = {"nlist": nlist, "pq_m": pq_m, **config}
+    store = FAISSVectorStore(dim=vectors.shape[1], **options)
+
+    start = time.perf_counter()
+    store.add(vectors, [{"chunk_index": i} for i in range(len(vectors))])
+    store.search_rows(queries[:1], k)  # forces training for IVF indexes
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, batched = store.search_rows(queries, k)
+    batch_s = time.perf_counter() - start
+
+    single = []
+    for query in queries[:200]:
+        start = time.perf_counter()
+        store.search_rows(query, k)
+        single.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store.save(Path(tmp))
+        size_bytes = (Path(tmp) / "index.faiss").stat().st_size
+        reloaded = FAISSVectorStore(dim=vectors.shape[1])
+        reloaded.load(Path(tmp))
+        _, reloaded_rows = reloaded.search_rows(queries[:50], k)
+        round_trips = bool(np.array_equal(reloaded_rows, batched[:50]))
+
+    return {
+        **options,
+        "recall_at_k": round(recall_at_k(batched, truth), 4),
+        "build_s": round(build_s, 3),
+        "batch_qps": round(len(queries) / batch_s, 1),
+        "single_query_p50_ms": round(float(np.percentile(single, 50)) * 1000, 3),
+        "single_query_p95_ms": round(float(np.percentile(single, 95)) * 1000, 3),
+        "index_bytes": size_bytes,
+        "save_load_round_trips": round_trips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--output", type=Path, default=None, help="Write JSON results here")
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.vectors, args.dim, clusters=args.clusters, seed=0)
+    queries = synthetic_embeddings(args.queries, args.dim, clusters=args.clusters, seed=1)
+
+    exact = FAISSVectorStore(dim=args.dim)
+    exact.add(vectors, [{}] * len(vectors))
+    _, truth = exact.search_rows(queries, args.k)
+
+    results = []
+    for config in CONFIGS:
+        result = run_config(
+            config,
+            vectors,
+            queries,
+            truth,
+            k=args.k,
+            nlist=args.nlist,
+            pq_m=args.pq_m,
+        )
+        print(f"[INFO] {json.dumps(result)}", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "benchmark": "ann_index",
+        "vectors": args.vectors,
+        "queries": args.queries,
+        "dim": args.dim,
+        "k": args.k,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
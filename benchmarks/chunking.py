@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+import argparse
+import json
+import time
+import tracemalloc
+from benchmarks.specs import synthetic_spec
+from llm.chunking import REQUIREMENT_ID, chunk_text, iter_chunks
+
+# Throughput and index-size comparison of the fixed-window chunk_text against
+# the structure-aware iter_chunks on a synthetic requirements specification.
+
+
+def split_lines(text: str, chunks) -> int:
+    # Requirement and table lines that do not appear whole in any chunk.
+    lines = [
+        line for line in text.splitlines()
+        if REQUIREMENT_ID.match(line) or line.startswith("|")
+    ]
+    whole = set()
+    for chunk in chunks:
+        whole.update(chunk["chunk_text"].splitlines())
+    return sum(1 for line in lines if line not in whole)
+
+
+def measure(name: str, make_chunks, text: str, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in make_chunks())
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for _ in make_chunks():
+        pass
+    _, streaming_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    chunks = list(make_chunks())
+    indexed_chars = sum(len(c["chunk_text"]) for c in chunks)
+    best = min(timings)
+
+    return {
+        "chunker": name,
+        "chunks": count,
+        "seconds": round(best, 4),
+        "mb_per_s": round(len(text) / best / 1e6, 2),
+        "peak_mb_iterating": round(streaming_peak / 1e6, 2),
+        "indexed_chars_ratio": round(indexed_chars / len(text), 3),
+        "lines_cut": split_lines(text, chunks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=5_000_000)
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None, help="Write JSON results here")
+    args = parser.parse_args()
+
+    text = synthetic_spec(args.chars, seed=0)
+
+    results = [
+        measure("chunk_text", lambda: chunk_text(text), text, args.repeat),
+        measure(
+            "iter_chunks",
+            lambda: iter_chunks(text, max_tokens=args.max_tokens),
+            text,
+            args.repeat,
+        ),
+    ]
+    for result in results:
+        print(f"[INFO] {json.dumps(result)}", file=sys.stderr)
+
+    report = {
+        "benchmark": "chunking",
+        "chars": len(text),
+        "max_tokens": args.max_tokens,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+import argparse
+import io
+import json
+import tempfile
+import time
+import numpy as np
+from langchain_core.runnables import RunnableLambda
+from benchmarks.specs import WORDS, synthetic_spec
+from llm.chains import get_rag_chain
+from llm.chunking import REQUIREMENT_ID, iter_chunks
+from llm.context import context_budget_for_model, pack_context
+from llm.embeddings import HashingEmbeddingProvider
+from llm.extraction import ExtractedText, extract_pdf_text
+from llm.grounding import enforce_grounding
+from llm.prompts import REFUSAL_TEXT
+from llm.tokens import DEFAULT_MODEL
+from llm.vectorstore import FAISSVectorStore
+
+# Stage-by-stage timing of the ingestion and query pipeline on a synthetic
+# requirements specification. Embeddings come from the deterministic
+# HashingEmbeddingProvider and answers from a fake LLM, so runs are
+# repeatable offline and differences between releases come from our code.
+
+
+def render_pdf(text: str) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    style = getSampleStyleSheet()["Normal"]
+    story = []
+    for line in text.splitlines():
+        story.append(Paragraph(line.replace("&", "&amp;").replace("<", "&lt;"), style) if line else Spacer(1, 6))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
+
+
+def synthetic_questions(text: str, count: int, *, seed: int):
+    rng = np.random.default_rng(seed)
+    ids = sorted({line.split()[0] for line in text.splitlines() if REQUIREMENT_ID.match(line)})
+    questions = []
+    for i in range(count):
+        if i % 2 == 0:
+            questions.append(f"What does {ids[int(rng.integers(len(ids)))]} require?")
+        else:
+            questions.append(" ".join(rng.choice(WORDS, size=6)) + "?")
+    return questions
+
+
+def fake_llm(latency_s: float):
+    # Echoes the requirement lines of the context, like a model that lists
+    # every requirement it was given.
+    def answer(prompt):
+        if latency_s:
+            time.sleep(latency_s)
+        lines = prompt.to_string().splitlines()
+        return "\n".join(line for line in lines if REQUIREMENT_ID.match(line))
+
+    return RunnableLambda(answer)
+
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def time(self, stage: str, func):
+        start = time.perf_counter()
+        result = func()
+        self.stages.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    def summary(self) -> dict:
+        summary = {}
+        for stage, seconds in self.stages.items():
+            if len(seconds) == 1:
+                summary[stage] = {"seconds": round(seconds[0], 4)}
+            else:
+                ms = np.asarray(seconds) * 1000
+                summary[stage] = {
+                    "calls": len(seconds),
+                    "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                    "p95_ms": round(float(np.percentile(ms, 95)), 3),
+                    "total_s": round(float(ms.sum()) / 1000, 4),
+                }
+        return summary
+
+
+def run(args) -> dict:
+    timer = Timer()
+    provider = HashingEmbeddingProvider(dim=args.dim)
+    text = synthetic_spec(args.chars, seed=args.seed)
+
+    if args.pdf:
+        pdf_bytes = render_pdf(text)
+        extracted = timer.time("extract", lambda: extract_pdf_text(pdf_bytes))
+    else:
+        extracted = ExtractedText(text=text)
+
+    # Ingestion interleaves these stages while streaming; they are separated
+    # here so each one can be tracked on its own.
+    chunks = timer.time(
+        "chunk",
+        lambda: list(
+            iter_chunks(
+                extracted.text,
+                max_tokens=args.max_tokens,
+                page_offsets=extracted.page_offsets,
+            )
+        ),
+    )
+    texts = [c["chunk_text"] for c in chunks]
+    vectors = timer.time(
+        "embed",
+        lambda: np.vstack(list(provider.embed_batches(texts, batch_size=args.batch_size))),
+    )
+
+    store = FAISSVectorStore(dim=args.dim)
+    timer.time("index_add", lambda: store.add(vectors, chunks))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timer.time("save", lambda: store.save(Path(tmp)))
+        index_bytes = sum(p.stat().st_size for p in Path(tmp).rglob("*") if p.is_file())
+        store = FAISSVectorStore(dim=args.dim)
+        # Includes opening the memory-mapped BM25 postings.
+        timer.time("load", lambda: (store.load(Path(tmp)), store.bm25))
+
+        token_budget = context_budget_for_model(DEFAULT_MODEL)
+        chain = get_rag_chain(fake_llm(args.llm_latency_ms / 1000))
+        refusals = 0
+
+        for question in synthetic_questions(text, args.queries, seed=args.seed + 1):
+            start = time.perf_counter()
+            query_embedding = timer.time("embed_query", lambda: provider.embed([question])[0])
+            if args.hybrid:
+                candidates = timer.time(
+                    "search",
+                    lambda: store.hybrid_search(query_embedding, question, k=args.k),
+                )
+            else:
+                candidates = timer.time(
+                    "search",
+                    lambda: store.search(query_embedding, k=args.k),
+                )
+            packed = timer.time(
+                "context",
+                lambda: pack_context(candidates, token_budget=token_budget, model=DEFAULT_MODEL),
+            )
+            answer = timer.time(
+                "generate",
+                lambda: enforce_grounding(
+                    answer=chain.invoke({"question": question, "context": packed.text}),
+                    citations=packed.citations,
+                ),
+            )
+            refusals += answer == REFUSAL_TEXT
+            timer.stages.setdefault("query_total", []).append(time.perf_counter() - start)
+
+    return {
+        "benchmark": "rag_pipeline",
+        "chars": len(extracted.text),
+        "pages": extracted.page_count,
+        "chunks": len(chunks),
+        "dim": args.dim,
+        "max_tokens": args.max_tokens,
+        "k": args.k,
+        "hybrid": args.hybrid,
+        "queries": args.queries,
+        "refusals": refusals,
+        "index_bytes": index_bytes,
+        "stages": timer.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=200_000, help="Size of the synthetic document")
+    parser.add_argument("--pdf", action=argparse.BooleanOptionalAction, default=True,
+                        help="Render the document to PDF and time extraction")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--hybrid", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="Write JSON results here")
+    args = parser.parse_args()
+
+    report = run(args)
+    for stage, result in report["stages"].items():
+        print(f"[INFO] {stage}: {json.dumps(result)}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
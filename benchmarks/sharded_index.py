@@ -0,0 +1,178 @@
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmarks.ann_index import synthetic_embeddings
+from llm.sharded import ShardedVectorStore
+from llm.vectorstore import FAISSVectorStore
+
+# Query latency and throughput of ShardedVectorStore as the shard count
+# grows, against one unsharded FAISSVectorStore over the same vectors.
+# Flat shards return exactly the unsharded top-k, which is checked too.
+
+SHARD_COUNTS = [1, 2, 4, 8]
+
+
+def chunk_metadatas(n: int, *, chunks_per_document: int) -> list:
+    return [
+        {"document_id": i // chunks_per_document, "chunk_index": i % chunks_per_document}
+        for i in range(n)
+    ]
+
+
+def time_single_queries(search, queries) -> list:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def concurrent_qps(search, queries, *, clients: int) -> float:
+    # Independent single-query callers, like request threads in the server.
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(search, queries))
+    return len(queries) / (time.perf_counter() - start)
+
+
+def summarize(name: str, search, batch_search, queries, *, clients: int) -> dict:
+    batch_search(queries[:8])  # warm-up: trains pending vectors, starts threads
+
+    latencies = time_single_queries(search, queries[:200])
+    start = time.perf_counter()
+    batch_search(queries)
+    batch_s = time.perf_counter() - start
+
+    return {
+        "store": name,
+        "single_query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "single_query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "batch_qps": round(len(queries) / batch_s, 1),
+        "concurrent_qps": round(concurrent_qps(search, queries, clients=clients), 1),
+    }
+
+
+def run_sharded(num_shards, vectors, metadatas, queries, truth, *, k: int, clients: int, index_options) -> dict:
+    store = ShardedVectorStore(vectors.shape[1], num_shards, **index_options)
+
+    start = time.perf_counter()
+    store.add(vectors, metadatas)
+    build_s = time.perf_counter() - start
+
+    result = summarize(
+        f"sharded-{num_shards}",
+        lambda q: store.search_rows(q, k),
+        lambda qs: store.search_rows(qs, k),
+        queries,
+        clients=clients,
+    )
+
+    hits = store.search_many(queries[:200], k)
+    found = [{(m["document_id"], m["chunk_index"]) for m in row} for row in hits]
+    expected = [{(metadatas[r]["document_id"], metadatas[r]["chunk_index"]) for r in row} for row in truth[:200]]
+    overlap = sum(len(f & e) for f, e in zip(found, expected)) / sum(len(e) for e in expected)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        store.save(Path(tmp))
+        save_s = time.perf_counter() - start
+        start = time.perf_counter()
+        ShardedVectorStore.load(Path(tmp)).close()
+        load_s = time.perf_counter() - start
+
+    store.close()
+    return {
+        **result,
+        "shards": num_shards,
+        "shard_sizes": [shard.ntotal for shard in store.shards],
+        "build_s": round(build_s, 3),
+        "save_s": round(save_s, 3),
+        "load_s": round(load_s, 3),
+        "overlap_with_unsharded": round(overlap, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--chunks-per-document", type=int, default=100)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--shards", type=int, nargs="+", default=SHARD_COUNTS)
+    parser.add_argument("--clients", type=int, default=8, help="Threads for the concurrent QPS run")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument(
+        "--omp-threads",
+        type=int,
+        default=None,
+        help="FAISS OpenMP threads per search; 1 leaves parallelism to the shard fan-out",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Write JSON results here")
+    args = parser.parse_args()
+
+    if args.omp_threads:
+        import faiss
+        faiss.omp_set_num_threads(args.omp_threads)
+
+    vectors = synthetic_embeddings(args.vectors, args.dim, clusters=args.clusters, seed=0)
+    queries = synthetic_embeddings(args.queries, args.dim, clusters=args.clusters, seed=1)
+    metadatas = chunk_metadatas(args.vectors, chunks_per_document=args.chunks_per_document)
+    index_options = {"index_type": args.index_type}
+
+    baseline = FAISSVectorStore(dim=args.dim, **index_options)
+    baseline.add(vectors, metadatas)
+    _, truth = baseline.search_rows(queries, args.k)
+
+    results = [
+        summarize(
+            "unsharded",
+            lambda q: baseline.search_rows(q, args.k),
+            lambda qs: baseline.search_rows(qs, args.k),
+            queries,
+            clients=args.clients,
+        )
+    ]
+    print(f"[INFO] {json.dumps(results[0])}", file=sys.stderr)
+
+    for num_shards in args.shards:
+        result = run_sharded(
+            num_shards,
+            vectors,
+            metadatas,
+            queries,
+            truth,
+            k=args.k,
+            clients=args.clients,
+            index_options=index_options,
+        )
+        print(f"[INFO] {json.dumps(result)}", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "benchmark": "sharded_index",
+        "vectors": args.vectors,
+        "queries": args.queries,
+        "dim": args.dim,
+        "k": args.k,
+        "omp_threads": args.omp_threads,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import numpy as np
+
+# Synthetic requirements specification shared by the benchmarks, so chunking
+# and pipeline numbers are measured on the same kind of document.
+
+WORDS = (
+    "the vehicle shall brake controller signal within fault report driver "
+    "warning pressure wheel speed diagnostic event log threshold mode "
+    "torque steering battery voltage sensor actuator timeout redundant"
+).split()
+
+
+def synthetic_spec(target_chars: int, *, seed: int) -> str:
+    # Hazards (H-xx), safety goals (SG-xx) tracing to hazards and numbered
+    # system requirements (SYS-xxx) tracing to safety goals, plus tables.
+    rng = np.random.default_rng(seed)
+
+    def sentence(low: int, high: int) -> str:
+        return " ".join(rng.choice(WORDS, size=int(rng.integers(low, high)))) + "."
+
+    hazards = max(5, target_chars // 20_000)
+    parts = ["1 HAZARD ANALYSIS\n\n"]
+    for h in range(1, hazards + 1):
+        parts.append(f"H-{h:02d} {sentence(8, 25)}\n")
+    parts.append("\n2 SAFETY GOALS\n\n")
+    for g in range(1, hazards + 1):
+        parts.append(f"SG-{g:02d} Mitigates H-{g:02d}. {sentence(8, 25)}\n")
+    parts.append("\n")
+
+    size = sum(len(p) for p in parts)
+    section = 2
+    requirement = 0
+    while size < target_chars:
+        section += 1
+        block = [f"{section} SYSTEM REQUIREMENTS {section}\n", "\n"]
+        for sub in range(1, 4):
+            block.append(f"{section}.{sub} Subsystem {sub}\n")
+            for _ in range(int(rng.integers(5, 15))):
+                requirement += 1
+                goal = int(rng.integers(1, hazards + 1))
+                block.append(f"SYS-{requirement:03d} Derived from SG-{goal:02d}. {sentence(10, 60)}\n")
+            block.append("\n| Signal | Rate | Unit |\n")
+            for row in range(int(rng.integers(3, 8))):
+                block.append(f"| sig_{section}_{row} | {int(rng.integers(1, 200))} | Hz |\n")
+            block.append("\n")
+        text = "".join(block)
+        parts.append(text)
+        size += len(text)
+    return "".join(parts)
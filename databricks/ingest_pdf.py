@@ -4,155 +4,523 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(PROJECT_ROOT))
 import argparse
-import pdfplumber
-from llm.chunking import chunk_text
-from llm.embeddings import DummyEmbeddingProvider
-from llm.vectorstore import FAISSVectorStore
-
-MAX_DOC_SIZE_CHARS = 500_000        
-MAX_CHUNKS_PER_DOC = 200
-FAISS_DIM = 5                       
-INDEX_DIR = Path("vector_index")
+import json
+import os
+import shutil
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from llm.chunking import iter_chunks
+from llm.columnar import ColumnarMetadata, write_columnar_metadata
+from llm.extraction import extract_pdf_text
+from llm.embeddings import (
+    DEFAULT_BATCH_SIZE,
+    DummyEmbeddingProvider,
+    EmbeddingProvider,
+    HashingEmbeddingProvider,
+    HuggingFaceEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+)
+from llm.embedding_cache import CachedEmbeddingProvider
+from llm.fileio import replace_file
+from llm.vectorstore import INDEX_TYPES, FAISSVectorStore
+
+# Bulk ingestion of a directory tree of PDF and TXT files into one FAISS
+# index. Worker processes extract and chunk files while the main process
+# embeds chunks in fixed-size batches that span file boundaries, so the
+# encoder is never waiting on a small file. Embedded chunks are checkpointed
+# together with a manifest of finished files; rerunning the same command
+# after an interruption resumes where the last checkpoint left off.
 
-def ingest_txt_file(
+INDEX_DIR = Path("vector_index")
+# Next to the columnar metadata.json written by FAISSVectorStore.save.
+MANIFEST_NAME = "ingest_manifest.json"
+PARTS_DIR_NAME = "parts"
+PART_VECTORS_NAME = "vectors.npy"
+# Skipped or truncated files listed by name in the summary.
+SUMMARY_MAX_FILES = 20
+DEFAULT_INPUTS = [Path("data/txt"), Path("data/pdf")]
+SUFFIXES = {".pdf", ".txt"}
+PROVIDERS = ("huggingface", "openai", "hashing", "dummy")
+
+
+def make_embedding_provider(name: str, *, batch_size: int) -> EmbeddingProvider:
+    if name == "huggingface":
+        return HuggingFaceEmbeddingProvider(batch_size=batch_size)
+    if name == "openai":
+        return OpenAIEmbeddingProvider()
+    if name == "hashing":
+        return HashingEmbeddingProvider()
+    if name == "dummy":
+        return DummyEmbeddingProvider()
+    raise ValueError(f"Unknown embedding provider: {name}")
+
+
+def discover_files(inputs: Iterable[Path]) -> List[Path]:
+    files = set()
+    for path in inputs:
+        path = Path(path)
+        if path.is_dir():
+            files.update(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in SUFFIXES)
+        elif path.is_file() and path.suffix.lower() in SUFFIXES:
+            files.add(path)
+    return sorted(files)
+
+
+def file_fingerprint(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def prepare_file(
+    path: str,
     *,
-    file_path: Path,
-    embedding_provider,
-    vector_store,
-    dry_run: bool,
-):
-    print(f"\n[INFO] Processing TXT: {file_path.name}")
-
-    text = file_path.read_text(encoding="utf-8")
-
-    if len(text) > MAX_DOC_SIZE_CHARS:
-        print(f"[WARN] Skipping {file_path.name} (too large)")
-        return
+    max_doc_chars: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+) -> Tuple[str, Optional[List[dict]], Optional[str]]:
+    # Runs in a worker process. Returns (path, chunks, reason); chunks is
+    # None when the file is skipped or failed, with the reason why, and
+    # reason is also set when chunks were cut off at max_chunks.
+    file_path = Path(path)
+    try:
+        page_offsets = None
+        if file_path.suffix.lower() == ".pdf":
+            # One process per file already; a nested extraction pool would
+            # only oversubscribe the CPUs.
+            extracted = extract_pdf_text(file_path, max_workers=1)
+            text, page_offsets = extracted.text, extracted.page_offsets
+        else:
+            text = file_path.read_text(encoding="utf-8")
+    except Exception as e:
+        return path, None, f"failed: {e}"
 
-    chunks = chunk_text(text)[:MAX_CHUNKS_PER_DOC]
+    if not text.strip():
+        return path, None, "no text extracted"
+    if max_doc_chars is not None and len(text) > max_doc_chars:
+        return path, None, f"too large ({len(text):,} characters)"
 
+    all_chunks = iter_chunks(text, page_offsets=page_offsets)
+    chunks = list(islice(all_chunks, max_chunks))
     if not chunks:
-        print("[WARN] No chunks produced")
-        return
+        return path, None, "no chunks produced"
 
-    texts = [c["chunk_text"] for c in chunks]
-    embeddings = embedding_provider.embed(texts)
+    reason = None
+    dropped = sum(1 for _ in all_chunks)
+    if dropped:
+        reason = f"truncated to {len(chunks):,} of {len(chunks) + dropped:,} chunks"
 
-    if dry_run:
-        print(f"[DRY-RUN] Would index {len(chunks)} TXT chunks")
-        return
-
-    vector_store.add(
-        embeddings=embeddings,
-        metadatas=chunks,
-    )
+    for chunk in chunks:
+        chunk["source"] = path
+    return path, chunks, reason
 
-def extract_text_from_pdf(file_path: Path) -> str:
-    text_parts = []
 
-    try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
-    except Exception as e:
-        print(f"[WARN] Failed to read PDF {file_path.name}: {e}")
-        return ""
+def iter_prepared(
+    paths: List[str],
+    *,
+    workers: int,
+    window: int,
+    max_doc_chars: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+) -> Iterator[Tuple[str, Optional[List[dict]], Optional[str]]]:
+    # Results come back in input order with at most `window` files in
+    # flight, so extracted text never piles up ahead of the embedder.
+    prepare = partial(prepare_file, max_doc_chars=max_doc_chars, max_chunks=max_chunks)
+    if workers <= 1:
+        for path in paths:
+            yield prepare(path)
+        return
 
-    return "\n".join(text_parts)
+    pending = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = deque(pool.submit(prepare, p) for p in islice(pending, window))
+        while futures:
+            result = futures.popleft().result()
+            for path in islice(pending, 1):
+                futures.append(pool.submit(prepare, path))
+            yield result
+
+
+class Checkpoint:
+    # Each checkpoint writes the chunks embedded since the previous one as a
+    # new part (vectors plus columnar metadata) and then replaces the
+    # manifest, which lists the parts and the files they cover, with one
+    # rename. A checkpoint therefore costs time in the new chunks only; the
+    # FAISS index and its BM25 postings are built once, from all parts, when
+    # the run finishes.
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+        self.parts_dir = self.index_dir / PARTS_DIR_NAME
+
+    def _recover(self) -> None:
+        # Parts of a run that died before its manifest update are unlisted.
+        if not self.parts_dir.exists():
+            return
+        listed = set(self.load_manifest()["parts"]) if self._has_manifest() else set()
+        for part in self.parts_dir.iterdir():
+            if part.name not in listed:
+                shutil.rmtree(part, ignore_errors=True)
+
+    def _has_manifest(self) -> bool:
+        return (self.index_dir / MANIFEST_NAME).exists()
+
+    def exists(self) -> bool:
+        self._recover()
+        return self._has_manifest()
+
+    def load_manifest(self) -> dict:
+        manifest = json.loads((self.index_dir / MANIFEST_NAME).read_text())
+        if "parts" not in manifest:
+            raise ValueError(
+                f"Checkpoint in {self.index_dir} predates incremental checkpoints; "
+                "pass --fresh to rebuild"
+            )
+        return manifest
+
+    def save(self, vectors: np.ndarray, metadatas: List[dict], manifest: dict) -> None:
+        if len(vectors):
+            name = f"part-{len(manifest['parts']):06d}"
+            tmp = self.parts_dir / f".tmp-{name}"
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            np.save(tmp / PART_VECTORS_NAME, vectors)
+            write_columnar_metadata(tmp, metadatas)
+            os.rename(tmp, self.parts_dir / name)
+            manifest["parts"].append(name)
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with replace_file(self.index_dir / MANIFEST_NAME) as f:
+            f.write(json.dumps(manifest).encode("utf-8"))
+
+    def build_index(self, manifest: dict, *, index_type: str) -> FAISSVectorStore:
+        # IVF indexes buffer every add, so they are trained once, on the
+        # whole corpus, when the store is saved.
+        vector_store = FAISSVectorStore(dim=manifest["dim"], index_type=index_type)
+        for name in manifest["parts"]:
+            part = self.parts_dir / name
+            vector_store.add(np.load(part / PART_VECTORS_NAME), list(ColumnarMetadata(part)))
+        vector_store.save(self.index_dir)
+        return vector_store
+
+    def discard(self) -> None:
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class Progress:
+    def __init__(self, total_files: int, *, interval: float):
+        self.total_files = total_files
+        self.interval = interval
+        self.files = 0
+        self.chunks = 0
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def update(self, *, files: int = 0, chunks: int = 0) -> None:
+        self.files += files
+        self.chunks += chunks
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self) -> None:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        rate = self.files / elapsed
+        remaining = (self.total_files - self.files) / rate if rate else 0
+        percent = 100 * self.files / self.total_files if self.total_files else 100
+        print(
+            f"[INFO] {self.files:,}/{self.total_files:,} files ({percent:.1f}%) | "
+            f"{self.chunks:,} chunks | {self.chunks / elapsed:,.0f} chunks/s | "
+            f"ETA {_format_eta(remaining)}",
+            flush=True,
+        )
 
 
-def ingest_pdf_file(
+def ingest_files(
     *,
-    file_path: Path,
-    embedding_provider,
-    vector_store,
-    dry_run: bool,
-):
-    print(f"\n[INFO] Processing PDF: {file_path.name}")
-
-    text = extract_text_from_pdf(file_path)
+    files: List[Path],
+    embedding_provider: EmbeddingProvider,
+    index_dir: Path,
+    workers: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    checkpoint_seconds: float = 600.0,
+    progress_seconds: float = 10.0,
+    index_type: str = "flat",
+    max_doc_chars: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+    fresh: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    # Returns the manifest of the finished index: one entry per file with
+    # its fingerprint and either its chunk count or why it was skipped;
+    # files cut off at max_chunks also say so under "truncated".
+    checkpoint = Checkpoint(index_dir)
+    if fresh and not dry_run:
+        checkpoint.discard()
+
+    if checkpoint.exists() and not (fresh and dry_run):
+        manifest = checkpoint.load_manifest()
+        if not dry_run and manifest["embedding"] != embedding_provider.cache_namespace:
+            raise ValueError(
+                f"Checkpoint in {index_dir} was built with {manifest['embedding']}, "
+                f"not {embedding_provider.cache_namespace}; pass --fresh to rebuild"
+            )
+        print(f"[INFO] Resuming from checkpoint: {len(manifest['files']):,} files done")
+    else:
+        manifest = {
+            "embedding": embedding_provider.cache_namespace,
+            "dim": embedding_provider.dim,
+            "files": {},
+            "parts": [],
+        }
+
+    todo = []
+    for path in files:
+        done = manifest["files"].get(str(path))
+        if done is None:
+            todo.append(str(path))
+        elif {k: done[k] for k in ("size", "mtime_ns")} != file_fingerprint(path):
+            # The index cannot drop the vectors of the old version.
+            print(f"[WARN] {path} changed since it was indexed; pass --fresh to re-index it")
+
+    print(f"[INFO] {len(todo):,} of {len(files):,} files to ingest with {workers} workers")
+    progress = Progress(len(todo), interval=progress_seconds)
+
+    texts: List[str] = []
+    metadatas: List[dict] = []
+    # Embedded since the last checkpoint, written there as the next part.
+    part_vectors: List[np.ndarray] = []
+    part_metadatas: List[dict] = []
+    # Files whose chunks are all in the buffer or the current part; recorded
+    # in the manifest at the next checkpoint.
+    finished: Dict[str, dict] = {}
+
+    def embed_buffered(*, flush: bool) -> None:
+        while len(texts) >= batch_size or (flush and texts):
+            vectors = embedding_provider.embed_array(texts[:batch_size])
+            part_vectors.append(vectors)
+            part_metadatas.extend(metadatas[:batch_size])
+            progress.update(chunks=len(vectors))
+            del texts[:batch_size], metadatas[:batch_size]
+
+    def save_checkpoint() -> None:
+        embed_buffered(flush=True)
+        vectors = (
+            np.concatenate(part_vectors)
+            if part_vectors
+            else np.empty((0, embedding_provider.dim), dtype=np.float32)
+        )
+        manifest["files"].update(finished)
+        checkpoint.save(vectors, part_metadatas, manifest)
+        finished.clear()
+        part_vectors.clear()
+        part_metadatas.clear()
+
+    prepared = iter_prepared(
+        todo,
+        workers=workers,
+        window=4 * workers,
+        max_doc_chars=max_doc_chars,
+        max_chunks=max_chunks,
+    )
+    last_checkpoint = time.perf_counter()
+    for path, chunks, reason in prepared:
+        entry = file_fingerprint(Path(path))
+        if chunks is None:
+            print(f"[WARN] Skipping {path} ({reason})")
+            if reason.startswith("failed"):
+                # Not recorded, so the next run retries it.
+                progress.update(files=1)
+                continue
+            entry["skipped"] = reason
+        else:
+            entry["chunks"] = len(chunks)
+            if reason:
+                print(f"[WARN] {path} {reason}")
+                entry["truncated"] = reason
+            if dry_run:
+                progress.update(files=1, chunks=len(chunks))
+                continue
+            texts.extend(c["chunk_text"] for c in chunks)
+            metadatas.extend(chunks)
+
+        finished[path] = entry
+        progress.update(files=1)
+        embed_buffered(flush=False)
+
+        if not dry_run and time.perf_counter() - last_checkpoint >= checkpoint_seconds:
+            save_checkpoint()
+            last_checkpoint = time.perf_counter()
+            print(f"[INFO] Checkpoint written: {len(manifest['parts']):,} parts", flush=True)
+
+    progress.report()
+    if dry_run:
+        manifest["files"].update(finished)
+        return manifest
 
-    if not text.strip():
-        print("[WARN] No text extracted from PDF")
-        return
+    save_checkpoint()
+    vector_store = checkpoint.build_index(manifest, index_type=index_type)
+    print(f"[INFO] Built {index_type} index over {vector_store.ntotal:,} vectors")
+    return manifest
 
-    if len(text) > MAX_DOC_SIZE_CHARS:
-        print(f"[WARN] Skipping {file_path.name} (too large)")
-        return
 
-    chunks = chunk_text(text)[:MAX_CHUNKS_PER_DOC]
+def report_incomplete_files(manifest: dict) -> None:
+    # Skipped and truncated files are only warned about as they go by; a
+    # long run needs them repeated at the end.
+    skipped = {p: e["skipped"] for p, e in manifest["files"].items() if "skipped" in e}
+    truncated = {p: e["truncated"] for p, e in manifest["files"].items() if "truncated" in e}
 
-    if not chunks:
-        print("[WARN] No chunks produced from PDF")
-        return
+    if skipped:
+        reasons = Counter(reason.split(" (")[0] for reason in skipped.values())
+        summary = ", ".join(f"{reason}: {count:,}" for reason, count in reasons.most_common())
+        print(f"[WARN] {len(skipped):,} files skipped ({summary})")
+        _print_files(skipped)
+    if truncated:
+        print(f"[WARN] {len(truncated):,} files truncated (raise --max-chunks-per-doc to keep all chunks)")
+        _print_files(truncated)
 
-    texts = [c["chunk_text"] for c in chunks]
-    embeddings = embedding_provider.embed(texts)
 
-    if dry_run:
-        print(f"[DRY-RUN] Would index {len(chunks)} PDF chunks")
-        return
+def _print_files(reasons: Dict[str, str]) -> None:
+    for path, reason in islice(sorted(reasons.items()), SUMMARY_MAX_FILES):
+        print(f"         {path}: {reason}")
+    if len(reasons) > SUMMARY_MAX_FILES:
+        print(f"         ... and {len(reasons) - SUMMARY_MAX_FILES:,} more (see {MANIFEST_NAME})")
 
-    vector_store.add(
-        embeddings=embeddings,
-        metadatas=chunks,
-    )
 
 def main():
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(
+        description="Extract, chunk and embed PDF/TXT files into one FAISS index.",
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        type=Path,
+        default=DEFAULT_INPUTS,
+        help="Files or directories (searched recursively) to ingest",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=INDEX_DIR / "bulk",
+        help="Index directory; also holds the checkpoint manifest",
+    )
+    parser.add_argument("--provider", choices=PROVIDERS, default="huggingface")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Extraction and chunking processes",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Chunks per embedding call, taken across file boundaries",
+    )
+    parser.add_argument(
+        "--index-type",
+        choices=INDEX_TYPES,
+        default="flat",
+        help="FAISS index type; IVF indexes are trained once, on all chunks, at the end",
+    )
+    parser.add_argument(
+        "--max-doc-chars",
+        type=int,
+        default=None,
+        help="Skip files with more extracted characters than this (no limit by default)",
+    )
+    parser.add_argument(
+        "--max-chunks-per-doc",
+        type=int,
+        default=None,
+        help="Index at most this many chunks per file (no limit by default)",
+    )
+    parser.add_argument(
+        "--checkpoint-minutes",
+        type=float,
+        default=10.0,
+        help="Minutes between checkpoints of the embedded chunks and manifest",
+    )
+    parser.add_argument(
+        "--progress-seconds",
+        type=float,
+        default=10.0,
+        help="Seconds between progress lines",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard an existing checkpoint instead of resuming from it",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
-        help="Run without writing FAISS index",
+        help="Extract and chunk only; nothing is embedded or written",
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        type=Path,
+        default=None,
+        help="Directory of the persistent embedding cache (disabled if omitted)",
     )
 
     args = parser.parse_args()
-
-    embedding_provider = DummyEmbeddingProvider()
-    vector_store = FAISSVectorStore(dim=FAISS_DIM)
-
-    txt_dir = Path("data/txt")
-    txt_files = list(txt_dir.glob("*.txt")) if txt_dir.exists() else []
-
-    if txt_files:
-        print(f"[INFO] Found {len(txt_files)} TXT files")
-
-    for file_path in txt_files:
-        ingest_txt_file(
-            file_path=file_path,
-            embedding_provider=embedding_provider,
-            vector_store=vector_store,
-            dry_run=args.dry_run,
+    if args.batch_size <= 0:
+        parser.error("--batch-size must be positive")
+    if args.max_doc_chars is not None and args.max_doc_chars <= 0:
+        parser.error("--max-doc-chars must be positive")
+    if args.max_chunks_per_doc is not None and args.max_chunks_per_doc <= 0:
+        parser.error("--max-chunks-per-doc must be positive")
+
+    files = discover_files(args.inputs)
+    print(f"[INFO] Found {len(files):,} PDF/TXT files")
+
+    embedding_provider = (
+        DummyEmbeddingProvider()
+        if args.dry_run
+        else make_embedding_provider(args.provider, batch_size=args.batch_size)
+    )
+    if args.embedding_cache and not args.dry_run:
+        embedding_provider = CachedEmbeddingProvider(
+            embedding_provider,
+            cache_dir=args.embedding_cache,
         )
 
-    pdf_dir = Path("data/pdf")
-    pdf_files = list(pdf_dir.glob("*.pdf")) if pdf_dir.exists() else []
-
-    if pdf_files:
-        print(f"\n[INFO] Found {len(pdf_files)} PDF files")
-
-    for file_path in pdf_files:
-        ingest_pdf_file(
-            file_path=file_path,
-            embedding_provider=embedding_provider,
-            vector_store=vector_store,
-            dry_run=args.dry_run,
-        )
+    manifest = ingest_files(
+        files=files,
+        embedding_provider=embedding_provider,
+        index_dir=args.output,
+        workers=max(1, args.workers),
+        batch_size=args.batch_size,
+        checkpoint_seconds=args.checkpoint_minutes * 60,
+        progress_seconds=args.progress_seconds,
+        index_type=args.index_type,
+        max_doc_chars=args.max_doc_chars,
+        max_chunks=args.max_chunks_per_doc,
+        fresh=args.fresh,
+        dry_run=args.dry_run,
+    )
 
+    chunks = sum(entry.get("chunks", 0) for entry in manifest["files"].values())
     if args.dry_run:
-        print("\n[DRY-RUN] Ingestion complete — no data written")
+        print(f"\n[DRY-RUN] Would index {chunks:,} chunks — no data written")
+        report_incomplete_files(manifest)
         return
 
-    INDEX_DIR.mkdir(exist_ok=True)
-
-    vector_store.save(
-        index_path=INDEX_DIR / "index.faiss",
-        metadata_path=INDEX_DIR / "metadata.json",
-    )
+    print(f"\n[INFO] FAISS index with {chunks:,} chunks written to {args.output}")
+    report_incomplete_files(manifest)
 
-    print("\n[INFO] FAISS index written to disk")
+    if isinstance(embedding_provider, CachedEmbeddingProvider):
+        print(f"[INFO] Embedding cache: {embedding_provider.stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+import numpy as np
+from .fileio import replace_file
+
+BM25_TERMS_NAME = "bm25.terms.json"
+BM25_ARRAYS = ("offsets", "docs", "freqs", "lengths")
+
+# Keeps identifiers such as SG-04, SYS_123 or 4.2.1 together as one term.
+TOKEN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    # Postings are stored CSR style: the postings of term t are
+    # docs[offsets[t]:offsets[t + 1]] with matching freqs, docs being the
+    # row of the chunk in the vector store.
+    def __init__(
+        self,
+        *,
+        terms: Sequence[str],
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        freqs: np.ndarray,
+        lengths: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.term_ids: Dict[str, int] = {t: i for i, t in enumerate(terms)}
+        self.offsets = offsets
+        self.docs = docs
+        self.freqs = freqs
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts: Iterable[str], **params) -> "BM25Index":
+        postings: Dict[str, List[int]] = {}
+        frequencies: Dict[str, List[int]] = {}
+        lengths: List[int] = []
+
+        for row, text in enumerate(texts):
+            tokens = tokenize(text or "")
+            lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                postings.setdefault(term, []).append(row)
+                frequencies.setdefault(term, []).append(freq)
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        if terms:
+            np.cumsum([len(postings[t]) for t in terms], out=offsets[1:])
+
+        return cls(
+            terms=terms,
+            offsets=offsets,
+            docs=np.fromiter((d for t in terms for d in postings[t]), dtype=np.int32, count=offsets[-1]),
+            freqs=np.fromiter((f for t in terms for f in frequencies[t]), dtype=np.int32, count=offsets[-1]),
+            lengths=np.asarray(lengths, dtype=np.int32),
+            **params,
+        )
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.lengths), dtype=np.float32)
+        if not len(scores):
+            return scores
+
+        norms = self.k1 * (1 - self.b + self.b * self.lengths / max(self.avg_length, 1e-9))
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.docs[start:end]
+            freqs = self.freqs[start:end].astype(np.float32)
+            df = end - start
+            idf = math.log1p((len(scores) - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + norms[docs])
+        return scores
+
+    def search(self, query: str, k: int) -> np.ndarray:
+        # Rows of the k best matching chunks, best first; chunks sharing no
+        # term with the query are never returned.
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        return matched[np.lexsort((matched, -scores[matched]))]
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        with replace_file(path / BM25_TERMS_NAME) as f:
+            f.write(json.dumps(terms).encode("utf-8"))
+        for name in BM25_ARRAYS:
+            with replace_file(path / f"bm25.{name}.npy") as f:
+                np.save(f, getattr(self, name))
+
+    @classmethod
+    def load(cls, path: Path, **params) -> "BM25Index":
+        path = Path(path)
+        terms = json.loads((path / BM25_TERMS_NAME).read_text())
+        arrays = {
+            name: np.load(path / f"bm25.{name}.npy", mmap_mode="r")
+            for name in BM25_ARRAYS
+        }
+        return cls(terms=terms, **arrays, **params)
+
+
+def has_bm25_index(path: Path) -> bool:
+    return (Path(path) / BM25_TERMS_NAME).exists()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], *, k: int = 60) -> List[int]:
+    # Each ranking lists rows best first. Rows are ordered by the sum of
+    # 1 / (k + rank) over the rankings they appear in.
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            row = int(row)
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=lambda row: -fused[row])
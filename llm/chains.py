@@ -1,6 +1,15 @@
+import threading
+from collections import OrderedDict
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+# Compiled chains of the most recently used LLM clients. LangChain models
+# are not hashable, so entries are keyed by id(llm); each entry holds the
+# llm itself, which keeps the id from being reused while it is cached.
+RAG_CHAIN_CACHE_SIZE = 64
+_chains: "OrderedDict[int, tuple]" = OrderedDict()
+_chains_lock = threading.Lock()
+
 
 def build_rag_chain(llm):
     prompt = ChatPromptTemplate.from_messages(
@@ -27,4 +36,21 @@ def build_rag_chain(llm):
         ]
     )
 
-    return prompt | llm | StrOutputParser()
\ No newline at end of file
+    return prompt | llm | StrOutputParser()
+
+
+def get_rag_chain(llm):
+    key = id(llm)
+    with _chains_lock:
+        entry = _chains.get(key)
+        if entry is not None and entry[0] is llm:
+            _chains.move_to_end(key)
+            return entry[1]
+
+    chain = build_rag_chain(llm)
+
+    with _chains_lock:
+        _chains[key] = (llm, chain)
+        while len(_chains) > RAG_CHAIN_CACHE_SIZE:
+            _chains.popitem(last=False)
+    return chain
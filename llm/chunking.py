@@ -1,4 +1,7 @@
-from typing import List, Dict
+import re
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from .tokens import DEFAULT_MODEL, get_encoding
 
 def chunk_text(
     text: str,
@@ -22,10 +25,173 @@ def chunk_text(
             {
                 "chunk_text": chunk,
                 "chunk_index": index,
+                "char_start": start,
+                "char_end": start + len(chunk),
             }
         )
 
         index += 1
         start = end - overlap
 
-    return chunks
\ No newline at end of file
+    return chunks
+
+
+DEFAULT_MAX_TOKENS = 512
+COUNT_BATCH_SIZE = 256
+
+# Requirement identifiers such as SYS-123, SG-01 or REQ-BRK-007.
+REQUIREMENT_ID = re.compile(r"^\s*(?:[A-Z][A-Z0-9]{0,9}-)+\d+\b")
+MARKDOWN_HEADING = re.compile(r"^\s*#{1,6}\s+\S")
+# "3.2 Braking system" style headings; list items ending in a period are not
+# headings.
+NUMBERED_HEADING = re.compile(r"^\s*\d+(?:\.\d+)*\.?\s+[A-Z][^\n]{0,80}[^.\s:;,]\s*$")
+LINE = re.compile(r"[^\n]*\n|[^\n]+$")
+
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > 100:
+        return False
+    if MARKDOWN_HEADING.match(stripped) or NUMBERED_HEADING.match(stripped):
+        return True
+    letters = [c for c in stripped if c.isalpha()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters) and not REQUIREMENT_ID.match(stripped)
+
+
+def _iter_blocks(text: str) -> Iterator[Tuple[int, int, str]]:
+    # Yields (start, end, kind) for runs of lines that must stay together.
+    # A new block starts at a blank line, a heading or a requirement ID, so
+    # lines (table rows included) are never split between blocks.
+    block_start = None
+    block_end = None
+
+    for match in LINE.finditer(text):
+        line = match.group()
+        if not line.strip():
+            if block_start is not None:
+                yield block_start, block_end, "paragraph"
+                block_start = None
+            continue
+
+        if _is_heading(line):
+            if block_start is not None:
+                yield block_start, block_end, "paragraph"
+                block_start = None
+            yield match.start(), match.end(), "heading"
+            continue
+
+        if REQUIREMENT_ID.match(line) and block_start is not None:
+            yield block_start, block_end, "paragraph"
+            block_start = None
+
+        if block_start is None:
+            block_start = match.start()
+        block_end = match.end()
+
+    if block_start is not None:
+        yield block_start, block_end, "paragraph"
+
+
+def _iter_counted_blocks(text: str, encoding, batch_size: int) -> Iterator[Tuple[int, int, str, int]]:
+    # Token counts are computed for batch_size blocks at a time with the
+    # threaded batch encoder, which is where most of the chunking time goes.
+    batch: List[Tuple[int, int, str]] = []
+
+    def counted():
+        encoded = encoding.encode_ordinary_batch([text[start:end] for start, end, _ in batch])
+        for (start, end, kind), tokens in zip(batch, encoded):
+            yield start, end, kind, len(tokens)
+
+    for block in _iter_blocks(text):
+        batch.append(block)
+        if len(batch) >= batch_size:
+            yield from counted()
+            batch = []
+    if batch:
+        yield from counted()
+
+
+def _split_oversized(
+    text: str,
+    start: int,
+    end: int,
+    tokens: int,
+    max_tokens: int,
+) -> Iterator[Tuple[int, int]]:
+    # Line boundaries first; a single line still over budget is cut at the
+    # last whitespace inside a window sized from its chars-per-token ratio.
+    window = max(1, int((end - start) * max_tokens / tokens))
+    cursor = start
+    while cursor < end:
+        if end - cursor <= window:
+            yield cursor, end
+            return
+        limit = cursor + window
+        cut = text.rfind("\n", cursor, limit)
+        if cut <= cursor:
+            cut = max(text.rfind(" ", cursor, limit), text.rfind("\t", cursor, limit))
+        cut = limit if cut <= cursor else cut + 1
+        yield cursor, cut
+        cursor = cut
+
+
+def iter_chunks(
+    text: str,
+    *,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    model: str = DEFAULT_MODEL,
+    page_offsets: Optional[Sequence[int]] = None,
+) -> Iterator[Dict]:
+    # Packs whole blocks into chunks of at most max_tokens. Chunks never
+    # overlap; each is a contiguous slice text[char_start:char_end] and
+    # carries the heading of the section it belongs to.
+    encoding = get_encoding(model)
+
+    def count(start: int, end: int) -> int:
+        return len(encoding.encode_ordinary(text[start:end]))
+
+    index = 0
+    section = None
+    chunk_start = chunk_end = None
+    chunk_tokens = 0
+
+    def make_chunk(start: int, end: int, tokens: int) -> Dict:
+        chunk_text = text[start:end].rstrip()
+        chunk = {
+            "chunk_text": chunk_text,
+            "chunk_index": index,
+            "char_start": start,
+            "char_end": start + len(chunk_text),
+            "token_count": tokens,
+        }
+        if section is not None:
+            chunk["section"] = section
+        if page_offsets:
+            chunk["page"] = max(bisect_right(page_offsets, start), 1)
+        return chunk
+
+    for start, end, kind, tokens in _iter_counted_blocks(text, encoding, COUNT_BATCH_SIZE):
+        if kind == "heading" or (chunk_start is not None and chunk_tokens + tokens > max_tokens):
+            if chunk_start is not None:
+                yield make_chunk(chunk_start, chunk_end, chunk_tokens)
+                index += 1
+                chunk_start = None
+                chunk_tokens = 0
+            if kind == "heading":
+                section = text[start:end].strip().lstrip("#").strip()
+
+        if tokens > max_tokens:
+            for piece_start, piece_end in _split_oversized(text, start, end, tokens, max_tokens):
+                if not text[piece_start:piece_end].strip():
+                    continue
+                yield make_chunk(piece_start, piece_end, count(piece_start, piece_end))
+                index += 1
+            continue
+
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+        chunk_tokens += tokens
+
+    if chunk_start is not None:
+        yield make_chunk(chunk_start, chunk_end, chunk_tokens)
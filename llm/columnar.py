@@ -0,0 +1,158 @@
+import json
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterable, List
+import numpy as np
+from .fileio import replace_file
+
+MANIFEST_NAME = "metadata.json"
+FORMAT_VERSION = 1
+
+INT_MISSING = np.iinfo(np.int64).min
+
+
+def _column_kind(name: str, values: List) -> str:
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, str) for v in present):
+        return "text"
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in present):
+        return "int"
+    if all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool) for v in present):
+        return "float"
+    raise ValueError(f"Unsupported metadata values for column '{name}'")
+
+
+def write_columnar_metadata(path: Path, metadatas: Iterable[dict]) -> None:
+    path = Path(path)
+    metadatas = list(metadatas)
+
+    names: List[str] = []
+    for meta in metadatas:
+        for name in meta:
+            if name not in names:
+                names.append(name)
+
+    columns: Dict[str, str] = {}
+    for name in names:
+        values = [meta.get(name) for meta in metadatas]
+        kind = _column_kind(name, values)
+        columns[name] = kind
+
+        if kind == "text":
+            encoded = [(v or "").encode("utf-8") for v in values]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            if encoded:
+                np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            with replace_file(path / f"{name}.bin") as f:
+                for b in encoded:
+                    f.write(b)
+            with replace_file(path / f"{name}.offsets.npy") as f:
+                np.save(f, offsets)
+        elif kind == "int":
+            arr = np.array(
+                [INT_MISSING if v is None else int(v) for v in values],
+                dtype=np.int64,
+            )
+            with replace_file(path / f"{name}.npy") as f:
+                np.save(f, arr)
+        else:
+            arr = np.array(
+                [np.nan if v is None else float(v) for v in values],
+                dtype=np.float64,
+            )
+            with replace_file(path / f"{name}.npy") as f:
+                np.save(f, arr)
+
+        # A mask left over from an earlier save would hide values that are
+        # now present, so it is removed when the column has no gaps.
+        missing = np.array([v is None for v in values], dtype=bool)
+        missing_path = path / f"{name}.missing.npy"
+        if missing.any():
+            with replace_file(missing_path) as f:
+                np.save(f, missing)
+        else:
+            missing_path.unlink(missing_ok=True)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "count": len(metadatas),
+        "columns": columns,
+    }
+    with replace_file(path / MANIFEST_NAME) as f:
+        f.write(json.dumps(manifest).encode("utf-8"))
+
+
+def has_columnar_metadata(path: Path) -> bool:
+    return (Path(path) / MANIFEST_NAME).exists()
+
+
+def _memmap_bytes(file_path: Path) -> np.ndarray:
+    if file_path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(file_path, dtype=np.uint8, mode="r")
+
+
+class ColumnarMetadata(Sequence):
+    def __init__(self, path: Path):
+        path = Path(path)
+        manifest = json.loads((path / MANIFEST_NAME).read_text())
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported metadata format: {manifest.get('format')}")
+
+        self._count = manifest["count"]
+        self._columns: Dict[str, str] = manifest["columns"]
+        self._data = {}
+        self._missing = {}
+
+        for name, kind in self._columns.items():
+            if kind == "text":
+                self._data[name] = (
+                    _memmap_bytes(path / f"{name}.bin"),
+                    np.load(path / f"{name}.offsets.npy", mmap_mode="r"),
+                )
+            else:
+                self._data[name] = np.load(path / f"{name}.npy", mmap_mode="r")
+
+            missing_path = path / f"{name}.missing.npy"
+            if missing_path.exists():
+                self._missing[name] = np.load(missing_path, mmap_mode="r")
+
+    @property
+    def columns(self) -> Dict[str, str]:
+        return dict(self._columns)
+
+    def column(self, name: str) -> np.ndarray:
+        if self._columns[name] == "text":
+            raise ValueError(f"Column '{name}' is a text column")
+        return self._data[name]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._row(i) for i in range(*idx.indices(self._count))]
+        idx = int(idx)
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError("metadata index out of range")
+        return self._row(idx)
+
+    def take(self, rows: Iterable[int]) -> List[dict]:
+        return [self[i] for i in rows]
+
+    def _row(self, i: int) -> dict:
+        meta = {}
+        for name, kind in self._columns.items():
+            missing = self._missing.get(name)
+            if missing is not None and missing[i]:
+                continue
+            if kind == "text":
+                blob, offsets = self._data[name]
+                meta[name] = bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8")
+            elif kind == "int":
+                meta[name] = int(self._data[name][i])
+            else:
+                meta[name] = float(self._data[name][i])
+        return meta
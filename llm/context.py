@@ -0,0 +1,134 @@
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Tuple
+from .tokens import DEFAULT_MODEL, count_tokens, count_tokens_batch
+
+DEFAULT_CONTEXT_BUDGET = 8_000
+
+# "\n\n" between non-contiguous blocks encodes to a single token.
+SEPARATOR_TOKENS = 1
+
+# Prompt-context budgets, well below each model's window so the system
+# prompt and the generated specification still fit.
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-4o-mini": 16_000,
+    "gpt-4o": 16_000,
+    "gemini-2.5-flash-lite": 32_000,
+    "gemini-2.5-flash": 32_000,
+    "claude-3-5-haiku-20241022": 16_000,
+}
+
+
+@dataclass
+class PackedContext:
+    text: str
+    citations: List[dict] = field(default_factory=list)
+    tokens_used: int = 0
+    token_budget: int = 0
+
+
+def context_budget_for_model(model: Optional[str]) -> int:
+    if not model:
+        return DEFAULT_CONTEXT_BUDGET
+    model = model.split("/")[-1]
+    return MODEL_CONTEXT_BUDGETS.get(model, DEFAULT_CONTEXT_BUDGET)
+
+
+def _uncovered(start: int, end: int, covered: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    parts = []
+    cursor = start
+    for c_start, c_end in sorted(covered):
+        if c_end <= cursor or c_start >= end:
+            continue
+        if c_start > cursor:
+            parts.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        parts.append((cursor, end))
+    return parts
+
+
+def pack_context(
+    citations: List[dict],
+    *,
+    token_budget: int,
+    model: str = DEFAULT_MODEL,
+) -> PackedContext:
+    # citations are expected in score order (best first), as returned by
+    # VectorStore.search. Character offsets are only comparable within one
+    # document, so corpus-wide results are trimmed and ordered per document_id.
+    citations = [c for c in citations if isinstance(c, dict) and c.get("chunk_text")]
+    # Whole chunks are counted in one batched encode; only chunks trimmed
+    # against an overlapping neighbour are re-counted below.
+    chunk_tokens = count_tokens_batch([c["chunk_text"] for c in citations], model)
+    segments = []  # (sort key, char_start, char_end, text)
+    selected = []  # (sort key, citation)
+    covered: Dict[Hashable, List[Tuple[int, int]]] = {}
+    seen_texts = set()
+    used = 0
+
+    for rank, citation in enumerate(citations):
+        text = citation["chunk_text"]
+        document_id = citation.get("document_id", 0)
+        document_covered = covered.setdefault(document_id, [])
+
+        start = citation.get("char_start")
+        if start is None:
+            if text in seen_texts:
+                continue
+            pieces = [(None, None, text)]
+        else:
+            # Drop the parts already included through an overlapping chunk.
+            pieces = [
+                (p_start, p_end, text[p_start - start:p_end - start])
+                for p_start, p_end in _uncovered(start, start + len(text), document_covered)
+            ]
+            pieces = [p for p in pieces if p[2].strip()]
+            if not pieces:
+                continue
+
+        if len(pieces) == 1 and len(pieces[0][2]) == len(text):
+            tokens = chunk_tokens[rank] + SEPARATOR_TOKENS
+        else:
+            tokens = sum(count_tokens(p[2], model) + SEPARATOR_TOKENS for p in pieces)
+        if used + tokens > token_budget:
+            continue
+
+        used += tokens
+        seen_texts.add(text)
+        key = (
+            document_id,
+            start if start is not None else float("inf"),
+            citation.get("chunk_index", rank),
+            rank,
+        )
+        selected.append((key, citation))
+        for p_start, p_end, p_text in pieces:
+            segment_key = key
+            if p_start is not None:
+                document_covered.append((p_start, p_end))
+                segment_key = (document_id, p_start) + key[2:]
+            segments.append((segment_key, p_start, p_end, p_text))
+
+    segments.sort(key=lambda s: s[0])
+    selected.sort(key=lambda s: s[0])
+
+    blocks: List[str] = []
+    previous = None
+    for segment_key, p_start, p_end, p_text in segments:
+        if blocks and p_start is not None and (segment_key[0], p_start) == previous:
+            # Contiguous with the previous segment: continue the same block.
+            blocks[-1] += p_text
+        else:
+            blocks.append(p_text)
+        previous = (segment_key[0], p_end)
+
+    context = "\n\n".join(blocks)
+
+    return PackedContext(
+        text=context,
+        citations=[c for _, c in selected],
+        tokens_used=count_tokens(context, model) if context else 0,
+        token_budget=token_budget,
+    )
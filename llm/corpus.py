@@ -0,0 +1,394 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Sequence as SequenceABC
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from llm.columnar import ColumnarMetadata, write_columnar_metadata
+
+# FAISS ids encode (document id, chunk row) as document_id << 32 | row, so a
+# document's vectors are one contiguous id range and can be removed without
+# touching the rest of the corpus.
+DOCUMENT_ID_SHIFT = 32
+MAX_CHUNKS_PER_DOCUMENT = 1 << DOCUMENT_ID_SHIFT
+
+DOCUMENTS_NAME = "documents.npy"
+METADATA_DIR_NAME = "metadata"
+VECTORS_NAME = "vectors.npy"
+SEGMENTS_DIR_NAME = "segments"
+# The corpus on disk is a set of immutable segments plus this manifest, which
+# is replaced with a single rename. Readers see either the old or the new
+# list of segments, never a mix.
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+DOCUMENT_DTYPE = np.dtype(
+    [("document_id", "<i8"), ("owner_id", "<i8"), ("chunk_count", "<i8")]
+)
+
+
+def encode_chunk_ids(document_id: int, count: int) -> np.ndarray:
+    return (np.int64(document_id) << DOCUMENT_ID_SHIFT) + np.arange(count, dtype=np.int64)
+
+
+def decode_chunk_id(chunk_id: int) -> Tuple[int, int]:
+    return int(chunk_id) >> DOCUMENT_ID_SHIFT, int(chunk_id) & (MAX_CHUNKS_PER_DOCUMENT - 1)
+
+
+class _DocumentRows(SequenceABC):
+    # One document's rows within a segment's columnar metadata.
+    def __init__(self, metadata: ColumnarMetadata, start: int, count: int):
+        self._metadata = metadata
+        self._start = start
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._count))]
+        if not 0 <= idx < self._count:
+            raise IndexError("metadata index out of range")
+        return self._metadata[self._start + idx]
+
+
+def has_corpus(path: Path) -> bool:
+    path = Path(path)
+    return (path / MANIFEST_NAME).exists() or (path / DOCUMENTS_NAME).exists()
+
+
+def read_manifest(path: Path) -> dict:
+    manifest_path = Path(path) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"format": MANIFEST_FORMAT, "next_seq": 0, "segments": [], "removed": {}, "retired": []}
+    return json.loads(manifest_path.read_text())
+
+
+def write_manifest(path: Path, manifest: dict) -> None:
+    path = Path(path)
+    tmp = path / f".{MANIFEST_NAME}.{os.getpid()}.{uuid.uuid4().hex}"
+    tmp.write_text(json.dumps(manifest))
+    os.replace(tmp, path / MANIFEST_NAME)
+
+
+def write_segment(
+    path: Path,
+    documents: Sequence[Tuple[int, int, np.ndarray, Sequence[dict]]],
+) -> str:
+    # documents: (document_id, owner_id, vectors, metadatas). The segment is
+    # written under a temp name and renamed into place, so a listed segment
+    # is always complete; it is never modified afterwards.
+    segments_dir = Path(path) / SEGMENTS_DIR_NAME
+    segments_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+    tmp = segments_dir / f".tmp-{name}"
+    tmp.mkdir()
+    try:
+        rows = np.array(
+            [(d, o, len(v)) for d, o, v, _ in documents],
+            dtype=DOCUMENT_DTYPE,
+        )
+        np.save(tmp / DOCUMENTS_NAME, rows)
+        vectors = [np.asarray(v, dtype=np.float32) for _, _, v, _ in documents]
+        np.save(tmp / VECTORS_NAME, np.concatenate(vectors) if vectors else np.empty((0, 0), np.float32))
+        (tmp / METADATA_DIR_NAME).mkdir()
+        write_columnar_metadata(
+            tmp / METADATA_DIR_NAME,
+            [dict(m) for _, _, _, metadatas in documents for m in metadatas],
+        )
+        os.rename(tmp, segments_dir / name)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return name
+
+
+def append_segment(
+    path: Path,
+    documents: Sequence[Tuple[int, int, np.ndarray, Sequence[dict]]] = (),
+    *,
+    removed: Iterable[int] = (),
+) -> dict:
+    # O(changed documents): the existing segments are not read. A segment
+    # with a higher sequence number replaces a document's earlier versions;
+    # a removal hides every version written before it. Callers serialize
+    # writers (see backend documents.corpus).
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(path)
+
+    seq = manifest["next_seq"]
+    if documents:
+        manifest["dim"] = int(np.asarray(documents[0][2]).shape[1])
+        manifest["segments"].append({"name": write_segment(path, documents), "seq": seq})
+    for document_id in removed:
+        manifest["removed"][str(document_id)] = seq
+    manifest["next_seq"] = seq + 1
+    write_manifest(path, manifest)
+    return manifest
+
+
+class CorpusVectorStore:
+    def __init__(self, dim: int):
+        import faiss
+
+        self.dim = dim
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        # One row per document rather than per chunk: chunk ids are derived
+        # from the document id and chunk count when building selectors.
+        self.documents = np.empty(0, dtype=DOCUMENT_DTYPE)
+        self._metadatas: Dict[int, Sequence[dict]] = {}
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def nbytes(self) -> int:
+        return self.index.ntotal * self.dim * 4 + self.documents.nbytes
+
+    def has_document(self, document_id: int) -> bool:
+        return bool(np.any(self.documents["document_id"] == document_id))
+
+    def document_ids(self, *, owner_id: Optional[int] = None) -> List[int]:
+        documents = self.documents
+        if owner_id is not None:
+            documents = documents[documents["owner_id"] == owner_id]
+        return documents["document_id"].tolist()
+
+    def add_document(
+        self,
+        *,
+        document_id: int,
+        owner_id: int,
+        embeddings: np.ndarray,
+        metadatas: List[dict],
+    ) -> None:
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError("Embedding dimension mismatch during add")
+        if len(vectors) != len(metadatas):
+            raise ValueError("Embeddings and metadata length mismatch")
+        if len(vectors) >= MAX_CHUNKS_PER_DOCUMENT:
+            raise ValueError("Too many chunks for one document")
+
+        self.remove_document(document_id)
+
+        self.index.add_with_ids(vectors, encode_chunk_ids(document_id, len(vectors)))
+        row = np.array([(document_id, owner_id, len(vectors))], dtype=DOCUMENT_DTYPE)
+        self.documents = np.concatenate([self.documents, row])
+        self._metadatas[document_id] = list(metadatas)
+
+    def remove_document(self, document_id: int) -> bool:
+        import faiss
+
+        mask = self.documents["document_id"] == document_id
+        if not mask.any():
+            return False
+
+        start = int(np.int64(document_id) << DOCUMENT_ID_SHIFT)
+        self.index.remove_ids(faiss.IDSelectorRange(start, start + MAX_CHUNKS_PER_DOCUMENT))
+        self.documents = self.documents[~mask]
+        self._metadatas.pop(document_id, None)
+        return True
+
+    def _selector(self, owner_id: Optional[int], document_ids: Optional[Iterable[int]]):
+        import faiss
+
+        mask = np.ones(len(self.documents), dtype=bool)
+        if owner_id is not None:
+            mask &= self.documents["owner_id"] == owner_id
+        if document_ids is not None:
+            mask &= np.isin(self.documents["document_id"], list(document_ids))
+
+        if mask.all():
+            return None, len(self.documents) > 0
+
+        selected = self.documents[mask]
+        if not len(selected):
+            return None, False
+
+        ids = np.concatenate(
+            [encode_chunk_ids(d, n) for d, n in zip(selected["document_id"], selected["chunk_count"])]
+        )
+        return faiss.IDSelectorBatch(ids), True
+
+    def search_rows(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 5,
+        *,
+        owner_id: Optional[int] = None,
+        document_ids: Optional[Iterable[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        import faiss
+
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if queries.shape[1] != self.dim:
+            raise ValueError(
+                f"FAISS dimension mismatch: index={self.dim}, query={queries.shape[1]}"
+            )
+
+        selector, any_selected = self._selector(owner_id, document_ids)
+        if not any_selected:
+            return (
+                np.full((len(queries), k), -np.inf, dtype=np.float32),
+                np.full((len(queries), k), -1, dtype=np.int64),
+            )
+
+        params = faiss.SearchParameters(sel=selector) if selector is not None else None
+        return self.index.search(queries, k, params=params)
+
+    def _document_metadatas(self, document_id: int) -> Sequence[dict]:
+        return self._metadatas[document_id]
+
+    def get_metadatas(self, chunk_ids) -> List[dict]:
+        results = []
+        for chunk_id in chunk_ids:
+            if chunk_id == -1:
+                continue
+            document_id, row = decode_chunk_id(chunk_id)
+            metadata = dict(self._document_metadatas(document_id)[row])
+            metadata["document_id"] = document_id
+            results.append(metadata)
+        return results
+
+    def search(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        *,
+        owner_id: Optional[int] = None,
+        document_ids: Optional[Iterable[int]] = None,
+    ) -> List[dict]:
+        if self.ntotal == 0:
+            return []
+
+        _, chunk_ids = self.search_rows(
+            np.asarray(query_embedding),
+            k,
+            owner_id=owner_id,
+            document_ids=document_ids,
+        )
+        return self.get_metadatas(chunk_ids[0])
+
+    def save(self, path: Path) -> None:
+        # Writes the whole corpus as one segment (compaction). Segments it
+        # replaces stay on disk until the next compaction, for readers that
+        # loaded the previous manifest and are still opening them.
+        import faiss
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        previous = read_manifest(path)
+
+        # Sorted chunk ids group the vectors by document, in row order.
+        ids = np.sort(faiss.vector_to_array(self.index.id_map))
+        if len(ids):
+            vectors = self.index.reconstruct_batch(ids)
+        else:
+            vectors = np.empty((0, self.dim), dtype=np.float32)
+
+        documents = []
+        start = 0
+        for document_id, owner_id, count in sorted(self.documents.tolist()):
+            documents.append(
+                (document_id, owner_id, vectors[start:start + count], list(self._metadatas[document_id]))
+            )
+            start += count
+
+        seq = previous["next_seq"]
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "dim": self.dim,
+            "next_seq": seq + 1,
+            "segments": [{"name": write_segment(path, documents), "seq": seq}],
+            "removed": {},
+            "retired": [segment["name"] for segment in previous["segments"]],
+        }
+        write_manifest(path, manifest)
+
+        for name in previous.get("retired", []):
+            shutil.rmtree(path / SEGMENTS_DIR_NAME / name, ignore_errors=True)
+        _remove_legacy_layout(path)
+
+    def load(self, path: Path) -> None:
+        import faiss
+
+        path = Path(path)
+        if not (path / MANIFEST_NAME).exists():
+            self._load_legacy(path)
+            return
+
+        manifest = read_manifest(path)
+        self.dim = manifest.get("dim", self.dim)
+        removed = {int(d): seq for d, seq in manifest["removed"].items()}
+        segments = sorted(manifest["segments"], key=lambda segment: segment["seq"])
+
+        # The newest segment holding a document wins, unless the document was
+        # removed after that segment was written.
+        loaded = []
+        latest: Dict[int, int] = {}
+        for i, segment in enumerate(segments):
+            segment_dir = path / SEGMENTS_DIR_NAME / segment["name"]
+            rows = np.load(segment_dir / DOCUMENTS_NAME)
+            loaded.append((segment, segment_dir, rows))
+            for document_id in rows["document_id"].tolist():
+                latest[document_id] = i
+
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+        self._metadatas = {}
+        documents = []
+        for i, (segment, segment_dir, rows) in enumerate(loaded):
+            keep = np.array(
+                [
+                    latest[d] == i and removed.get(d, -1) < segment["seq"]
+                    for d in rows["document_id"].tolist()
+                ],
+                dtype=bool,
+            )
+            if not keep.any():
+                continue
+
+            # Metadata is opened now rather than on first use, so a cached
+            # corpus never reads files written after it was loaded.
+            metadata = ColumnarMetadata(segment_dir / METADATA_DIR_NAME)
+            vectors = np.load(segment_dir / VECTORS_NAME, mmap_mode="r")
+            starts = np.concatenate([[0], np.cumsum(rows["chunk_count"])[:-1]]).astype(np.int64)
+            for row, start, kept in zip(rows, starts, keep):
+                if not kept:
+                    continue
+                document_id, count = int(row["document_id"]), int(row["chunk_count"])
+                self.index.add_with_ids(
+                    np.ascontiguousarray(vectors[start:start + count], dtype=np.float32),
+                    encode_chunk_ids(document_id, count),
+                )
+                self._metadatas[document_id] = _DocumentRows(metadata, int(start), count)
+                documents.append(row)
+
+        self.documents = np.array(documents, dtype=DOCUMENT_DTYPE)
+
+    def _load_legacy(self, path: Path) -> None:
+        # Corpora saved before segments: one index.faiss, documents.npy and a
+        # metadata directory per document.
+        import faiss
+
+        self.index = faiss.read_index(str(path / "index.faiss"))
+        self.dim = self.index.d
+        self.documents = np.load(path / DOCUMENTS_NAME)
+        self._metadatas = {
+            int(document_id): ColumnarMetadata(path / METADATA_DIR_NAME / str(document_id))
+            for document_id in self.documents["document_id"].tolist()
+        }
+
+
+def _remove_legacy_layout(path: Path) -> None:
+    for name in ("index.faiss", DOCUMENTS_NAME):
+        if (path / name).exists():
+            (path / name).unlink()
+    shutil.rmtree(path / METADATA_DIR_NAME, ignore_errors=True)
@@ -0,0 +1,222 @@
+import fcntl
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .embeddings import EmbeddingProvider
+
+KEY_BYTES = 16
+# One index record per cached vector: the text digest and the vector's row in
+# vectors.f32. Rows are stored explicitly so a vector appended by a writer
+# that crashed before recording its key is simply never referenced.
+RECORD_DTYPE = np.dtype([("key", f"S{KEY_BYTES}"), ("row", "<i8")])
+
+
+def hash_text(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+def _namespace_dir(namespace: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", namespace)
+
+
+class EmbeddingCache:
+    def __init__(self, root: Path, *, namespace: str, dim: int):
+        self.dim = dim
+        self.path = Path(root) / _namespace_dir(namespace)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._vectors_path = self.path / "vectors.f32"
+        self._index_path = self.path / "index.bin"
+        self._lock_path = self.path / ".lock"
+        self._row_bytes = dim * np.dtype(np.float32).itemsize
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._index_offset = 0
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+
+        with self._lock, self._file_lock():
+            self._truncate_torn_tails()
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _truncate_torn_tails(self) -> None:
+        # A writer killed mid-append leaves a partial vector or record at the
+        # end of a file. Appending after it would shift every later row off
+        # its boundary, so the tail is cut back to the last complete entry.
+        # Callers hold the file lock.
+        for path, entry_bytes in (
+            (self._vectors_path, self._row_bytes),
+            (self._index_path, RECORD_DTYPE.itemsize),
+        ):
+            if path.exists():
+                size = path.stat().st_size
+                if size % entry_bytes:
+                    os.truncate(path, size - size % entry_bytes)
+
+    def _refresh(self) -> None:
+        # Pick up records appended by other processes since the last read.
+        if self._index_path.exists():
+            size = self._index_path.stat().st_size
+            complete = size - size % RECORD_DTYPE.itemsize
+            if complete > self._index_offset:
+                with open(self._index_path, "rb") as f:
+                    f.seek(self._index_offset)
+                    records = np.frombuffer(
+                        f.read(complete - self._index_offset),
+                        dtype=RECORD_DTYPE,
+                    )
+                for key, row in zip(records["key"], records["row"]):
+                    self._rows[bytes(key)] = int(row)
+                self._index_offset = complete
+
+        if self._vectors_path.exists():
+            rows = self._vectors_path.stat().st_size // self._row_bytes
+            if rows > len(self._vectors):
+                self._vectors = np.memmap(
+                    self._vectors_path,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(rows, self.dim),
+                )
+
+    def get_many(self, keys: Sequence[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            found = {}
+            missing = []
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None or row >= len(self._vectors):
+                    missing.append(i)
+                else:
+                    found[i] = self._vectors[row]
+            return found, missing
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(keys), self.dim):
+            raise ValueError("Embedding cache dimension mismatch")
+
+        with self._lock, self._file_lock():
+            self._truncate_torn_tails()
+            self._refresh()
+
+            new_keys = []
+            new_rows = []
+            seen = set()
+            for i, key in enumerate(keys):
+                if key in self._rows or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(i)
+
+            if not new_keys:
+                return
+
+            with open(self._vectors_path, "ab") as f:
+                first_row = f.tell() // self._row_bytes
+                f.write(vectors[new_rows].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            records = np.empty(len(new_keys), dtype=RECORD_DTYPE)
+            records["key"] = new_keys
+            records["row"] = np.arange(first_row, first_row + len(new_keys))
+            with open(self._index_path, "ab") as f:
+                f.write(records.tobytes())
+
+            self._refresh()
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        *,
+        cache_dir: Path,
+        on_lookup: Optional[Callable[[str, int], None]] = None,
+    ):
+        self.provider = provider
+        # Called with ("hit", n) and ("miss", n) after every batch.
+        self.on_lookup = on_lookup
+        self.cache = EmbeddingCache(
+            cache_dir,
+            namespace=provider.cache_namespace,
+            dim=provider.dim,
+        )
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def dim(self) -> int:
+        return self.provider.dim
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.provider.cache_namespace
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return vectors
+
+        keys = [hash_text(t) for t in texts]
+        found, missing = self.cache.get_many(keys)
+        for i, vector in found.items():
+            vectors[i] = vector
+
+        if missing:
+            # Identical texts in the same batch (repeated boilerplate) are
+            # embedded once.
+            unique: Dict[bytes, int] = {}
+            for i in missing:
+                unique.setdefault(keys[i], i)
+            unique_rows = list(unique.values())
+
+            embedded = self.provider.embed_array([texts[i] for i in unique_rows])
+            self.cache.put_many([keys[i] for i in unique_rows], embedded)
+
+            by_key = {keys[i]: embedded[j] for j, i in enumerate(unique_rows)}
+            for i in missing:
+                vectors[i] = by_key[keys[i]]
+
+        with self._stats_lock:
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if self.on_lookup is not None:
+            self.on_lookup("hit", len(found))
+            self.on_lookup("miss", len(missing))
+
+        return vectors
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.cache),
+            }
@@ -1,6 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable, Iterator, List, Sequence
+import hashlib
 import os
+import re
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 64
+
 class EmbeddingProvider(ABC):
 
     @abstractmethod
@@ -12,6 +18,36 @@ class EmbeddingProvider(ABC):
     def dim(self) -> int:
         pass
 
+    @property
+    def cache_namespace(self) -> str:
+        # Identifies the vector space for the persistent embedding cache:
+        # vectors from different providers/models must never be mixed.
+        return f"{type(self).__name__}/{self.dim}"
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        # Contiguous (len(texts), dim) float32 matrix, ready for FAISS.
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.ascontiguousarray(self.embed(list(texts)), dtype=np.float32)
+
+    def embed_batches(
+        self,
+        texts: Iterable[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[np.ndarray]:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+
+        batch: List[str] = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield self.embed_array(batch)
+                batch = []
+
+        if batch:
+            yield self.embed_array(batch)
+
 class DummyEmbeddingProvider(EmbeddingProvider):
 
     def embed(self, texts: List[str]) -> List[List[float]]:
@@ -21,6 +57,41 @@ class DummyEmbeddingProvider(EmbeddingProvider):
     def dim(self) -> int:
         return 5
 
+class HashingEmbeddingProvider(EmbeddingProvider):
+    # Deterministic, dependency-free embeddings for benchmarks and tests:
+    # each token is hashed to a signed bucket and the counts L2-normalised,
+    # so texts sharing terms get similar vectors.
+    TOKEN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+    def __init__(self, dim: int = 384):
+        self._dim = dim
+        self._buckets = {}
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def _bucket(self, token: str):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = (digest >> 1) % self._dim, 1.0 if digest & 1 else -1.0
+            self._buckets[token] = bucket
+        return bucket
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self._dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self.TOKEN.findall(text.lower()):
+                column, sign = self._bucket(token)
+                vectors[row, column] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
 class OpenAIEmbeddingProvider(EmbeddingProvider):
     def __init__(self, model: str = "text-embedding-3-small"):
         from openai import OpenAI
@@ -32,6 +103,10 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
         self.client = OpenAI(api_key=api_key)
         self.model = model
 
+    @property
+    def cache_namespace(self) -> str:
+        return f"openai/{self.model}"
+
     def embed(self, texts: List[str]) -> List[List[float]]:
         response = self.client.embeddings.create(
             model=self.model,
@@ -39,23 +114,59 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
         )
         return [item.embedding for item in response.data]
 
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        response = self.client.embeddings.create(
+            model=self.model,
+            input=list(texts),
+        )
+        vectors = np.empty((len(response.data), self.dim), dtype=np.float32)
+        for i, item in enumerate(response.data):
+            vectors[i] = item.embedding
+        return vectors
+
     @property
     def dim(self) -> int:
         return 1536
 
 class HuggingFaceEmbeddingProvider(EmbeddingProvider):
     _model = None
+    _model_name = None
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
         if HuggingFaceEmbeddingProvider._model is None:
             from sentence_transformers import SentenceTransformer
             HuggingFaceEmbeddingProvider._model = SentenceTransformer(model_name)
+            HuggingFaceEmbeddingProvider._model_name = model_name
 
+        # The loaded model is shared process-wide, so report the name of the
+        # model actually in use.
         self.model = HuggingFaceEmbeddingProvider._model
+        self.model_name = HuggingFaceEmbeddingProvider._model_name
+        self.batch_size = batch_size
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"huggingface/{self.model_name}"
 
     def embed(self, texts: List[str]) -> List[List[float]]:
-        embeddings = self.model.encode(texts, normalize_embeddings=True)
-        return embeddings.tolist()
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        embeddings = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
 
     @property
     def dim(self) -> int:
@@ -0,0 +1,109 @@
+import io
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Union
+
+PAGES_PER_TASK = 16
+PARALLEL_MIN_PAGES = 32
+
+_worker_reader = None
+
+
+@dataclass
+class ExtractedText:
+    text: str
+    # page_offsets[i] is the character offset where page i + 1 starts.
+    page_offsets: List[int] = field(default_factory=list)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets)
+
+    def page_for_offset(self, offset: int) -> Optional[int]:
+        if not self.page_offsets:
+            return None
+        return max(bisect_right(self.page_offsets, offset), 1)
+
+    def annotate_chunks(self, chunks: List[dict]) -> List[dict]:
+        if not self.page_offsets:
+            return chunks
+        for chunk in chunks:
+            if "char_start" in chunk:
+                chunk["page"] = self.page_for_offset(chunk["char_start"])
+        return chunks
+
+
+def _init_worker(pdf_bytes: bytes) -> None:
+    # Parsed once per process: the xref and object streams of a large spec
+    # are not re-read for every page range.
+    global _worker_reader
+    from pypdf import PdfReader
+
+    _worker_reader = PdfReader(io.BytesIO(pdf_bytes))
+
+
+def _extract_pages(reader, start: int, end: int) -> List[str]:
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _extract_page_range(start: int, end: int) -> List[str]:
+    return _extract_pages(_worker_reader, start, end)
+
+
+def _join_pages(pages: List[str]) -> ExtractedText:
+    parts: List[str] = []
+    page_offsets: List[int] = []
+    offset = 0
+
+    for page_text in pages:
+        page_offsets.append(offset)
+        if page_text:
+            parts.append(page_text)
+            parts.append("\n")
+            offset += len(page_text) + 1
+
+    return ExtractedText(text="".join(parts), page_offsets=page_offsets)
+
+
+def extract_pdf_text(
+    source: Union[bytes, str, Path],
+    *,
+    max_workers: Optional[int] = None,
+    pages_per_task: int = PAGES_PER_TASK,
+) -> ExtractedText:
+    from pypdf import PdfReader
+
+    if isinstance(source, (str, Path)):
+        pdf_bytes = Path(source).read_bytes()
+    else:
+        pdf_bytes = source
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(reader.pages)
+    workers = max_workers or os.cpu_count() or 1
+
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        return _join_pages(_extract_pages(reader, 0, page_count))
+
+    ranges = [
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+    workers = min(workers, len(ranges))
+
+    # The PDF bytes are handed to each worker once through the initializer
+    # rather than pickled into every task, and parsed there once.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(pdf_bytes,),
+    ) as pool:
+        futures = [pool.submit(_extract_page_range, start, end) for start, end in ranges]
+        pages: List[str] = []
+        for future in futures:
+            pages.extend(future.result())
+
+    return _join_pages(pages)
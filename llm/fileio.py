@@ -0,0 +1,21 @@
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def replace_file(path: Path):
+    # Yields a file opened next to `path` and renames it over `path` once the
+    # block finishes. Index files are memory-mapped by readers; rewriting one
+    # in place would truncate the pages under them, while a rename leaves
+    # their mapping on the old inode.
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}")
+    try:
+        with open(tmp, "wb") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
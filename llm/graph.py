@@ -1,6 +1,6 @@
 from typing import TypedDict, Optional, List
 from langgraph.graph import StateGraph, END
-from .chains import build_rag_chain
+from .chains import get_rag_chain
 from .prompts import REFUSAL_TEXT
 from .tokens import count_tokens
 from .grounding import enforce_grounding
@@ -30,7 +30,7 @@ def build_qa_graph(llm):
         if state.get("error"):
             return state
 
-        chain = build_rag_chain(llm)
+        chain = get_rag_chain(llm)
         raw = chain.invoke(
             {
                 "question": state["question"],
@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from llm.embeddings import EmbeddingProvider
+from llm.retrieval_faiss import load_faiss_store
+from llm.vectorstore import RAW_VECTORS_NAME, FAISSVectorStore
+
+# (file name, mtime_ns, size) for every file in the index directory.
+IndexSignature = Tuple[Tuple[str, int, int], ...]
+
+
+def index_signature(index_dir: Path) -> IndexSignature:
+    index_dir = Path(index_dir)
+    entries = []
+    for f in sorted(index_dir.iterdir()):
+        if f.is_file():
+            stat = f.stat()
+            entries.append((f.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+class _CacheEntry:
+    __slots__ = ("store", "signature", "nbytes")
+
+    def __init__(self, store: FAISSVectorStore, signature: IndexSignature, nbytes: int):
+        self.store = store
+        self.signature = signature
+        self.nbytes = nbytes
+
+
+class FAISSIndexCache:
+    def __init__(self, max_bytes: int, *, on_lookup: Optional[Callable[[str], None]] = None):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+
+        self.max_bytes = max_bytes
+        # Called with "hit", "miss" or "stale" after every lookup.
+        self.on_lookup = on_lookup
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(
+        self,
+        key: Hashable,
+        *,
+        index_dir: Path,
+        embedding_provider: EmbeddingProvider,
+        loader: Optional[Callable[[Path], object]] = None,
+    ) -> FAISSVectorStore:
+        signature = index_signature(index_dir)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            result = "miss"
+            if entry is not None:
+                if entry.signature == signature:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    store = entry.store
+                    result = "hit"
+                else:
+                    self._discard(key)
+                    self.invalidations += 1
+                    result = "stale"
+            if result != "hit":
+                self.misses += 1
+
+        if self.on_lookup is not None:
+            self.on_lookup(result)
+        if result == "hit":
+            return store
+
+        # Loading happens outside the lock so a slow read of one document does
+        # not block hits on the others.
+        if loader is not None:
+            store = loader(index_dir)
+        else:
+            store = load_faiss_store(
+                index_dir=index_dir,
+                embedding_provider=embedding_provider,
+            )
+        # Stores whose files live below index_dir (the segmented corpus)
+        # report their own size. Raw vectors are memory-mapped and only read
+        # by re-ingestion.
+        nbytes = getattr(store, "nbytes", None)
+        if nbytes is None:
+            nbytes = sum(size for name, _, size in signature if name != RAW_VECTORS_NAME)
+
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = _CacheEntry(store, signature, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+        return store
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def _evict(self) -> None:
+        # Always keep the most recently loaded entry, even if it alone is over
+        # budget; otherwise an oversized index would be reloaded on every query.
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._discard(key)
+            self.evictions += 1
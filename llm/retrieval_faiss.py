@@ -1,7 +1,11 @@
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional
+import numpy as np
 from llm.vectorstore import FAISSVectorStore
 from llm.embeddings import EmbeddingProvider
+from llm.context import PackedContext, pack_context
+from llm.tokens import DEFAULT_MODEL
+from llm.tracing import Trace, span
 
 DEFAULT_INDEX_DIR = Path("vector_index")
 
@@ -44,3 +48,63 @@ def retrieve_context_from_faiss(
     )
 
     return context, citations
+
+def retrieve_packed_context_from_faiss(
+    *,
+    question: str,
+    embedding_provider: EmbeddingProvider,
+    vector_store: FAISSVectorStore,
+    token_budget: int,
+    model: str = DEFAULT_MODEL,
+    k: int = 200,
+    query_embedding: Optional[List[float]] = None,
+    hybrid: bool = False,
+    trace: Optional[Trace] = None,
+) -> PackedContext:
+    if query_embedding is None:
+        with span(trace, "embed_query"):
+            query_embedding = embedding_provider.embed([question])[0]
+
+    with span(trace, "search"):
+        if hybrid:
+            candidates: List[dict] = vector_store.hybrid_search(
+                query_embedding,
+                question,
+                k=k,
+            )
+        else:
+            candidates = vector_store.search(
+                query_embedding=query_embedding,
+                k=k,
+            )
+
+    with span(trace, "context"):
+        return pack_context(candidates, token_budget=token_budget, model=model)
+
+def retrieve_packed_contexts_from_faiss(
+    *,
+    questions: List[str],
+    query_embeddings: np.ndarray,
+    vector_store: FAISSVectorStore,
+    token_budget: int,
+    model: str = DEFAULT_MODEL,
+    k: int = 200,
+    hybrid: bool = False,
+    trace: Optional[Trace] = None,
+) -> List[PackedContext]:
+    # Batch form of retrieve_packed_context_from_faiss: one search over the
+    # whole query matrix, then one packed context per question.
+    if not questions:
+        return []
+
+    with span(trace, "search"):
+        if hybrid:
+            candidates = vector_store.hybrid_search_many(query_embeddings, questions, k=k)
+        else:
+            candidates = vector_store.search_many(query_embeddings, k=k)
+
+    with span(trace, "context"):
+        return [
+            pack_context(c, token_budget=token_budget, model=model)
+            for c in candidates
+        ]
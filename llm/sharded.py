@@ -0,0 +1,182 @@
+import hashlib
+import heapq
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .fileio import replace_file
+from .vectorstore import FAISSVectorStore, VectorStore
+
+SHARDS_NAME = "shards.json"
+
+
+def shard_for_document(document_id, num_shards: int) -> int:
+    # A stable hash rather than hash(): the same document must land in the
+    # same shard in every process and after every restart.
+    digest = hashlib.blake2b(str(document_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % num_shards
+
+
+def shard_dir(path: Path, shard: int) -> Path:
+    return Path(path) / f"shard-{shard:03d}"
+
+
+class ShardedVectorStore(VectorStore):
+    # N FAISSVectorStores partitioned by a hash of each chunk's document id.
+    # Queries fan out to every shard on a thread pool (FAISS releases the GIL
+    # during search) and the per-shard top-k lists are merged by score.
+    def __init__(
+        self,
+        dim: int,
+        num_shards: int,
+        *,
+        document_key: str = "document_id",
+        max_workers: Optional[int] = None,
+        **index_options,
+    ):
+        if num_shards <= 0:
+            raise ValueError("num_shards must be positive")
+
+        self.dim = dim
+        self.num_shards = num_shards
+        self.document_key = document_key
+        self.index_options = index_options
+        self.max_workers = max_workers or num_shards
+        self.shards = [FAISSVectorStore(dim, **index_options) for _ in range(num_shards)]
+        # Shards changed since they were last saved or loaded.
+        self._dirty = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="faiss-shard",
+                    )
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def shard_for(self, metadata: dict) -> int:
+        if self.document_key not in metadata:
+            raise ValueError(f"Chunk metadata has no '{self.document_key}' to shard on")
+        return shard_for_document(metadata[self.document_key], self.num_shards)
+
+    def add(self, embeddings: List[List[float]], metadatas: List[dict]):
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if len(vectors) != len(metadatas):
+            raise ValueError("Embeddings and metadata length mismatch")
+
+        rows_by_shard: Dict[int, List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            rows_by_shard.setdefault(self.shard_for(metadata), []).append(row)
+
+        for shard, rows in rows_by_shard.items():
+            self.add_to_shard(shard, vectors[rows], [metadatas[row] for row in rows])
+
+    def add_to_shard(self, shard: int, embeddings, metadatas: List[dict]) -> None:
+        # For builders that partition upstream, e.g. one ingestion worker
+        # per shard.
+        self.shards[shard].add(embeddings, metadatas)
+        self._dirty.add(shard)
+
+    def search_rows(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Tuple[int, int]]]:
+        # Per query, the (shard, row) pairs of the k best hits, best first.
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+
+        shards = [i for i, shard in enumerate(self.shards) if shard.ntotal]
+        if not shards or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        futures = [
+            self.executor.submit(self.shards[i].search_rows, queries, k)
+            for i in shards
+        ]
+        results = [future.result() for future in futures]
+
+        merged = []
+        for q in range(len(queries)):
+            # Every index is inner product, so higher scores are better. Ties
+            # go to the lower shard, then the lower row.
+            candidates = (
+                (float(scores[q, j]), -shard, -int(rows[q, j]))
+                for shard, (scores, rows) in zip(shards, results)
+                for j in range(rows.shape[1])
+                if rows[q, j] != -1
+            )
+            merged.append([(-shard, -row) for _, shard, row in heapq.nlargest(k, candidates)])
+        return merged
+
+    def search_many(self, query_embeddings: List[List[float]], k: int = 5) -> List[List[dict]]:
+        return [
+            [self.shards[shard].metadatas[row] for shard, row in hits]
+            for hits in self.search_rows(np.asarray(query_embeddings, dtype=np.float32), k)
+        ]
+
+    def search(self, query_embedding: List[float], k: int = 5) -> List[dict]:
+        if len(query_embedding) != self.dim:
+            raise ValueError(
+                f"FAISS dimension mismatch: index={self.dim}, query={len(query_embedding)}"
+            )
+        return self.search_many([query_embedding], k=k)[0]
+
+    def config(self) -> dict:
+        return {
+            "dim": self.dim,
+            "num_shards": self.num_shards,
+            "document_key": self.document_key,
+            "index_options": self.index_options,
+        }
+
+    def save_shard(self, shard: int, path: Path) -> None:
+        self.shards[shard].save(shard_dir(path, shard))
+        self._dirty.discard(shard)
+
+    def load_shard(self, shard: int, path: Path) -> None:
+        store = FAISSVectorStore(self.dim, **self.index_options)
+        store.load(shard_dir(path, shard))
+        self.shards[shard] = store
+        self._dirty.discard(shard)
+
+    def save(self, path: Path, *, only_dirty: bool = False) -> None:
+        # Each shard is a complete FAISSVectorStore directory, so a rebuilt
+        # shard can be written (or copied in) without touching the others.
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with replace_file(path / SHARDS_NAME) as f:
+            f.write(json.dumps(self.config()).encode("utf-8"))
+
+        for shard in range(self.num_shards):
+            if not only_dirty or shard in self._dirty or not shard_dir(path, shard).exists():
+                self.save_shard(shard, path)
+
+    @classmethod
+    def load(cls, path: Path, *, max_workers: Optional[int] = None) -> "ShardedVectorStore":
+        path = Path(path)
+        config = json.loads((path / SHARDS_NAME).read_text())
+        store = cls(
+            config["dim"],
+            config["num_shards"],
+            document_key=config["document_key"],
+            max_workers=max_workers,
+            **config["index_options"],
+        )
+        for shard in range(store.num_shards):
+            if shard_dir(path, shard).exists():
+                store.load_shard(shard, path)
+        return store
@@ -1,4 +1,48 @@
+from functools import lru_cache
+from typing import List, Sequence
 import tiktoken
-def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
-    enc = tiktoken.encoding_for_model(model)
-    return len(enc.encode(text))
+
+DEFAULT_MODEL = "gpt-4o-mini"
+# Used for models tiktoken does not know about (Gemini, Claude, ...), where
+# the count is an estimate anyway.
+FALLBACK_ENCODING = "o200k_base"
+APPROX_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = DEFAULT_MODEL) -> tiktoken.Encoding:
+    model = model.split("/")[-1]
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def approximate_tokens(text: str) -> int:
+    return -(-len(text) // APPROX_CHARS_PER_TOKEN)
+
+
+def count_tokens(
+    text: str,
+    model: str = DEFAULT_MODEL,
+    *,
+    approximate: bool = False,
+) -> int:
+    if approximate:
+        return approximate_tokens(text)
+    return len(get_encoding(model).encode_ordinary(text))
+
+
+def count_tokens_batch(
+    texts: Sequence[str],
+    model: str = DEFAULT_MODEL,
+    *,
+    approximate: bool = False,
+    num_threads: int = 8,
+) -> List[int]:
+    if approximate:
+        return [approximate_tokens(t) for t in texts]
+    if not texts:
+        return []
+    encoded = get_encoding(model).encode_ordinary_batch(list(texts), num_threads=num_threads)
+    return [len(tokens) for tokens in encoded]
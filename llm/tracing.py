@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Optional, Sequence
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class Trace:
+    # Wall-clock spans of one request, in milliseconds. A span entered more
+    # than once accumulates; "total" is measured from construction.
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, ms: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        timings = {name: round(ms, 2) for name, ms in self.spans.items()}
+        timings["total"] = round(self.elapsed_ms(), 2)
+        return timings
+
+
+def span(trace: Optional[Trace], name: str):
+    return trace.span(name) if trace is not None else nullcontext()
+
+
+def aggregate_timings(
+    timings: Iterable[Optional[dict]],
+    percentiles: Sequence[int] = PERCENTILES,
+) -> Dict[str, Dict[str, float]]:
+    # {span: {"count": n, "p50": ms, ...}} over the traces containing the
+    # span, spans ordered by their median.
+    values: Dict[str, list] = {}
+    for entry in timings:
+        for name, ms in (entry or {}).items():
+            values.setdefault(name, []).append(ms)
+
+    aggregates = {}
+    for name, ms in values.items():
+        points = np.percentile(ms, percentiles)
+        aggregates[name] = {
+            "count": len(ms),
+            **{f"p{p}": round(float(v), 1) for p, v in zip(percentiles, points)},
+        }
+    return dict(sorted(aggregates.items(), key=lambda item: -item[1][f"p{percentiles[0]}"]))
@@ -1,7 +1,17 @@
-from typing import List
+import json
+from typing import List, Optional, Sequence, Tuple
 import numpy as np
 from abc import ABC, abstractmethod
 from pathlib import Path
+from .bm25 import BM25Index, has_bm25_index, reciprocal_rank_fusion
+from .columnar import (
+    ColumnarMetadata,
+    has_columnar_metadata,
+    write_columnar_metadata,
+)
+from .fileio import replace_file
+
+LEGACY_METADATA_NAME = "metadatas.npy"
 
 class VectorStore(ABC):
     @abstractmethod
@@ -12,45 +22,239 @@ class VectorStore(ABC):
     def search(self, query_embedding: List[float], k: int = 5) -> List[dict]:
         pass
 
+    def search_many(self, query_embeddings: List[List[float]], k: int = 5) -> List[List[dict]]:
+        return [self.search(query, k=k) for query in query_embeddings]
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    # Highest scores first; ties keep insertion order like a stable sort.
+    n = len(scores)
+    if k >= n:
+        candidates = np.arange(n)
+    else:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
 class InMemoryVectorStore(VectorStore):
-    def __init__(self):
-        self.vectors = []
-        self.metadatas = []
+    def __init__(self, initial_capacity: int = 1024):
+        self._matrix: Optional[np.ndarray] = None
+        self._initial_capacity = initial_capacity
+        self._size = 0
+        self.metadatas: List[dict] = []
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, rows)
+            self._matrix = np.empty((capacity, dim), dtype=np.float32)
+            return
+
+        if dim != self._matrix.shape[1]:
+            raise ValueError("Embedding dimension mismatch during add")
+
+        needed = self._size + rows
+        if needed > len(self._matrix):
+            # Doubling keeps appends amortized O(1) per vector.
+            capacity = max(len(self._matrix) * 2, needed)
+            grown = np.empty((capacity, dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
 
     def add(self, embeddings: List[List[float]], metadatas: List[dict]):
         if len(embeddings) != len(metadatas):
             raise ValueError("Embeddings and metadata length mismatch")
-        self.vectors.extend(embeddings)
+        if len(metadatas) == 0:
+            return
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError("Embeddings must be a 2-D matrix")
+
+        self._reserve(len(vectors), vectors.shape[1])
+        self._matrix[self._size:self._size + len(vectors)] = vectors
+        self._size += len(vectors)
         self.metadatas.extend(metadatas)
 
     def search(self, query_embedding: List[float], k: int = 5) -> List[dict]:
-        if not self.vectors:
+        if self._size == 0:
             return []
+        return self.search_many([query_embedding], k=k)[0]
+
+    def search_many(self, query_embeddings: List[List[float]], k: int = 5) -> List[List[dict]]:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if self._size == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        if queries.ndim != 2 or queries.shape[1] != self._matrix.shape[1]:
+            raise ValueError(
+                f"Query dimension mismatch: store={self._matrix.shape[1]}, query={queries.shape[-1]}"
+            )
 
-        scores = []
-        for vec, meta in zip(self.vectors, self.metadatas):
-            score = np.dot(vec, query_embedding)
-            scores.append((score, meta))
+        # One matrix product scores every query against every vector.
+        scores = self.vectors @ queries.T
+
+        return [
+            [self.metadatas[row] for row in _top_k_rows(scores[:, j], k)]
+            for j in range(len(queries))
+        ]
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+INDEX_CONFIG_NAME = "index_config.json"
+RAW_VECTORS_NAME = "vectors.npy"
+
+# FAISS k-means wants roughly this many training points per centroid.
+MIN_POINTS_PER_CENTROID = 39
 
-        scores.sort(key=lambda x: x[0], reverse=True)
-        return [m for _, m in scores[:k]]
 
 class FAISSVectorStore(VectorStore):
-    def __init__(self, dim: int):
-        import faiss
+    def __init__(
+        self,
+        dim: int,
+        *,
+        index_type: str = "flat",
+        nlist: int = 256,
+        pq_m: int = 16,
+        pq_nbits: int = 8,
+        hnsw_m: int = 32,
+        nprobe: int = 16,
+        ef_search: int = 64,
+        train_sample_size: int = 100_000,
+        keep_raw_vectors: bool = False,
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+        if index_type == "ivf_pq" and dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dim {dim}")
+
         self.dim = dim
-        self.index = faiss.IndexFlatIP(dim)
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+        self.hnsw_m = hnsw_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.train_sample_size = train_sample_size
+
+        # IVF indexes cannot take vectors before they are trained, so adds are
+        # buffered until the first search/save trains on everything seen.
+        self._pending: List[np.ndarray] = []
+        # The float32 vectors as added, saved next to the index, so they can
+        # be reused when IVF-PQ only stores lossy codes.
+        self._raw_vectors: Optional[List[np.ndarray]] = [] if keep_raw_vectors else None
+        self.index = self._build_index(nlist, pq_nbits)
         self.metadatas: List[dict] = []
+        self._bm25: Optional[BM25Index] = None
+
+    def _build_index(self, nlist: int, pq_nbits: int):
+        import faiss
+
+        if self.index_type == "flat":
+            index = faiss.IndexFlatIP(self.dim)
+        elif self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif self.index_type == "ivf_flat":
+            index = faiss.index_factory(self.dim, f"IVF{nlist},Flat", faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.index_factory(
+                self.dim,
+                f"IVF{nlist},PQ{self.pq_m}x{pq_nbits}",
+                faiss.METRIC_INNER_PRODUCT,
+            )
+        self._apply_search_params(index)
+        return index
+
+    def _apply_search_params(self, index) -> None:
+        import faiss
+
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+        elif self.index_type == "hnsw":
+            index.hnsw.efSearch = self.ef_search
+
+    def set_search_params(self, *, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        self._apply_search_params(self.index)
+
+    def _ensure_trained(self) -> None:
+        if not self._pending:
+            return
+
+        vectors = np.concatenate(self._pending)
+        self._pending = []
+
+        if not self.index.is_trained:
+            # Shrink nlist / PQ codebooks for small corpora so training does
+            # not fail with fewer points than centroids.
+            nlist = max(1, min(self.nlist, len(vectors) // MIN_POINTS_PER_CENTROID))
+            pq_nbits = max(1, min(self.pq_nbits, int(np.log2(len(vectors)))))
+            self.index = self._build_index(nlist, pq_nbits)
+
+            sample = vectors
+            if len(vectors) > self.train_sample_size:
+                rng = np.random.default_rng(0)
+                sample = vectors[rng.choice(len(vectors), self.train_sample_size, replace=False)]
+            self.index.train(sample)
+
+        self.index.add(vectors)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal + sum(len(v) for v in self._pending)
 
     def add(self, embeddings: List[List[float]], metadatas: List[dict]):
-        vectors = np.array(embeddings).astype("float32")
-        if vectors.shape[1] != self.dim:
+        # No copy when handed the contiguous float32 output of embed_array.
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
             raise ValueError("Embedding dimension mismatch during add")
-        self.index.add(vectors)
+        if len(vectors) != len(metadatas):
+            raise ValueError("Embeddings and metadata length mismatch")
+        if self.index.is_trained and not self._pending:
+            self.index.add(vectors)
+        else:
+            self._pending.append(vectors.copy())
+        if self._raw_vectors is not None:
+            self._raw_vectors.append(vectors.copy())
+        if not isinstance(self.metadatas, list):
+            self.metadatas = list(self.metadatas)
         self.metadatas.extend(metadatas)
+        self._bm25 = None
+
+    def search_rows(self, query_embeddings: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        self._ensure_trained()
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+
+        if queries.shape[1] != self.index.d:
+            raise ValueError(
+                f"FAISS dimension mismatch: index={self.index.d}, query={queries.shape[1]}"
+            )
+
+        return self.index.search(queries, k)
+
+    def search_many(self, query_embeddings: List[List[float]], k: int = 5) -> List[List[dict]]:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if self.ntotal == 0:
+            return [[] for _ in range(len(queries))]
+
+        _, indices = self.search_rows(queries, k)
+        return [self.get_metadatas(rows) for rows in indices]
+
+    def get_metadatas(self, rows) -> List[dict]:
+        return [self.metadatas[int(idx)] for idx in rows if idx != -1]
 
     def search(self, query_embedding: List[float], k: int = 5) -> List[dict]:
-        if self.index.ntotal == 0:
+        if self.ntotal == 0:
             return []
 
         if len(query_embedding) != self.index.d:
@@ -58,30 +262,129 @@ class FAISSVectorStore(VectorStore):
                 f"FAISS dimension mismatch: index={self.index.d}, query={len(query_embedding)}"
             )
 
-        query = np.array([query_embedding]).astype("float32")
-        _, indices = self.index.search(query, k)
+        _, indices = self.search_rows(np.asarray(query_embedding), k)
+        return self.get_metadatas(indices[0])
 
-        results = []
-        for idx in indices[0]:
-            if idx == -1:
-                continue
-            results.append(self.metadatas[idx])
+    @property
+    def bm25(self) -> BM25Index:
+        # Indexes saved before BM25 existed get one built from their chunk
+        # text on first use.
+        if self._bm25 is None:
+            self._bm25 = BM25Index.build(m.get("chunk_text", "") for m in self.metadatas)
+        return self._bm25
+
+    def hybrid_search(
+        self,
+        query_embedding: List[float],
+        query_text: str,
+        k: int = 5,
+        *,
+        candidate_k: Optional[int] = None,
+        rrf_k: int = 60,
+    ) -> List[dict]:
+        # Dense and BM25 candidates fused with reciprocal rank fusion. Exact
+        # identifiers (SG-04) that embeddings rank poorly come in through
+        # BM25, so a small k is enough.
+        return self.hybrid_search_many(
+            [query_embedding],
+            [query_text],
+            k,
+            candidate_k=candidate_k,
+            rrf_k=rrf_k,
+        )[0]
 
+    def hybrid_search_many(
+        self,
+        query_embeddings,
+        query_texts: Sequence[str],
+        k: int = 5,
+        *,
+        candidate_k: Optional[int] = None,
+        rrf_k: int = 60,
+    ) -> List[List[dict]]:
+        # The dense half runs as one FAISS search over the query matrix.
+        if self.ntotal == 0:
+            return [[] for _ in query_texts]
+
+        candidate_k = candidate_k or max(4 * k, 50)
+        _, dense = self.search_rows(np.asarray(query_embeddings), candidate_k)
+
+        results = []
+        for rows, query_text in zip(dense, query_texts):
+            lexical = self.bm25.search(query_text, candidate_k)
+            fused = reciprocal_rank_fusion([rows[rows != -1], lexical], k=rrf_k)
+            results.append(self.get_metadatas(fused[:k]))
         return results
 
+    def reconstruct_vectors(self) -> np.ndarray:
+        import faiss
+
+        self._ensure_trained()
+        if self.index_type in ("ivf_flat", "ivf_pq"):
+            faiss.extract_index_ivf(self.index).make_direct_map()
+        # Exact for flat, HNSW and IVF-Flat; IVF-PQ returns the decoded codes.
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def raw_vectors(self) -> np.ndarray:
+        # Falls back to the index for stores that did not keep them.
+        if self._raw_vectors is None:
+            return self.reconstruct_vectors()
+        if not self._raw_vectors:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.concatenate(self._raw_vectors)
+
+    def index_config(self) -> dict:
+        return {
+            "index_type": self.index_type,
+            "nlist": self.nlist,
+            "pq_m": self.pq_m,
+            "pq_nbits": self.pq_nbits,
+            "hnsw_m": self.hnsw_m,
+            "nprobe": self.nprobe,
+            "ef_search": self.ef_search,
+            "train_sample_size": self.train_sample_size,
+        }
+
     def save(self, path: Path) -> None:
         import faiss
+        self._ensure_trained()
         path = Path(path)
         path.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(self.index, str(path / "index.faiss"))
-        np.save(path / "metadatas.npy", np.array(self.metadatas, dtype=object))
+        # Saved over a live shard or checkpoint: files are replaced, not rewritten.
+        with replace_file(path / "index.faiss") as f:
+            f.write(faiss.serialize_index(self.index).tobytes())
+        with replace_file(path / INDEX_CONFIG_NAME) as f:
+            f.write(json.dumps(self.index_config()).encode("utf-8"))
+        write_columnar_metadata(path, self.metadatas)
+        self.bm25.save(path)
+        if self._raw_vectors is not None:
+            raw = self.raw_vectors()
+            with replace_file(path / RAW_VECTORS_NAME) as f:
+                np.save(f, raw)
 
     def load(self, path: Path) -> None:
         import faiss
         path = Path(path)
         self.index = faiss.read_index(str(path / "index.faiss"))
         self.dim = self.index.d
-        self.metadatas = np.load(
-            path / "metadatas.npy",
-            allow_pickle=True,
-        ).tolist()
+        self._pending = []
+        raw_path = path / RAW_VECTORS_NAME
+        self._raw_vectors = [np.load(raw_path, mmap_mode="r")] if raw_path.exists() else None
+
+        # Indexes saved before index types existed are always flat.
+        config_path = path / INDEX_CONFIG_NAME
+        config = json.loads(config_path.read_text()) if config_path.exists() else {"index_type": "flat"}
+        for name, value in config.items():
+            setattr(self, name, value)
+        self._apply_search_params(self.index)
+
+        legacy_path = path / LEGACY_METADATA_NAME
+        if not has_columnar_metadata(path) and legacy_path.exists():
+            # Indexes written before the columnar format kept pickled dicts;
+            # rewrite them once so later loads stay pickle-free.
+            legacy = np.load(legacy_path, allow_pickle=True).tolist()
+            write_columnar_metadata(path, legacy)
+            legacy_path.unlink()
+
+        self.metadatas = ColumnarMetadata(path)
+        self._bm25 = BM25Index.load(path) if has_bm25_index(path) else None
@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+import json as jsonlib
 import django
 import requests
 import pandas as pd
@@ -23,6 +25,7 @@ from langchain_openai import ChatOpenAI
 
 DJANGO_BASE_URL = "http://127.0.0.1:8000"
 API_TOKEN = os.environ.get("STREAMLIT_API_KEY", "dev-streamlit-key")
+INGESTION_POLL_SECONDS = 2
 
 st.set_page_config(page_title="ChatPDF + CSV", layout="wide")
 st.title("ChatPDF")
@@ -79,26 +82,86 @@ with st.sidebar:
         st.warning("STREAMLIT_API_KEY not set")
 
 # Backend helper
-def django_post(path, *, files=None, json=None, stream=False):
-    headers = {
+def _backend_headers():
+    return {
         "Authorization": f"Bearer {API_TOKEN}",
         "X-LLM-PROVIDER": st.session_state.provider,
         "X-LLM-API-KEY": st.session_state.api_key or "",
     }
 
+def _show_backend_error(r):
+    try:
+        error = r.json()
+        st.error(error.get("error", "Unknown backend error"))
+    except Exception:
+        st.error(f"Backend error: {r.status_code}")
+    st.stop()
+
+def wait_for_ingestion(document_id):
+    # Queries get 202 while the ingestion worker is still indexing the
+    # document; poll its status until the job finishes.
+    bar = st.progress(0, text="Document is still being ingested...")
+    while True:
+        r = requests.get(
+            f"{DJANGO_BASE_URL}/api/documents/{document_id}/status/",
+            headers=_backend_headers(),
+            timeout=30,
+        )
+        if r.status_code != 200:
+            _show_backend_error(r)
+
+        status = r.json()
+        if status["ingestion_status"] == "succeeded":
+            bar.empty()
+            return
+        if status["ingestion_status"] == "failed":
+            bar.empty()
+            st.error(f"Document ingestion failed: {status['ingestion_error'] or 'unknown error'}")
+            st.stop()
+
+        bar.progress(
+            status["ingestion_progress"],
+            text=f"Document is still being ingested ({status['ingestion_progress']}%)...",
+        )
+        time.sleep(INGESTION_POLL_SECONDS)
+
+def django_post(path, *, files=None, json=None, stream=False):
     url = f"{DJANGO_BASE_URL}{path}"
-    r = requests.post(url, headers=headers, files=files, json=json, timeout=600, stream=stream)
 
-    if r.status_code not in (200, 201):
-        try:
-            error = r.json()
-            st.error(error.get("error", "Unknown backend error"))
-        except Exception:
-            st.error(f"Backend error: {r.status_code}")
+    while True:
+        r = requests.post(url, headers=_backend_headers(), files=files, json=json, timeout=600, stream=stream)
+        if r.status_code != 202:
+            break
+        # Not ingested yet: wait for the worker, then ask again.
+        wait_for_ingestion(r.json()["document_id"])
+
+    if r.status_code == 409:
+        error = r.json()
+        st.error(
+            "Document is not ready: ingestion failed. "
+            f"{error.get('ingestion_error') or 'Upload it again to retry.'}"
+        )
         st.stop()
 
+    if r.status_code not in (200, 201):
+        _show_backend_error(r)
+
     return r
 
+def django_stream(path, *, json=None):
+    # Parses the server-sent events emitted by the streaming query endpoint.
+    r = django_post(path, json=json, stream=True)
+    event = "message"
+
+    for line in r.iter_lines(decode_unicode=True):
+        if not line:
+            event = "message"
+            continue
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, jsonlib.loads(line[len("data:"):].strip())
+
 uploaded_file = st.file_uploader("Upload a document", type=["csv", "txt", "pdf"])
 
 if uploaded_file:
@@ -229,13 +292,25 @@ Question: {question}
                     mime="application/pdf",
                 )
             else:
-                r = django_post(
-                    f"/api/documents/{st.session_state.document_id}/query/",
+                st.markdown("### You")
+                st.markdown(question)
+                st.markdown("---")
+                st.markdown("## Generated Document")
+                placeholder = st.empty()
+
+                answer = ""
+                for event, data in django_stream(
+                    f"/api/documents/{st.session_state.document_id}/query/stream/",
                     json={"question": question},
-                )
-
-                result = r.json()
-                answer = result["answer"]
+                ):
+                    if event == "token":
+                        answer += data["text"]
+                        placeholder.markdown(answer + "▌")
+                    elif event == "error":
+                        st.error(data.get("error", "Unknown backend error"))
+                        st.stop()
+
+                placeholder.markdown(answer)
 
                 st.session_state.chat_history.append(
                     {"question": question, "answer": answer}